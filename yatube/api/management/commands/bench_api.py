@@ -0,0 +1,85 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.benchmark import benchmark_database, measure
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность и размер ответов JSON API '
+        'и HTML-страниц лент на сгенерированных данных'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database(), \
+                override_settings(ALLOWED_HOSTS=['testserver']):
+            author, group, post = self.seed(options)
+            # Авторизованный клиент обходит кеш страниц для анонимов, так
+            # что каждый запрос HTML честно рендерит шаблон
+            client = Client()
+            client.force_login(author)
+            pairs = {
+                'index': (reverse('posts:index'), reverse('api:post_list')),
+                'group_list': (
+                    reverse('posts:group_list', args=[group.slug]),
+                    reverse('api:group_posts', args=[group.slug]),
+                ),
+                'profile': (
+                    reverse('posts:profile', args=[author.username]),
+                    reverse('api:author_posts', args=[author.username]),
+                ),
+                'post_detail': (
+                    reverse('posts:post_detail', args=[post.pk]),
+                    reverse('api:post_detail', args=[post.pk]),
+                ),
+            }
+            results = {
+                name: [self.run(client, url, options['repeat'])
+                       for url in urls]
+                for name, urls in pairs.items()
+            }
+        for name, ((html, html_size), (api, api_size)) in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, timings, size in (('HTML', html, html_size),
+                                         ('API', api, api_size)):
+                rps = 1000 / timings['mean'] if timings['mean'] else 0.0
+                self.stdout.write(
+                    f'  {label}: {rps:.0f} запросов/с, '
+                    f'p50 {timings["p50"]:.2f} мс, '
+                    f'p95 {timings["p95"]:.2f} мс, {size} байт'
+                )
+
+    def seed(self, options):
+        rnd = random.Random(options['seed'])
+        authors = [
+            User.objects.create(username=f'bench{i}', password='!')
+            for i in range(10)
+        ]
+        group = Group.objects.create(
+            title='Группа', slug='bench', description='-')
+        Post.objects.bulk_create(
+            Post(
+                text=' '.join(rnd.choices(('слово', 'текст', 'пост'), k=40)),
+                author=rnd.choice(authors),
+                group=group if rnd.random() < 0.5 else None,
+            )
+            for _ in range(options['posts'])
+        )
+        return authors[0], group, Post.objects.first()
+
+    def run(self, client, url, repeat):
+        size = len(client.get(url).content)
+        return measure(lambda: client.get(url), repeat=repeat), size
@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from posts.models import Group
+from posts.sharding import (ShardedCursorPaginator, on_shards,
+                            sharding_enabled)
+from posts.utils import CursorPaginator
+
+User = get_user_model()
+
+# Поле ответа -> колонка values(); связанные объекты отдаются ключами
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated_at': 'updated_at',
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+
+# На шардах нет пользователей и групп: вместо соединения выбираются
+# ключи, а имена догружает add_names из основной базы
+SHARD_COLUMNS = {
+    'author__username': ('author_id', User, 'username'),
+    'group__slug': ('group_id', Group, 'slug'),
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def selected_fields(request):
+    """Поля из ?fields=a,b; без параметра отдаются все."""
+    value = request.GET.get('fields')
+    if not value:
+        return list(POST_FIELDS)
+    fields = list(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()))
+    unknown = set(fields) - POST_FIELDS.keys()
+    if unknown or not fields:
+        raise InvalidFields(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}' if unknown
+            else 'Пустой список полей')
+    return fields
+
+
+def post_values(queryset, fields):
+    """Queryset словарей только с нужными колонками.
+
+    pk и pub_date выбираются всегда: по ним строится курсор.
+    """
+    columns = {POST_FIELDS[name] for name in fields} | {'pk', 'pub_date'}
+    if sharding_enabled():
+        columns = {
+            SHARD_COLUMNS[column][0] if column in SHARD_COLUMNS else column
+            for column in columns
+        }
+    return queryset.values(*columns)
+
+
+def add_names(rows):
+    """Имена авторов и слаги групп к строкам post_values с шардов."""
+    if not sharding_enabled() or not rows:
+        return rows
+    for column, (key, model, name) in SHARD_COLUMNS.items():
+        if key not in rows[0]:
+            continue
+        names = dict(model.objects.filter(
+            pk__in={row[key] for row in rows}).values_list('pk', name))
+        for row in rows:
+            row[column] = names.get(row[key])
+    return rows
+
+
+def post_payload(row, fields):
+    return {name: row[POST_FIELDS[name]] for name in fields}
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.POSTS_PER_PAGE))
+    except ValueError:
+        limit = settings.POSTS_PER_PAGE
+    return min(max(limit, 1), settings.API_MAX_LIMIT)
+
+
+def feed_payload(request, queryset):
+    """Страница ленты с курсорами соседних страниц."""
+    fields = selected_fields(request)
+    if sharding_enabled():
+        paginator = ShardedCursorPaginator(
+            [post_values(posts, fields) for posts in on_shards(queryset)],
+            page_limit(request))
+    else:
+        paginator = CursorPaginator(post_values(queryset, fields),
+                                    page_limit(request))
+    page = paginator.get_page(request.GET.get('cursor'))
+    return {
+        'results': [
+            post_payload(row, fields) for row in add_names(list(page))],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='TestUser', first_name='Тест')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user,
+                 group=cls.group if i % 2 else None)
+            for i in range(15)
+        )
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_post_list_cursor_pagination(self):
+        """Лента отдаётся страницами, курсор ведёт на следующую."""
+        url = reverse('api:post_list')
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertIsNone(first['previous'])
+        second = self.client.get(url, {'cursor': first['next']}).json()
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(ids, list(
+            Post.objects.values_list('pk', flat=True)))
+
+    def test_post_payload(self):
+        """Пост отдаётся ключами автора и группы, а не объектами."""
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        payload = response.json()
+        self.assertEqual(payload['text'], self.post.text)
+        self.assertEqual(payload['author'], 'TestUser')
+        self.assertEqual(payload['group'], self.post.group and 'test-slug')
+        self.assertEqual(set(payload), {
+            'id', 'text', 'pub_date', 'updated_at', 'author', 'group'})
+
+    def test_field_selection(self):
+        """?fields= ограничивает поля ответа, неизвестное поле — 400."""
+        url = reverse('api:post_list')
+        payload = self.client.get(url, {'fields': 'id,text'}).json()
+        self.assertEqual(set(payload['results'][0]), {'id', 'text'})
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_group_and_author_feeds(self):
+        """Ленты группы и автора содержат описание группы и автора."""
+        group = self.client.get(reverse(
+            'api:group_posts', kwargs={'slug': self.group.slug})).json()
+        self.assertEqual(group['group']['posts_count'], 7)
+        self.assertTrue(all(
+            post['group'] == 'test-slug' for post in group['results']))
+        author = self.client.get(reverse(
+            'api:author_posts', kwargs={'username': 'TestUser'})).json()
+        self.assertEqual(author['author'], {
+            'username': 'TestUser', 'first_name': 'Тест', 'last_name': '',
+            'posts_count': 15})
+        response = self.client.get(reverse(
+            'api:group_posts', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_conditional_get(self):
+        """Повторный запрос с ETag получает 304, пока лента не изменилась."""
+        url = reverse('api:post_list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
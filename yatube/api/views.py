@@ -0,0 +1,92 @@
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_GET
+
+from core.query_budget import query_budget
+from posts import sharding
+from posts.etags import (group_etag, index_etag, post_detail_etag,
+                         profile_etag)
+from posts.models import Group, Post
+from .payloads import (InvalidFields, add_names, feed_payload, post_payload,
+                       post_values, selected_fields)
+
+User = get_user_model()
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def api_response(payload, status=200):
+    return JsonResponse(payload, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def api_view(view):
+    """Только GET; неверный ?fields= отклоняется до расчёта ETag."""
+    @require_GET
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        try:
+            selected_fields(request)
+        except InvalidFields as error:
+            return api_response({'detail': str(error)}, status=400)
+        return view(request, *args, **kwargs)
+    return inner
+
+
+def get_values_or_404(queryset, *fields):
+    row = queryset.values(*fields).first()
+    if row is None:
+        raise Http404
+    return row
+
+
+@api_view
+@condition(etag_func=index_etag)
+@query_budget(1, 'api:post_list')
+def post_list(request):
+    return api_response(feed_payload(request, Post.objects.all()))
+
+
+@api_view
+@condition(etag_func=group_etag)
+@query_budget(2, 'api:group_posts')
+def group_posts(request, slug):
+    group = get_values_or_404(
+        Group.objects.filter(slug=slug),
+        'pk', 'title', 'slug', 'description', 'posts_count')
+    payload = feed_payload(request, Post.objects.filter(group_id=group['pk']))
+    del group['pk']
+    return api_response({'group': group, **payload})
+
+
+@api_view
+@condition(etag_func=profile_etag)
+@query_budget(2, 'api:author_posts')
+def author_posts(request, username):
+    author = get_values_or_404(
+        User.objects.filter(username=username),
+        'pk', 'username', 'first_name', 'last_name',
+        'post_counter__posts_count')
+    payload = feed_payload(
+        request, sharding.author_posts(author['pk']))
+    author['posts_count'] = author.pop('post_counter__posts_count') or 0
+    del author['pk']
+    return api_response({'author': author, **payload})
+
+
+@api_view
+@condition(etag_func=post_detail_etag)
+@query_budget(1, 'api:post_detail')
+def post_detail(request, post_id):
+    fields = selected_fields(request)
+    posts = Post.objects.filter(pk=post_id)
+    if sharding.sharding_enabled():
+        post = sharding.find_post(post_id)
+        if post is None:
+            raise Http404
+        posts = posts.using(post._state.db)
+    rows = add_names(list(post_values(posts, fields)[:1]))
+    if not rows:
+        raise Http404
+    return api_response(post_payload(rows[0], fields))
@@ -0,0 +1,59 @@
+import math
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import override_settings
+
+
+@contextmanager
+def benchmark_database(verbosity=0, name=None):
+    """Отдельная пустая БД с применёнными миграциями на время замера.
+
+    Рабочая база не трогается: как и тестовый раннер, создаётся
+    test_-копия, которая удаляется после выхода из блока. name задаёт
+    имя этой копии, например файл вместо базы SQLite в памяти.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    if name:
+        test_settings['NAME'] = name
+    with override_settings(DEBUG=False):
+        connection.creation.create_test_db(
+            verbosity=verbosity, autoclobber=True, serialize=False)
+        try:
+            yield connection
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity)
+            test_settings['NAME'] = old_test_name
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(timings):
+    """Сводка по списку длительностей в миллисекундах."""
+    return {
+        'count': len(timings),
+        'mean': sum(timings) / len(timings) if timings else 0.0,
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+    }
+
+
+def measure(func, repeat=20, warmup=2):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
@@ -0,0 +1,256 @@
+"""Замер задержек страниц через WSGI-приложение проекта в том же процессе.
+
+Запросы проходят весь стек yatube/wsgi.py: middleware, сессии, CSRF,
+сигналы начала и конца запроса, — без сети и без тестового клиента.
+"""
+import io
+import json
+import sys
+import time
+from collections import Counter
+from random import Random
+from urllib.parse import unquote_to_bytes, urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.seeding import WORDS
+from .benchmark import summarize
+
+User = get_user_model()
+
+CSRF_TOKEN = 'b' * 64
+
+
+class Scenario:
+    """Один вид запроса в смеси: имя, вес и как построить запрос.
+
+    path и data — функции от (rnd, fixtures, number), где number —
+    порядковый номер запроса в прогоне.
+    """
+
+    def __init__(self, name, weight, path, method='GET', auth=False,
+                 data=None):
+        self.name = name
+        self.weight = weight
+        self.path = path
+        self.method = method
+        self.auth = auth
+        self.data = data
+
+
+def default_scenarios(writes=True):
+    """Смесь, близкая к реальному трафику: в основном чтение лент.
+
+    writes=False убирает POST: вход, регистрацию и публикацию постов.
+    """
+    def url(name, **kwargs):
+        return lambda rnd, fx, n: reverse(name, kwargs={
+            key: rnd.choice(fx[values]) for key, values in kwargs.items()})
+
+    def search(rnd, fx, n):
+        query = urlencode({'q': rnd.choice(WORDS)})
+        return f'{reverse("posts:search")}?{query}'
+
+    def new_post(rnd, fx, n):
+        return {'text': f'Пост из бенчмарка {n}',
+                'group': rnd.choice(fx['group_ids'])}
+
+    def login(rnd, fx, n):
+        return {'username': fx['username'], 'password': fx['password']}
+
+    def signup(rnd, fx, n):
+        return {'username': f'bench_signup_{n}',
+                'email': f'bench_signup_{n}@example.com',
+                'password1': fx['password'], 'password2': fx['password']}
+
+    scenarios = [
+        Scenario('posts:index', 20, url('posts:index')),
+        Scenario('posts:index [auth]', 10, url('posts:index'), auth=True),
+        Scenario('posts:group_list', 10, url('posts:group_list',
+                                             slug='slugs')),
+        Scenario('posts:profile', 10, url('posts:profile',
+                                          username='usernames')),
+        Scenario('posts:post_detail', 20, url('posts:post_detail',
+                                              post_id='post_ids')),
+        Scenario('posts:search', 3, search),
+        Scenario('api:post_list', 5, url('api:post_list')),
+        Scenario('posts:post_create', 2, url('posts:post_create'),
+                 auth=True),
+        Scenario('posts:post_create [POST]', 1, url('posts:post_create'),
+                 method='POST', auth=True, data=new_post),
+        Scenario('users:login', 3, url('users:login')),
+        Scenario('users:login [POST]', 1, url('users:login'),
+                 method='POST', data=login),
+        Scenario('users:signup', 2, url('users:signup')),
+        Scenario('users:signup [POST]', 1, url('users:signup'),
+                 method='POST', data=signup),
+        Scenario('about:author', 2, url('about:author')),
+        Scenario('about:tech', 2, url('about:tech')),
+    ]
+    return [
+        scenario for scenario in scenarios
+        if writes or scenario.method == 'GET'
+    ]
+
+
+def prepare_fixtures(user, password=None, seed=0, sample=1000):
+    """Параметры адресов из базы и сессия пользователя для смеси.
+
+    Пароль пользователя меняется на password: с ним идут запросы входа
+    и регистрации. Без password пароль не трогается, и смесь должна
+    обходиться без POST.
+    """
+    if password is not None:
+        user.set_password(password)
+        user.save(update_fields=['password'])
+    client = Client()
+    client.force_login(user)
+    rnd = Random(seed)
+
+    def pick(queryset):
+        values = list(queryset[:sample * 10])
+        return rnd.sample(values, min(sample, len(values)))
+
+    return {
+        'post_ids': pick(Post.objects.values_list('pk', flat=True)),
+        'group_ids': pick(Group.objects.values_list('pk', flat=True)),
+        'slugs': pick(Group.objects.values_list('slug', flat=True)),
+        'usernames': pick(
+            User.objects.filter(posts__isnull=False).distinct()
+            .values_list('username', flat=True)),
+        'username': user.username,
+        'password': password,
+        'cookies': {
+            settings.SESSION_COOKIE_NAME:
+                client.cookies[settings.SESSION_COOKIE_NAME].value,
+        },
+    }
+
+
+def make_environ(method, path, cookies, data=None):
+    url = urlsplit(path)
+    body = urlencode(data or {}).encode()
+    if method == 'POST':
+        cookies = {**cookies, settings.CSRF_COOKIE_NAME: CSRF_TOKEN}
+        body = urlencode(
+            {**data, 'csrfmiddlewaretoken': CSRF_TOKEN}).encode()
+    return {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        # Как у WSGI-сервера: путь раскодирован и представлен в latin-1
+        'PATH_INFO': unquote_to_bytes(url.path).decode('iso-8859-1'),
+        'QUERY_STRING': url.query,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'HTTP_COOKIE': '; '.join(f'{k}={v}' for k, v in cookies.items()),
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def call(application, environ):
+    """Выполняет запрос; возвращает код ответа и длительность в мс."""
+    status = []
+
+    def start_response(value, headers, exc_info=None):
+        status.append(int(value.split()[0]))
+
+    started = time.perf_counter()
+    result = application(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return status[0], (time.perf_counter() - started) * 1000
+
+
+def run(application, fixtures, requests, seed=0, scenarios=None):
+    """Прогоняет смесь запросов и собирает сводку по каждому имени."""
+    scenarios = scenarios or default_scenarios()
+    rnd = Random(seed)
+    weights = [scenario.weight for scenario in scenarios]
+    raw = {
+        scenario.name: {'timings': [], 'queries': [], 'statuses': Counter()}
+        for scenario in scenarios
+    }
+    queries = []
+
+    def count_queries(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    with connection.execute_wrapper(count_queries):
+        for number in range(requests):
+            scenario = rnd.choices(scenarios, weights)[0]
+            data = (scenario.data(rnd, fixtures, number)
+                    if scenario.data else None)
+            environ = make_environ(
+                scenario.method,
+                scenario.path(rnd, fixtures, number),
+                fixtures['cookies'] if scenario.auth else {},
+                data,
+            )
+            queries.clear()
+            status, elapsed = call(application, environ)
+            entry = raw[scenario.name]
+            entry['timings'].append(elapsed)
+            entry['queries'].append(len(queries))
+            entry['statuses'][status] += 1
+    wall = time.perf_counter() - started
+
+    results = {}
+    for name, entry in raw.items():
+        if not entry['timings']:
+            continue
+        summary = summarize(entry['timings'])
+        summary['rps'] = (1000 / summary['mean']) if summary['mean'] else 0.0
+        summary['queries'] = sum(entry['queries']) / len(entry['queries'])
+        summary['statuses'] = {
+            str(code): count for code, count in entry['statuses'].items()}
+        results[name] = summary
+    return {
+        'requests': requests,
+        'seconds': wall,
+        'rps': requests / wall if wall else 0.0,
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold, metric='p95'):
+    """Имена, у которых metric вырос больше чем на threshold (доля)."""
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name, {}).get(metric)
+        if not before:
+            continue
+        change = result[metric] / before - 1
+        if change > threshold:
+            regressions.append((name, before, result[metric], change))
+    return regressions
+
+
+def save(report, path):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
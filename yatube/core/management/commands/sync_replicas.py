@@ -0,0 +1,54 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик из '
+        'DATABASE_REPLICAS (локальная замена репликации)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять копирование раз в столько секунд')
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        targets = [connections[alias] for alias in settings.DATABASE_REPLICAS]
+        if not targets:
+            raise CommandError('DATABASE_REPLICAS пуст')
+        for connection in (source, *targets):
+            if connection.vendor != 'sqlite':
+                raise CommandError('Копирование файлов работает только '
+                                   'для SQLite')
+        for target in targets:
+            if target.is_in_memory_db():
+                raise CommandError(
+                    f'Реплика {target.alias} должна быть файлом')
+        while True:
+            started = time.perf_counter()
+            for target in targets:
+                self.copy(source, target)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Реплики обновлены за {elapsed * 1000:.0f} мс: '
+                f'{", ".join(target.alias for target in targets)}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def copy(self, source, target):
+        # Онлайн-копия через backup API: основная база остаётся доступной
+        # для записи, а реплика получает согласованный снимок
+        target.close()
+        source.ensure_connection()
+        destination = sqlite3.connect(target.settings_dict['NAME'])
+        try:
+            source.connection.backup(destination)
+        finally:
+            destination.close()
@@ -0,0 +1,88 @@
+import logging
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+MODE_RAISE = 'raise'
+MODE_LOG = 'log'
+
+# Объявленные бюджеты по имени view: тесты проверяют их все разом
+BUDGETS = {}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget:
+    """Ограничивает число SQL-запросов в блоке кода или во view.
+
+    Работает как контекстный менеджер и как декоратор. Режим берётся из
+    settings.QUERY_BUDGET_MODE: 'raise' роняет запрос (и тест)
+    исключением QueryBudgetExceeded, 'log' пишет предупреждение в лог,
+    пустое значение отключает подсчёт.
+    """
+
+    def __init__(self, max_queries, name=None, using=DEFAULT_DB_ALIAS,
+                 mode=None):
+        self.max_queries = max_queries
+        self.name = name
+        self.using = using
+        self.mode = mode
+        self.queries = []
+        self._wrapper = None
+
+    def __call__(self, func):
+        if self.name is not None:
+            BUDGETS[self.name] = self.max_queries
+
+        @wraps(func)
+        def inner(*args, **kwargs):
+            budget = query_budget(
+                self.max_queries, using=self.using, mode=self.mode)
+            budget.name = self.name or func.__qualname__
+            with budget:
+                return func(*args, **kwargs)
+        inner.query_budget = self.max_queries
+        return inner
+
+    def __enter__(self):
+        mode = self.mode or getattr(settings, 'QUERY_BUDGET_MODE', None)
+        self.queries = []
+        if not mode:
+            return self
+        self.mode = mode
+        # Чтения могут уйти на реплики (core.routing): считаются и они
+        aliases = [self.using]
+        if self.using == DEFAULT_DB_ALIAS:
+            aliases.extend(getattr(settings, 'DATABASE_REPLICAS', []))
+        self._wrapper = ExitStack()
+        for alias in aliases:
+            self._wrapper.enter_context(
+                connections[alias].execute_wrapper(self._record))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._wrapper is None:
+            return False
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+        self._wrapper = None
+        if exc_type is not None or len(self.queries) <= self.max_queries:
+            return False
+        message = (
+            f'{self.name or "query_budget"}: {len(self.queries)} запросов '
+            f'при бюджете {self.max_queries}'
+        )
+        if self.mode == MODE_RAISE:
+            raise QueryBudgetExceeded(
+                '\n'.join([message] + [f'  {sql}' for sql in self.queries]))
+        logger.warning(message)
+        return False
+
+    def _record(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
@@ -0,0 +1,121 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики — алиасы из settings.DATABASE_REPLICAS. На них уходят только
+чтения внутри HTTP-запросов (PrimaryPinMiddleware); команды, воркеры и
+shell работают с основной базой. Пользователь, который только что
+что-то записал, REPLICA_PIN_SECONDS читает из основной базы и видит
+свои изменения, даже если реплика отстаёт.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_pin'
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.written = False
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def replica_reads(pinned=False):
+    """Разрешает чтения с реплик в блоке; отдаёт состояние маршрутизации."""
+    state = RoutingState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Чтения в блоке идут в основную базу."""
+    state = _state.get()
+    if state is None or state.pinned:
+        yield
+        return
+    state.pinned = True
+    try:
+        yield
+    finally:
+        state.pinned = False
+
+
+def _other_database(hints):
+    # Объект из базы вне схемы основная/реплики (например, шарда) —
+    # такие связи Django по умолчанию оставляет в базе объекта
+    instance = hints.get('instance')
+    db = instance._state.db if instance is not None else None
+    return db is not None and db not in {DEFAULT_DB_ALIAS, *replicas()}
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _other_database(hints):
+            return None
+        state = _state.get()
+        aliases = replicas()
+        if (state is None or state.pinned or state.written or not aliases
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        if _other_database(hints):
+            return None
+        state = _state.get()
+        if state is not None:
+            state.written = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит вместе с копией основной базы
+        return db not in replicas()
+
+
+def is_pinned(request):
+    try:
+        until = float(request.COOKIES.get(PIN_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > time.time()
+
+
+class PrimaryPinMiddleware:
+    """Маршрутизация чтений на время запроса и привязка после записи.
+
+    Если во время запроса была запись, ответ получает cookie, и
+    следующие запросы этого клиента читают из основной базы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with replica_reads(pinned=is_pinned(request)) as state:
+            response = self.get_response(request)
+        if state.written:
+            window = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time() + window)),
+                max_age=window, httponly=True, samesite='Lax')
+        return response
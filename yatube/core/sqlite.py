@@ -0,0 +1,62 @@
+"""Настройка соединений SQLite при открытии (сигнал connection_created).
+
+Профиль выбирается настройкой SQLITE_PROFILE. В профиле tuned журнал
+WAL: читатели не ждут писателя, а писатель — читателей; busy_timeout
+заставляет ждать освобождения блокировки, а не сразу падать с
+«database is locked».
+"""
+from django.conf import settings
+
+PROFILES = {
+    # Поведение SQLite и Django без изменений
+    'default': {},
+    'tuned': {
+        # Режим журнала хранится в файле базы, остальное — на соединение
+        'journal_mode': 'WAL',
+        'busy_timeout': 5000,
+        # В WAL fsync при каждом коммите не нужен для целостности базы
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        # Отрицательное значение — размер кеша страниц в КиБ
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def profile_pragmas(profile=None):
+    profile = profile or getattr(settings, 'SQLITE_PROFILE', 'default')
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f'Неизвестный профиль SQLite: {profile}') from None
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = profile_pragmas()
+    # Напрямую через sqlite3, мимо обёрток Django: прагмы не должны
+    # попадать в счётчики запросов и бюджеты views
+    for name, value in pragmas.items():
+        # У базы в памяти журнал всегда memory, WAL ей не нужен
+        if name == 'journal_mode' and connection.is_in_memory_db():
+            continue
+        if name == 'busy_timeout':
+            # Явный OPTIONS['timeout'] (например, у воркеров seed_bench)
+            # длиннее профиля и не должен сокращаться
+            timeout = connection.settings_dict['OPTIONS'].get('timeout', 0)
+            value = max(value, int(timeout * 1000))
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+    if connection.alias in getattr(settings, 'DATABASE_REPLICAS', []):
+        # Реплика только для чтения: случайная запись в неё сразу упадёт
+        connection.connection.execute('PRAGMA query_only = ON')
+
+
+def current_pragmas(connection, names=None):
+    """Фактические значения прагм соединения (для проверки и замеров)."""
+    connection.ensure_connection()
+    return {
+        name: connection.connection.execute(f'PRAGMA {name}').fetchone()[0]
+        for name in names or PROFILES['tuned']
+    }
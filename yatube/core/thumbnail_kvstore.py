@@ -0,0 +1,30 @@
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    KVStore as CachedDBKVStore,
+)
+
+
+class KVStore(CachedDBKVStore):
+    """Хранилище ключей sorl-thumbnail только в кеше, без таблицы в БД.
+
+    Если запись вытеснена из кеша, sorl проверяет наличие файла
+    миниатюры в хранилище и восстанавливает запись, не пересоздавая
+    саму картинку. Перечислять ключи кеш не умеет, поэтому
+    thumbnail cleanup/clear с этим хранилищем ничего не находят.
+    """
+
+    def clear(self, delete_thumbnails=False):
+        if delete_thumbnails:
+            self.delete_all_thumbnail_files()
+
+    def _get_raw(self, key):
+        return self.cache.get(key)
+
+    def _set_raw(self, key, value):
+        self.cache.set(key, value, settings.THUMBNAIL_CACHE_TIMEOUT)
+
+    def _delete_raw(self, *keys):
+        self.cache.delete_many(keys)
+
+    def _find_keys_raw(self, prefix):
+        return []
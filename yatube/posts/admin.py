@@ -1,6 +1,18 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import actions as admin_actions
+from django.contrib.admin.options import IS_POPUP_VAR
+from django.contrib.admin.templatetags.admin_urls import add_preserved_filters
+from django.contrib.auth import get_permission_codename, get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect
+from django.urls import reverse
 
-from .models import Post, Group
+from .deletion import schedule_deletion
+from .models import DeletionJob, Follow, Like, Post, Group
+from .search import filter_by_search
+
+User = get_user_model()
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +22,126 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту идёт через индекс FTS5 вместо LIKE '%...%'
+        if not search_term:
+            return queryset, False
+        return filter_by_search(queryset, search_term), False
+
+
+class BackgroundDeleteMixin:
+    """Удаление из админки ставится в очередь posts.deletion.
+
+    Страница подтверждения не собирает связанные объекты: для автора
+    с сотнями тысяч постов это та же загрузка всех строк в память.
+    Права на связанные строки проверяются по моделям из
+    related_permissions: (модель, действие), которое с ними сделает
+    фоновое удаление.
+    """
+    related_permissions = ()
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        perms_needed = {
+            model._meta.verbose_name
+            for model, action in self.related_permissions
+            if not request.user.has_perm('{}.{}'.format(
+                model._meta.app_label,
+                get_permission_codename(action, model._meta)))
+        }
+        return ([str(obj) for obj in objs],
+                {self.opts.verbose_name_plural: len(objs)}, perms_needed, [])
+
+    def delete_model(self, request, obj):
+        job = schedule_deletion(obj)
+        self.message_user(
+            request, f'{job}: удаление выполняется в фоне', messages.INFO)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.delete_model(request, obj)
+
+    def response_delete(self, request, obj_display, obj_id):
+        # Без «…успешно удалён»: объект пока только поставлен в очередь
+        if IS_POPUP_VAR in request.POST:
+            return super().response_delete(request, obj_display, obj_id)
+        if not self.has_change_permission(request, None):
+            return redirect('admin:index')
+        url = reverse(
+            f'admin:{self.opts.app_label}_{self.opts.model_name}_changelist',
+            current_app=self.admin_site.name,
+        )
+        return redirect(add_preserved_filters({
+            'preserved_filters': self.get_preserved_filters(request),
+            'opts': self.opts,
+        }, url))
+
+    def get_actions(self, request):
+        # Имя действия прежнее: его отправляет страница подтверждения
+        actions = super().get_actions(request)
+        if 'delete_selected' in actions:
+            _, name, description = actions['delete_selected']
+            actions[name] = (
+                type(self).schedule_selected, name, description)
+        return actions
+
+    def schedule_selected(self, request, queryset):
+        """Действие delete_selected с постановкой в очередь.
+
+        Подтверждение — страница Django; после него встроенное
+        действие сообщило бы «Успешно удалены», хотя объекты только
+        поставлены в очередь.
+        """
+        if not request.POST.get('post'):
+            return admin_actions.delete_selected(self, request, queryset)
+        _, _, perms_needed, _ = self.get_deleted_objects(queryset, request)
+        if perms_needed:
+            raise PermissionDenied
+        for obj in queryset:
+            self.log_deletion(request, obj, str(obj))
+        self.delete_queryset(request, queryset)
+        return None
+
+
+class GroupAdmin(BackgroundDeleteMixin, admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug', 'posts_count', 'last_pub_date')
+    search_fields = ('title', 'slug')
+    # Посты группы не удаляются, у них снимается группа
+    related_permissions = ((Post, 'change'),)
+
+
+class BackgroundDeleteUserAdmin(BackgroundDeleteMixin, UserAdmin):
+    related_permissions = (
+        (Post, 'delete'), (Like, 'delete'), (Follow, 'delete'))
+
+
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'kind', 'label', 'status', 'stage', 'progress',
+                    'processed', 'total', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('kind', 'object_id', 'label', 'status', 'stage',
+                       'processed', 'total', 'lease_until', 'last_error',
+                       'created_at', 'finished_at')
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress(self, obj):
+        return f'{obj.progress}%'
+    progress.short_description = 'Ход'
+
+    def retry(self, request, queryset):
+        queryset.filter(status=DeletionJob.FAILED).update(
+            status=DeletionJob.PENDING, last_error='')
+    retry.short_description = 'Повторить задачи с ошибкой'
+
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Follow)
+admin.site.register(Like)
+admin.site.register(DeletionJob, DeletionJobAdmin)
+# Импорт django.contrib.auth.admin уже зарегистрировал User
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeleteUserAdmin)
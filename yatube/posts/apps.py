@@ -1,5 +1,24 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def restore_search_index(sender, using, **kwargs):
+    # Триггеры ставятся заново, только пока миграция индекса применена
+    from django.db.migrations.recorder import MigrationRecorder
+    from .fts import install_search_index
+    connection = connections[using]
+    applied = MigrationRecorder(connection).applied_migrations()
+    if ('posts', '0009_post_search_index') in applied:
+        install_search_index(connection)
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .sharding import disable_foreign_keys
+        post_migrate.connect(restore_search_index, sender=self)
+        connection_created.connect(disable_foreign_keys)
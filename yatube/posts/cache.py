@@ -0,0 +1,166 @@
+import time
+from functools import wraps
+from hashlib import md5
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+TAG_PREFIX = 'tag:'
+PAGE_PREFIX = 'page:'
+STATS_PREFIX = 'cache_stats:'
+
+# Кеши, по которым ведутся счётчики попаданий и промахов
+STATS_NAMES = ('post_card', 'page')
+
+
+def post_tags(post):
+    tags = [f'post:{post.pk}', f'author:{post.author_id}']
+    if post.group_id:
+        tags.append(f'group:{post.group_id}')
+    return tags
+
+
+def feed_tags(author_id, group_id=None):
+    """Теги лент, в которых появляется или исчезает пост автора."""
+    tags = ['feed', f'feed:author:{author_id}']
+    if group_id:
+        tags.append(f'feed:group:{group_id}')
+    return tags
+
+
+def tag_key(tag):
+    """Ключ тега в кеше.
+
+    В тегах slug: и username: — значения пользователей с юникодом и
+    пробелами, недопустимыми в ключах memcached, поэтому тег
+    хешируется, как адрес в ключе страницы.
+    """
+    return TAG_PREFIX + md5(tag.encode()).hexdigest()
+
+
+def _new_stamp(moment=None):
+    return f'{uuid4().hex}:{time.time() if moment is None else moment}'
+
+
+def read_tags(tags):
+    """Текущие отметки тегов одним запросом к кешу.
+
+    Отметка — случайная версия и время последней инвалидации.
+    Отсутствующий тег получает новую версию с нулевым временем, поэтому
+    после вытеснения из кеша старые записи уже не совпадут с версией.
+    """
+    keys = [tag_key(tag) for tag in tags]
+    stamps = cache.get_many(keys)
+    missing = {key: _new_stamp(0) for key in keys if key not in stamps}
+    if missing:
+        cache.set_many(missing, None)
+        stamps.update(missing)
+    return [stamps[key] for key in keys]
+
+
+def stamps_version(stamps):
+    return md5(':'.join(stamps).encode()).hexdigest()
+
+
+def stamps_changed_since(stamps, moment):
+    return any(float(stamp.split(':')[1]) >= moment for stamp in stamps)
+
+
+def tags_version(tags):
+    return stamps_version(read_tags(tags))
+
+
+def _stamp_tags(tags):
+    cache.set_many(
+        {tag_key(tag): _new_stamp() for tag in tags}, None)
+
+
+def invalidate_tags(*tags):
+    """Сбрасывает теги сразу и ещё раз после коммита транзакции.
+
+    Повторная отметка нужна для страниц, которые успели прочитать
+    незакоммиченное состояние между первой отметкой и коммитом.
+    """
+    _stamp_tags(tags)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _stamp_tags(tags))
+
+
+def count_event(name, event):
+    key = f'{STATS_PREFIX}{name}:{event}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def cache_stats(name):
+    hits, misses = (
+        cache.get(f'{STATS_PREFIX}{name}:{event}', 0)
+        for event in ('hits', 'misses')
+    )
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_cache_stats(name):
+    cache.delete_many(
+        [f'{STATS_PREFIX}{name}:{event}' for event in ('hits', 'misses')])
+
+
+def tag_page(response, page_obj, *tags):
+    """Помечает ответ тегами ленты и всех постов на странице."""
+    page_tags = list(tags)
+    for post in page_obj:
+        page_tags.extend(post_tags(post))
+    response.cache_tags = list(dict.fromkeys(page_tags))
+    return response
+
+
+def cache_anonymous_page(view):
+    """Кеширует целиком страницу для анонимных GET-запросов.
+
+    Ответ сохраняется вместе с отметками своих тегов (см. tag_page) и
+    отдаётся, пока ни один из тегов не инвалидирован. Авторизованные
+    пользователи кеш не читают и не пишут, так что персональная шапка
+    в него не попадает. Если тег изменился, пока страница строилась,
+    ответ не сохраняется.
+    """
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+        # Хост входит в ключ: в лентах RSS/Atom ссылки абсолютные
+        key = PAGE_PREFIX + md5(
+            request.build_absolute_uri().encode()).hexdigest()
+        entry = cache.get(key)
+        if entry is not None:
+            tags, version, content, content_type = entry
+            if stamps_version(read_tags(tags)) == version:
+                count_event('page', 'hits')
+                return HttpResponse(content, content_type=content_type)
+        count_event('page', 'misses')
+        started = time.time()
+        response = view(request, *args, **kwargs)
+        tags = getattr(response, 'cache_tags', None)
+        if (not tags or response.status_code != 200
+                or response.streaming or response.cookies):
+            return response
+        stamps = read_tags(tags)
+        if not stamps_changed_since(stamps, started):
+            cache.set(
+                key,
+                (tags, stamps_version(stamps), response.content,
+                 response['Content-Type']),
+                settings.PAGE_CACHE_TIMEOUT,
+            )
+        return response
+    return inner
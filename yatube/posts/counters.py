@@ -0,0 +1,135 @@
+from collections import Counter
+
+from django.apps import apps
+from django.db.models import (
+    Count, DateTimeField, F, Max, OuterRef, Subquery, Value,
+)
+from django.db.models.functions import Coalesce, Greatest
+
+
+def _change(model, lookup, delta, **changes):
+    queryset = model.objects.filter(**lookup)
+    if delta < 0:
+        queryset = queryset.filter(posts_count__gte=-delta)
+    return queryset.update(posts_count=F('posts_count') + delta, **changes)
+
+
+def change_author_count(author_id, delta):
+    AuthorCounter = apps.get_model('posts', 'AuthorCounter')
+    if _change(AuthorCounter, {'author_id': author_id}, delta) or delta < 0:
+        return
+    _, created = AuthorCounter.objects.get_or_create(
+        author_id=author_id, defaults={'posts_count': delta})
+    if not created:
+        _change(AuthorCounter, {'author_id': author_id}, delta)
+
+
+def change_group_count(group_id, delta, pub_date=None):
+    """Меняет счётчик постов группы и дату последней публикации.
+
+    pub_date — самый свежий из добавленных постов. Если посты только
+    ушли из группы, дата берётся заново по индексу (group, -pub_date)
+    тем же UPDATE; при шардировании посты не в основной базе, и дата
+    остаётся прежней.
+    """
+    from .sharding import sharding_enabled
+
+    if group_id is None:
+        return
+    changes = {}
+    if pub_date is not None:
+        pub_date = Value(pub_date, output_field=DateTimeField())
+        changes['last_pub_date'] = Greatest(
+            Coalesce('last_pub_date', pub_date), pub_date)
+    elif delta < 0 and not sharding_enabled():
+        Post = apps.get_model('posts', 'Post')
+        changes['last_pub_date'] = Subquery(
+            Post.objects.filter(group_id=OuterRef('pk'))
+            .order_by('-pub_date').values('pub_date')[:1])
+    _change(apps.get_model('posts', 'Group'), {'pk': group_id}, delta,
+            **changes)
+
+
+def apply_post_deltas(posts, sign=1):
+    """Пересчитывает счётчики для пачки постов одним UPDATE на ключ."""
+    authors = Counter(post.author_id for post in posts)
+    groups = Counter(post.group_id for post in posts if post.group_id)
+    latest = {}
+    if sign > 0:
+        for post in posts:
+            if post.group_id and (post.group_id not in latest
+                                  or post.pub_date > latest[post.group_id]):
+                latest[post.group_id] = post.pub_date
+    for author_id, delta in authors.items():
+        change_author_count(author_id, sign * delta)
+    for group_id, delta in groups.items():
+        change_group_count(group_id, sign * delta, latest.get(group_id))
+
+
+def _post_querysets(**filters):
+    # При шардировании итоги считаются на каждом шарде и складываются
+    from .sharding import on_shards
+
+    Post = apps.get_model('posts', 'Post')
+    return on_shards(Post.objects.order_by().filter(**filters))
+
+
+def _author_totals():
+    totals = Counter()
+    for posts in _post_querysets():
+        totals.update(dict(
+            posts.values_list('author_id').annotate(total=Count('pk'))))
+    return totals
+
+
+def _group_totals():
+    """{группа: (постов, дата последнего)} по всем шардам."""
+    totals = {}
+    for posts in _post_querysets(group__isnull=False):
+        for group_id, total, last in posts.values_list('group_id').annotate(
+                total=Count('pk'), last=Max('pub_date')):
+            if group_id in totals:
+                before, before_last = totals[group_id]
+                total, last = before + total, max(before_last, last)
+            totals[group_id] = (total, last)
+    return totals
+
+
+def rebuild_counters(fix=True):
+    """Сверяет счётчики с COUNT по таблице постов.
+
+    Возвращает список расхождений вида (модель, pk, было, стало); при
+    fix=True расхождения исправляются.
+    """
+    Group = apps.get_model('posts', 'Group')
+    AuthorCounter = apps.get_model('posts', 'AuthorCounter')
+    mismatches = []
+
+    actual = _author_totals()
+    stored = dict(AuthorCounter.objects.values_list('author_id',
+                                                    'posts_count'))
+    for author_id in actual.keys() | stored.keys():
+        expected = actual.get(author_id, 0)
+        if stored.get(author_id, 0) != expected:
+            mismatches.append(('author', author_id,
+                               stored.get(author_id, 0), expected))
+            if fix:
+                AuthorCounter.objects.update_or_create(
+                    author_id=author_id,
+                    defaults={'posts_count': expected},
+                )
+
+    actual = _group_totals()
+    groups = Group.objects.values_list('pk', 'posts_count', 'last_pub_date')
+    for group_id, posts_count, last_pub_date in groups:
+        expected, expected_last = actual.get(group_id, (0, None))
+        if posts_count != expected:
+            mismatches.append(('group', group_id, posts_count, expected))
+        if last_pub_date != expected_last:
+            mismatches.append(('group_last_pub_date', group_id,
+                               last_pub_date, expected_last))
+        if fix and (posts_count != expected
+                    or last_pub_date != expected_last):
+            Group.objects.filter(pk=group_id).update(
+                posts_count=expected, last_pub_date=expected_last)
+    return mismatches
@@ -0,0 +1,232 @@
+"""Фоновое удаление авторов и групп пачками.
+
+Удаление пользователя каскадом удаляет его посты, а удаление группы
+обнуляет group у её постов. Сборщик Django для этого загружает в
+память все связанные строки и держит блокировку записи SQLite, пока не
+закончит. Здесь зависимые строки удаляются или отвязываются пачками по
+DELETION_CHUNK_SIZE, каждая в своей транзакции и с паузой
+DELETION_PAUSE после неё, а сам объект удаляется последним, когда
+связанных строк уже не осталось.
+
+Каждый этап — запрос по индексу и обработчик пачки id. Этапы
+идемпотентны: задача, прерванная на середине, продолжает с того же
+места, а счётчики и кеш обновляются вместе с каждой пачкой.
+"""
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .cache import feed_tags, invalidate_tags
+from .counters import apply_post_deltas, change_group_count
+from .hits import write_deltas
+from .models import (
+    DeletionJob, Follow, Group, Like, Post, PostScore, TimelineEntry,
+    TrendingList, User,
+)
+from .sharding import author_posts, on_shards
+from .timeline import change_followers_count
+from .trending import group_key
+
+
+def delete_rows(queryset):
+    queryset.delete()
+
+
+def delete_post_relations(ids):
+    """Строки, которые удаляются каскадом вместе с постами ids.
+
+    Одним запросом на таблицу, вместе со скрытыми связями
+    (related_name='+'), как у TimelineEntry.
+    """
+    for relation in Post._meta.get_fields(include_hidden=True):
+        if (relation.auto_created and not relation.concrete
+                and relation.on_delete is models.CASCADE):
+            relation.related_model._base_manager.filter(**{
+                f'{relation.field.name}__in': ids}).delete()
+
+
+def delete_posts(posts):
+    """Пачка постов без сборщика и сигналов на каждую строку.
+
+    Зависимые строки удаляются одним запросом на таблицу, счётчики и
+    теги кеша обновляются один раз на пачку.
+    """
+    alias = posts.db
+    posts = list(posts.only('pk', 'author_id', 'group_id'))
+    ids = [post.pk for post in posts]
+    delete_post_relations(ids)
+    # При шардировании посты на шарде автора, а связанные строки и
+    # счётчики — в транзакции пачки в основной базе
+    with connections[alias].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {Post._meta.db_table} WHERE id IN '
+            f'({", ".join(["%s"] * len(ids))})', ids)
+    # Счётчики — после DELETE: дата последней публикации группы
+    # пересчитывается по оставшимся постам
+    apply_post_deltas(posts, sign=-1)
+    invalidate_tags(*{
+        tag for post in posts
+        for tag in (f'post:{post.pk}',
+                    *feed_tags(post.author_id, post.group_id))
+    })
+
+
+def delete_likes(likes):
+    posts = Counter(likes.values_list('post_id', flat=True))
+    likes.delete()
+    write_deltas({
+        (post_id, 'likes_count'): -count for post_id, count in posts.items()
+    })
+
+
+def delete_follows(follows):
+    authors = Counter(follows.values_list('author_id', flat=True))
+    follows.delete()
+    for author_id, count in authors.items():
+        change_followers_count(author_id, -count)
+
+
+def detach_posts(posts):
+    rows = list(posts.values_list('pk', 'group_id'))
+    posts.update(group=None, updated_at=timezone.now())
+    groups = Counter(group_id for _, group_id in rows)
+    for group_id, count in groups.items():
+        change_group_count(group_id, -count)
+    invalidate_tags(*(f'post:{pk}' for pk, _ in rows))
+
+
+def detach_scores(scores):
+    scores.update(group=None)
+
+
+# (этап, связанные строки объекта, обработчик пачки)
+STAGES = {
+    DeletionJob.USER: (
+        ('посты', author_posts, delete_posts),
+        ('лента подписок',
+         lambda pk: TimelineEntry.objects.filter(user_id=pk), delete_rows),
+        ('лайки', lambda pk: Like.objects.filter(user_id=pk), delete_likes),
+        ('подписки',
+         lambda pk: Follow.objects.filter(user_id=pk), delete_follows),
+        ('подписчики',
+         lambda pk: Follow.objects.filter(author_id=pk), delete_rows),
+    ),
+    DeletionJob.GROUP: (
+        ('посты', lambda pk: Post.objects.filter(group_id=pk), detach_posts),
+        ('рейтинги',
+         lambda pk: PostScore.objects.filter(group_id=pk), detach_scores),
+    ),
+}
+
+
+def finish_user(pk):
+    User.objects.filter(pk=pk).delete()
+
+
+def finish_group(pk):
+    TrendingList.objects.filter(pk=group_key(pk)).delete()
+    Group.objects.filter(pk=pk).delete()
+
+
+FINISH = {
+    DeletionJob.USER: finish_user,
+    DeletionJob.GROUP: finish_group,
+}
+
+KINDS = {
+    User: DeletionJob.USER,
+    Group: DeletionJob.GROUP,
+}
+
+
+def schedule_deletion(obj):
+    """Ставит объект в очередь на удаление; повторно задачу не создаёт.
+
+    Пользователь сразу деактивируется: войти и писать он уже не может.
+    """
+    kind = KINDS[type(obj)]
+    job = DeletionJob.objects.filter(
+        kind=kind, object_id=obj.pk,
+        status__in=(DeletionJob.PENDING, DeletionJob.RUNNING),
+    ).first()
+    if job is not None:
+        return job
+    if kind == DeletionJob.USER and obj.is_active:
+        obj.is_active = False
+        obj.save(update_fields=['is_active'])
+    return DeletionJob.objects.create(
+        kind=kind,
+        object_id=obj.pk,
+        label=str(obj)[:255],
+        total=sum(
+            queryset.count() for _, rows, _ in STAGES[kind]
+            for queryset in on_shards(rows(obj.pk))
+        ),
+    )
+
+
+def lease():
+    return timezone.now() + timedelta(seconds=settings.DELETION_LEASE)
+
+
+def claim_job():
+    """Забирает задачу в работу с арендой, как письма в users.outbox."""
+    now = timezone.now()
+    ready = DeletionJob.objects.filter(
+        Q(status=DeletionJob.PENDING) | Q(status=DeletionJob.RUNNING),
+        lease_until__lte=now,
+    )
+    for pk in ready.values_list('pk', flat=True)[:5]:
+        until = lease()
+        if ready.filter(pk=pk).update(
+                status=DeletionJob.RUNNING, lease_until=until):
+            return DeletionJob.objects.get(pk=pk)
+    return None
+
+
+def run_stage(job, stage, rows, handle, chunk_size, pause, progress):
+    while True:
+        with transaction.atomic():
+            ids = list(rows.order_by().values_list(
+                'pk', flat=True)[:chunk_size])
+            if not ids:
+                return
+            handle(rows.filter(pk__in=ids))
+            DeletionJob.objects.filter(pk=job.pk).update(
+                stage=stage, processed=F('processed') + len(ids),
+                lease_until=lease())
+        job.processed += len(ids)
+        if progress:
+            progress(job)
+        if pause:
+            time.sleep(pause)
+
+
+def run_job(job, chunk_size=None, pause=None, progress=None):
+    """Выполняет задачу пачками; progress(job) вызывается после каждой."""
+    chunk_size = chunk_size or settings.DELETION_CHUNK_SIZE
+    pause = settings.DELETION_PAUSE if pause is None else pause
+    try:
+        for stage, rows, handle in STAGES[job.kind]:
+            job.stage = stage
+            # Посты группы при шардировании проходятся по всем шардам
+            for queryset in on_shards(rows(job.object_id)):
+                run_stage(job, stage, queryset, handle, chunk_size, pause,
+                          progress)
+        with transaction.atomic():
+            FINISH[job.kind](job.object_id)
+    except Exception as error:
+        job.status = DeletionJob.FAILED
+        job.last_error = f'{type(error).__name__}: {error}'
+        job.save(update_fields=['status', 'last_error'])
+        raise
+    job.status = DeletionJob.DONE
+    job.stage = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'stage', 'finished_at'])
+    return job
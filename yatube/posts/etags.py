@@ -0,0 +1,89 @@
+from hashlib import md5
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+
+from .cache import read_tags
+from . import sharding
+from .models import AuthorCounter, Group, Post
+
+User = get_user_model()
+
+
+def make_etag(request, *parts):
+    """ETag страницы: данные, запрос и пользователь, для которого она.
+
+    Шапка сайта у каждого пользователя своя, поэтому его id тоже входит
+    в валидатор.
+    """
+    parts = (
+        *parts,
+        request.GET.urlencode(),
+        request.user.pk if request.user.is_authenticated else 0,
+    )
+    return md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def last_update():
+    """Время последней записи в ленте по индексу updated_at.
+
+    Создание поста тоже обновляет updated_at, а удаления и
+    переименования авторов и групп видны по отметкам тегов.
+    """
+    if sharding.sharding_enabled():
+        return sharding.last_update()
+    return Post.objects.aggregate(last=Max('updated_at'))['last']
+
+
+def index_etag(request):
+    return make_etag(request, last_update(), *read_tags(['feed', 'names']))
+
+
+def group_etag(request, slug):
+    group = Group.objects.filter(slug=slug).values_list(
+        'pk', 'posts_count').first()
+    if group is None:
+        return None
+    pk, posts_count = group
+    return make_etag(
+        request, last_update(), posts_count,
+        *read_tags([f'feed:group:{pk}', f'group:{pk}', 'names']),
+    )
+
+
+def profile_etag(request, username):
+    author = User.objects.filter(username=username).values_list(
+        'pk', 'post_counter__posts_count').first()
+    if author is None:
+        return None
+    pk, posts_count = author
+    tags = [f'feed:author:{pk}', f'author:{pk}', 'names']
+    if request.user.is_authenticated:
+        # Кнопка подписки зависит от подписок того, кто смотрит
+        tags.append(f'follows:{request.user.pk}')
+    return make_etag(
+        request, last_update(), posts_count, *read_tags(tags))
+
+
+def post_detail_etag(request, post_id):
+    if sharding.sharding_enabled():
+        post = sharding.find_post(post_id)
+        if post is None:
+            return None
+        return make_etag(
+            request, post.updated_at,
+            AuthorCounter.posts_count_for(post.author_id),
+            *read_tags([f'author:{post.author_id}',
+                        f'group:{post.group_id}', f'post:{post.pk}']),
+        )
+    post = Post.objects.filter(pk=post_id).values_list(
+        'updated_at', 'author_id', 'group_id',
+        'author__post_counter__posts_count').first()
+    if post is None:
+        return None
+    updated_at, author_id, group_id, posts_count = post
+    return make_etag(
+        request, updated_at, posts_count,
+        *read_tags([f'author:{author_id}', f'group:{group_id}',
+                    f'post:{post_id}']),
+    )
@@ -0,0 +1,118 @@
+import csv
+import heapq
+import io
+import json
+import zlib
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Group
+from .sharding import on_shards, sharding_enabled
+
+User = get_user_model()
+
+EXPORT_FIELDS = ('id', 'text', 'pub_date', 'updated_at', 'author', 'group')
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+_COLUMNS = ('pk', 'text', 'pub_date', 'updated_at', 'author__username',
+            'group__slug')
+# На шардах нет пользователей и групп: выбираются ключи, а имена
+# догружаются из основной базы на каждую пачку
+_SHARD_COLUMNS = ('pk', 'text', 'pub_date', 'updated_at', 'author_id',
+                  'group_id')
+
+
+def _batches(queryset, columns, batch_size):
+    queryset = queryset.order_by('pk').values_list(*columns)
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+        last_pk = batch[-1][0]
+
+
+def _with_names(batch):
+    authors = dict(User.objects.filter(
+        pk__in={row[4] for row in batch}).values_list('pk', 'username'))
+    groups = dict(Group.objects.filter(
+        pk__in={row[5] for row in batch if row[5]}).values_list('pk', 'slug'))
+    return [(*row[:4], authors.get(row[4]), groups.get(row[5]))
+            for row in batch]
+
+
+def export_rows(queryset, batch_size=None):
+    """Строки выгрузки пачками по возрастанию id.
+
+    Каждая пачка — отдельный запрос с условием id > последнего
+    выгруженного, поэтому в памяти не больше одной пачки и долгий
+    курсор не держится открытым, пока клиент читает ответ. При
+    шардировании пачки шардов сливаются по id.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    if not sharding_enabled():
+        yield from _batches(queryset, _COLUMNS, batch_size)
+        return
+    rows = heapq.merge(*(
+        (row for batch in _batches(shard, _SHARD_COLUMNS, batch_size)
+         for row in batch)
+        for shard in on_shards(queryset)
+    ))
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield _with_names(batch)
+
+
+def _csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        writer.writerows(
+            (pk, text, pub_date.isoformat(), updated_at.isoformat(),
+             author, group or '')
+            for pk, text, pub_date, updated_at, author, group in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_chunks(batches):
+    for batch in batches:
+        yield ''.join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), cls=DjangoJSONEncoder,
+                       ensure_ascii=False) + '\n'
+            for row in batch
+        )
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_posts(queryset, fmt='csv', compress=False, batch_size=None):
+    """Выгрузка постов в CSV или JSONL кусками байтов."""
+    render = _csv_chunks if fmt == 'csv' else _jsonl_chunks
+    chunks = (
+        chunk.encode()
+        for chunk in render(export_rows(queryset, batch_size)) if chunk
+    )
+    return _gzip(chunks) if compress else chunks
@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .cache import tag_page
+from .models import Group, Post
+from .sharding import ShardedPostList, sharding_enabled
+
+User = get_user_model()
+
+
+class FeedSource:
+    """Что выводит лента: заголовок, ссылку, отбор постов и теги кеша."""
+
+    def __init__(self, title, link, description, filters, tags):
+        self.title = title
+        self.link = link
+        self.description = description
+        self.filters = filters
+        self.tags = tags
+        self.posts = []
+
+
+class PostFeed(Feed):
+    """Лента последних постов в RSS.
+
+    Экземпляр ленты общий для всех запросов, поэтому источник и
+    выбранные посты живут в FeedSource, привязанном к запросу: по ним
+    __call__ помечает ответ тегами кеша страниц.
+    """
+
+    def __call__(self, request, *args, **kwargs):
+        response = super().__call__(request, *args, **kwargs)
+        source = request.feed_source
+        return tag_page(response, source.posts, *source.tags)
+
+    def get_object(self, request, *args, **kwargs):
+        request.feed_source = self.get_source(*args, **kwargs)
+        return request.feed_source
+
+    def get_source(self):
+        return FeedSource(
+            'Yatube: последние записи',
+            reverse('posts:index'),
+            'Новые записи всех авторов',
+            {},
+            ['feed'],
+        )
+
+    def title(self, source):
+        return source.title
+
+    def link(self, source):
+        return source.link
+
+    def description(self, source):
+        return source.description
+
+    def items(self, source):
+        if sharding_enabled():
+            posts = ShardedPostList(**source.filters)
+        else:
+            posts = Post.objects.filter(**source.filters).select_related(
+                'author', 'group')
+        source.posts = list(posts[:settings.FEED_ITEMS])
+        return source.posts
+
+    def item_title(self, post):
+        return Truncator(post.text).words(8)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=[post.pk])
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_author_link(self, post):
+        return reverse('posts:profile', args=[post.author.username])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_updateddate(self, post):
+        return post.updated_at
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group else []
+
+
+class GroupPostFeed(PostFeed):
+    def get_source(self, slug):
+        group = get_object_or_404(Group, slug=slug)
+        return FeedSource(
+            f'Yatube: {group.title}',
+            reverse('posts:group_list', args=[group.slug]),
+            group.description,
+            {'group_id': group.pk},
+            [f'feed:group:{group.pk}', f'group:{group.pk}',
+             f'slug:{group.slug}'],
+        )
+
+
+class AuthorPostFeed(PostFeed):
+    def get_source(self, username):
+        author = get_object_or_404(User, username=username)
+        return FeedSource(
+            f'Yatube: {author.get_full_name() or author.username}',
+            reverse('posts:profile', args=[author.username]),
+            f'Записи пользователя {author.username}',
+            {'author_id': author.pk},
+            [f'feed:author:{author.pk}', f'author:{author.pk}',
+             f'username:{author.username}'],
+        )
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, source):
+        return source.description
+
+
+class PostAtomFeed(AtomMixin, PostFeed):
+    pass
+
+
+class GroupPostAtomFeed(AtomMixin, GroupPostFeed):
+    pass
+
+
+class AuthorPostAtomFeed(AtomMixin, AuthorPostFeed):
+    pass
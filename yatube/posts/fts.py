@@ -0,0 +1,77 @@
+"""Полнотекстовый индекс FTS5 по тексту постов (только SQLite).
+
+Таблица хранит лишь индекс (content='posts_post'), а синхронизируется
+с постами триггерами. SQLite-бэкенд Django пересоздаёт таблицу постов
+при многих изменениях схемы, и триггеры при этом теряются, поэтому
+после каждого migrate они ставятся заново (см. install_search_index).
+"""
+FTS_TABLE = 'posts_post_fts'
+
+TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+
+TRIGGERS = {
+    f'{FTS_TABLE}_insert': (
+        f"AFTER INSERT ON posts_post BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+        f"END"
+    ),
+    f'{FTS_TABLE}_delete': (
+        f"AFTER DELETE ON posts_post BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); "
+        f"END"
+    ),
+    f'{FTS_TABLE}_update': (
+        f"AFTER UPDATE OF text ON posts_post BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); "
+        f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+        f"END"
+    ),
+}
+
+
+def install_search_index(connection):
+    """Создаёт индекс и недостающие триггеры.
+
+    Если хотя бы одного триггера не было, индекс мог отстать от
+    постов и перестраивается целиком. Возвращает True, если что-то
+    пришлось восстановить.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND tbl_name = 'posts_post'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGERS if name not in existing]
+        if not missing:
+            return False
+        cursor.execute(TABLE_SQL)
+        for name in missing:
+            cursor.execute(f'CREATE TRIGGER {name} {TRIGGERS[name]}')
+        rebuild_search_index(connection)
+    return True
+
+
+def drop_search_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def rebuild_search_index(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
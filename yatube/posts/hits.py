@@ -0,0 +1,143 @@
+"""Счётчики просмотров и лайков с накоплением записи.
+
+UPDATE на каждый просмотр держал бы блокировку записи SQLite на каждом
+запросе. Вместо этого приращения копятся в памяти процесса и пишутся в
+PostCounter одной транзакцией: по UPDATE на каждое поле и величину
+приращения, сколько бы постов ни набралось.
+
+Сброс происходит, когда в буфере COUNTER_FLUSH_SIZE ключей, после
+запроса, если с прошлого сброса прошло COUNTER_FLUSH_INTERVAL секунд,
+и при штатном завершении процесса (atexit; так завершаются воркеры
+gunicorn и uWSGI по SIGTERM). Гарантии:
+
+* приращение не учитывается дважды: пачка изымается из буфера до
+  записи, а при ошибке базы целиком возвращается в буфер;
+* при аварийном завершении (SIGKILL, падение процесса) теряется не
+  больше накопленного с прошлого сброса: не дольше интервала и не
+  больше COUNTER_FLUSH_SIZE ключей на процесс;
+* показанные значения — запись в базе плюс несброшенные приращения
+  этого процесса; приращения других процессов видны после их сброса.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from .models import PostCounter
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('views_count', 'likes_count')
+
+# Сколько id в одном условии IN: лимит параметров запроса SQLite
+IN_BATCH = 500
+
+
+def write_deltas(deltas):
+    """Записывает приращения {(post_id, поле): delta} одной транзакцией."""
+    groups = defaultdict(list)
+    for (post_id, field), delta in deltas.items():
+        groups[field, delta].append(post_id)
+    post_ids = sorted({post_id for post_id, _ in deltas})
+    with transaction.atomic():
+        PostCounter.objects.bulk_create(
+            [PostCounter(post_id=post_id) for post_id in post_ids],
+            batch_size=IN_BATCH, ignore_conflicts=True)
+        for (field, delta), ids in groups.items():
+            for start in range(0, len(ids), IN_BATCH):
+                counters = PostCounter.objects.filter(
+                    post_id__in=ids[start:start + IN_BATCH])
+                if delta < 0:
+                    # Лайк мог быть снят раньше, чем учтён в базе
+                    counters = counters.filter(**{f'{field}__gte': -delta})
+                counters.update(
+                    **{field: F(field) + delta}, updated_at=Now())
+
+
+class CounterBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        # Изъятые для записи, но ещё не записанные: их тоже видно
+        self._flushing = Counter()
+        self._last_flush = time.monotonic()
+
+    def add(self, post_id, field, delta=1):
+        with self._lock:
+            self._pending[post_id, field] += delta
+            full = len(self._pending) >= settings.COUNTER_FLUSH_SIZE
+        if full:
+            self.flush()
+
+    def pending(self, post_id):
+        with self._lock:
+            return {
+                field: (self._pending[post_id, field]
+                        + self._flushing[post_id, field])
+                for field in FIELDS
+            }
+
+    def is_due(self):
+        elapsed = time.monotonic() - self._last_flush
+        return bool(self._pending) and (
+            elapsed >= settings.COUNTER_FLUSH_INTERVAL)
+
+    def flush(self):
+        """Пишет накопленное в базу; возвращает число записанных ключей."""
+        with self._lock:
+            batch = Counter({
+                key: delta for key, delta in self._pending.items() if delta})
+            self._pending = Counter()
+            self._flushing.update(batch)
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+        try:
+            write_deltas(batch)
+        except DatabaseError:
+            logger.exception('Счётчики не записаны, вернули в буфер')
+            with self._lock:
+                self._pending.update(batch)
+            self._forget(batch)
+            return 0
+        self._forget(batch)
+        return len(batch)
+
+    def _forget(self, batch):
+        with self._lock:
+            self._flushing.subtract(batch)
+            self._flushing = Counter({
+                key: delta for key, delta in self._flushing.items()
+                if delta})
+
+    def clear(self):
+        with self._lock:
+            self._pending = Counter()
+
+
+buffer = CounterBuffer()
+atexit.register(buffer.flush)
+
+
+def increment(post_id, field, delta=1):
+    buffer.add(post_id, field, delta)
+
+
+def post_counts(post_id):
+    """Просмотры и лайки поста с учётом ещё не записанных приращений."""
+    stored = PostCounter.objects.filter(post_id=post_id).values(
+        *FIELDS).first() or dict.fromkeys(FIELDS, 0)
+    pending = buffer.pending(post_id)
+    return {field: max(0, stored[field] + pending[field])
+            for field in FIELDS}
+
+
+def flush_if_due():
+    if buffer.is_due():
+        buffer.flush()
@@ -0,0 +1,176 @@
+import os
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from random import Random
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import F
+from django.test.utils import override_settings
+
+from core.benchmark import benchmark_database, summarize
+from posts.hits import CounterBuffer
+from posts.models import Post, PostCounter
+from posts.seeding import Zipf
+
+
+class TimedBuffer(CounterBuffer):
+    def __init__(self):
+        super().__init__()
+        self.flushes = []
+
+    def flush(self):
+        started = time.perf_counter()
+        written = super().flush()
+        if written:
+            self.flushes.append((time.perf_counter() - started) * 1000)
+        return written
+
+
+class Command(BaseCommand):
+    help = (
+        'Просмотры постов из нескольких потоков на файловой базе SQLite: '
+        'UPDATE на каждый просмотр и буфер posts.hits со сбросом пачками. '
+        'После замера суммы в базе сверяются с числом приращений'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--increments', type=int, default=20000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--flush-interval', type=float, default=1)
+        parser.add_argument('--flush-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            with benchmark_database(name=path):
+                if connection.vendor != 'sqlite':
+                    raise CommandError('Бенчмарк рассчитан на SQLite')
+                self.stdout.write('Генерация данных...')
+                call_command(
+                    'seed_bench', users=100, groups=10,
+                    posts=options['posts'], seed=options['seed'],
+                    workers=0, stdout=StringIO())
+                self.post_ids = list(
+                    Post.objects.values_list('pk', flat=True))
+                PostCounter.objects.bulk_create(
+                    [PostCounter(post_id=pk) for pk in self.post_ids],
+                    batch_size=500)
+                self.plan = self.make_plan(options)
+                connection.close()
+                direct = self.run(self.direct_worker, options)
+                buffer = TimedBuffer()
+                with override_settings(
+                        COUNTER_FLUSH_INTERVAL=options['flush_interval'],
+                        COUNTER_FLUSH_SIZE=options['flush_size']):
+                    buffered = self.run(
+                        lambda number: self.buffered_worker(number, buffer),
+                        options)
+                    # Как atexit при завершении воркера
+                    buffer.flush()
+                buffered.update(self.verify())
+                buffered['flushes'] = summarize(buffer.flushes)
+                connections.close_all()
+        self.report('UPDATE на каждый просмотр', direct)
+        self.report('буфер со сбросом пачками', buffered)
+        self.stdout.write(self.style.SUCCESS(
+            f'Приращений в секунду: {direct["rate"]:.0f} → '
+            f'{buffered["rate"]:.0f} '
+            f'(×{buffered["rate"] / max(direct["rate"], 1):.1f})'
+        ))
+        if buffered['lost'] or buffered['mismatched']:
+            raise CommandError('Суммы в базе не совпали с приращениями')
+
+    def make_plan(self, options):
+        # Популярность постов сильно неравномерна
+        zipf = Zipf(len(self.post_ids), 1.1)
+        plan = []
+        for number in range(options['threads']):
+            rnd = Random(f'{options["seed"]}:{number}')
+            plan.append([
+                self.post_ids[zipf.sample(rnd)]
+                for _ in range(options['increments'] // options['threads'])
+            ])
+        return plan
+
+    def run(self, worker, options):
+        PostCounter.objects.update(views_count=0)
+        connection.close()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as pool:
+            results = list(pool.map(worker, range(options['threads'])))
+        elapsed = time.perf_counter() - started
+        timings = [t for ts, _ in results for t in ts]
+        result = summarize(timings)
+        result['rate'] = len(timings) / elapsed
+        result['errors'] = sum(errors for _, errors in results)
+        result.update(self.verify())
+        return result
+
+    def direct_worker(self, number):
+        timings = []
+        errors = 0
+        try:
+            for post_id in self.plan[number]:
+                started = time.perf_counter()
+                try:
+                    PostCounter.objects.filter(post_id=post_id).update(
+                        views_count=F('views_count') + 1)
+                except OperationalError:
+                    errors += 1
+                else:
+                    timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+        return timings, errors
+
+    def buffered_worker(self, number, buffer):
+        timings = []
+        try:
+            for post_id in self.plan[number]:
+                started = time.perf_counter()
+                buffer.add(post_id, 'views_count')
+                # Как обработчик request_finished после ответа
+                if buffer.is_due():
+                    buffer.flush()
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+        return timings, 0
+
+    def verify(self):
+        expected = Counter(
+            post_id for posts in self.plan for post_id in posts)
+        stored = dict(PostCounter.objects.values_list(
+            'post_id', 'views_count'))
+        return {
+            'lost': sum(expected.values()) - sum(stored.values()),
+            'mismatched': sum(
+                1 for post_id in self.post_ids
+                if stored.get(post_id, 0) != expected[post_id]),
+        }
+
+    def report(self, label, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(
+            f'  {result["rate"]:.0f} приращений/с, '
+            f'p50 {result["p50"]:.3f} мс, p99 {result["p99"]:.3f} мс, '
+            f'ошибок {result["errors"]}'
+        )
+        if 'flushes' in result:
+            flushes = result['flushes']
+            self.stdout.write(
+                f'  сбросов {flushes["count"]}, '
+                f'в среднем {flushes["mean"]:.1f} мс, '
+                f'p95 {flushes["p95"]:.1f} мс'
+            )
+        self.stdout.write(
+            f'  не дошло до базы {result["lost"]}, '
+            f'постов с расхождением {result["mismatched"]}'
+        )
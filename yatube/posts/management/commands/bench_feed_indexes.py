@@ -0,0 +1,114 @@
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import benchmark_database, measure
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает планы (EXPLAIN QUERY PLAN) и время запросов лент '
+        'без составных индексов Post и с ними на сгенерированных данных'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database() as connection:
+            if connection.vendor != 'sqlite':
+                raise CommandError('Бенчмарк рассчитан на SQLite')
+            self.connection = connection
+            self.stdout.write('Генерация данных...')
+            author, group = self.seed(options)
+            queries = self.queries(author, group, options['posts'])
+            self.set_indexes(enabled=False)
+            before = self.run(queries, options['repeat'])
+            self.set_indexes(enabled=True)
+            after = self.run(queries, options['repeat'])
+        for name in queries:
+            self.report(name, before[name], after[name])
+
+    def seed(self, options):
+        rnd = random.Random(options['seed'])
+        User.objects.bulk_create(
+            User(username=f'bench{i}', password='!')
+            for i in range(options['authors'])
+        )
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'bench-{i}', description='-')
+            for i in range(options['groups'])
+        )
+        author_ids = list(User.objects.values_list('pk', flat=True))
+        group_ids = list(Group.objects.values_list('pk', flat=True))
+        # Активность авторов и размеры групп сильно неравномерны
+        posts = (
+            Post(
+                text='Тестовый пост',
+                author_id=author_ids[int(len(author_ids) * rnd.random() ** 3)],
+                group_id=group_ids[int(len(group_ids) * rnd.random() ** 2)],
+            )
+            for _ in range(options['posts'])
+        )
+        Post.objects.bulk_create(posts)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE posts_post SET pub_date = datetime('2023-01-01', "
+                "'+' || ((id * 7919) % 525600) || ' minutes')"
+            )
+        return author_ids[0], group_ids[0]
+
+    def queries(self, author, group, total):
+        per_page = settings.POSTS_PER_PAGE
+        feed = Post.objects.select_related('author', 'group')
+        deep = total // 2 // per_page * per_page
+        return {
+            'index, первая страница': feed[:per_page],
+            'index, середина ленты': feed[deep:deep + per_page],
+            'group_list, первая страница': feed.filter(
+                group_id=group)[:per_page],
+            'profile, первая страница': Post.objects.select_related(
+                'group').filter(author_id=author)[:per_page],
+        }
+
+    def set_indexes(self, enabled):
+        with self.connection.schema_editor() as editor:
+            for index in Post._meta.indexes:
+                if enabled:
+                    editor.add_index(Post, index)
+                else:
+                    editor.remove_index(Post, index)
+        with self.connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def run(self, queries, repeat):
+        results = {}
+        for name, queryset in queries.items():
+            sql, params = queryset.query.sql_with_params()
+            with self.connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            timings = measure(
+                lambda: list(queryset.all()), repeat=repeat)
+            results[name] = (plan, timings)
+        return results
+
+    def report(self, name, before, after):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        for label, (plan, timings) in (('без индексов', before),
+                                       ('с индексами', after)):
+            self.stdout.write(
+                f'  {label}: p50 {timings["p50"]:.2f} мс, '
+                f'p95 {timings["p95"]:.2f} мс'
+            )
+            for line in plan:
+                self.stdout.write(f'    {line}')
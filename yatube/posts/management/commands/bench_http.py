@@ -0,0 +1,134 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core import http_bench
+from core.benchmark import benchmark_database
+from posts import hits
+
+User = get_user_model()
+
+BENCH_USERNAME = 'bench_http'
+BENCH_PASSWORD = 'Bench-password-1'
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет взвешенную смесь запросов через WSGI-приложение в том '
+        'же процессе и сохраняет p50/p95/p99, запросы в секунду и число '
+        'SQL-запросов по каждому адресу'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--warmup', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--existing', action='store_true',
+            help='Замерять на настроенной базе, а не на новой с seed_bench; '
+                 'только GET, без входа, регистрации и новых постов')
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--output', help='Куда сохранить JSON')
+        parser.add_argument(
+            '--compare', metavar='BASELINE',
+            help='JSON прошлого прогона для сравнения')
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Допустимый рост метрики, доля (0.1 — 10%%)')
+        parser.add_argument(
+            '--metric', default='p95', choices=('mean', 'p50', 'p95', 'p99'))
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            baseline = http_bench.load(options['compare'])
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            if options['existing']:
+                report = self.bench(options)
+            else:
+                with benchmark_database():
+                    self.stdout.write('Генерация данных...')
+                    call_command(
+                        'seed_bench', users=options['users'],
+                        groups=options['groups'], posts=options['posts'],
+                        seed=options['seed'], workers=0, stdout=StringIO())
+                    report = self.bench(options)
+        report['options'] = {
+            key: options[key]
+            for key in ('requests', 'seed', 'existing', 'users', 'groups',
+                        'posts')
+        }
+        self.report(report)
+        if options['output']:
+            http_bench.save(report, options['output'])
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
+        if baseline is not None:
+            self.compare(baseline, report, options)
+
+    def bench(self, options):
+        # Импорт здесь: приложение создаётся после override_settings
+        from yatube.wsgi import application
+
+        # На настоящей базе бенчмарк ничего не пишет: пароль с известным
+        # значением из исходников и созданные посты и аккаунты остались бы
+        # в ней после замера
+        existing = options['existing']
+        user, created = User.objects.get_or_create(
+            username=BENCH_USERNAME,
+            defaults={'password': make_password(None)},
+        )
+        try:
+            fixtures = http_bench.prepare_fixtures(
+                user, None if existing else BENCH_PASSWORD, options['seed'])
+            if not fixtures['post_ids']:
+                raise CommandError('В базе нет постов для замера')
+            scenarios = http_bench.default_scenarios(writes=not existing)
+            if options['warmup']:
+                http_bench.run(application, fixtures, options['warmup'],
+                               options['seed'] + 1, scenarios)
+            return http_bench.run(application, fixtures, options['requests'],
+                                  options['seed'], scenarios)
+        finally:
+            # Просмотры из буфера — в базу замера, пока она существует
+            hits.buffer.flush()
+            if existing and created:
+                user.delete()
+
+    def report(self, report):
+        self.stdout.write(
+            f'{"адрес":<28} {"n":>5} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"rps":>7} {"SQL":>5}  коды')
+        for name, result in sorted(report['results'].items()):
+            statuses = ', '.join(
+                f'{code}×{count}'
+                for code, count in sorted(result['statuses'].items()))
+            self.stdout.write(
+                f'{name:<28} {result["count"]:>5} {result["p50"]:>8.2f} '
+                f'{result["p95"]:>8.2f} {result["p99"]:>8.2f} '
+                f'{result["rps"]:>7.1f} {result["queries"]:>5.1f}  '
+                f'{statuses}'
+            )
+        self.stdout.write(
+            f'Всего {report["requests"]} запросов за '
+            f'{report["seconds"]:.1f} с, {report["rps"]:.1f} в секунду')
+
+    def compare(self, baseline, report, options):
+        regressions = http_bench.compare(
+            baseline, report, options['threshold'], options['metric'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(
+                f'Регрессий по {options["metric"]} нет'))
+            return
+        for name, before, after, change in regressions:
+            self.stdout.write(self.style.ERROR(
+                f'{name}: {options["metric"]} {before:.2f} → {after:.2f} мс '
+                f'(+{change:.0%})'))
+        raise CommandError(
+            f'Регрессия по {options["metric"]} больше '
+            f'{options["threshold"]:.0%} у {len(regressions)} адресов')
@@ -0,0 +1,76 @@
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import benchmark_database, measure
+from posts.models import Post
+from posts.search import PostSearch
+
+User = get_user_model()
+
+WORDS = (
+    'город', 'река', 'поезд', 'осень', 'кофе', 'книга', 'музыка', 'снег',
+    'работа', 'проект', 'дорога', 'море', 'лес', 'вечер', 'утро', 'друг',
+    'фильм', 'кошка', 'сад', 'ветер', 'гора', 'письмо', 'окно', 'рынок',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время поиска по постам через LIKE и через индекс FTS5 '
+        'на сгенерированных данных'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--words', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with benchmark_database() as connection:
+            if connection.vendor != 'sqlite':
+                raise CommandError('Бенчмарк рассчитан на SQLite')
+            self.stdout.write('Генерация данных...')
+            self.seed(options)
+            # Частое слово, редкое слово и слово, которого нет в текстах
+            queries = (WORDS[0], WORDS[-1], 'отсутствует')
+            results = {
+                query: (
+                    measure(lambda: self.like(query), options['repeat']),
+                    measure(lambda: self.fts(query), options['repeat']),
+                )
+                for query in queries
+            }
+        for query, (like, fts) in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'«{query}»'))
+            for label, timings in (('LIKE', like), ('FTS5', fts)):
+                self.stdout.write(
+                    f'  {label}: p50 {timings["p50"]:.2f} мс, '
+                    f'p95 {timings["p95"]:.2f} мс'
+                )
+
+    def seed(self, options):
+        rnd = random.Random(options['seed'])
+        author = User.objects.create(username='bench', password='!')
+        # Частота слов убывает к концу словаря
+        weights = [1 / rank for rank in range(1, len(WORDS) + 1)]
+        Post.objects.bulk_create(
+            Post(
+                author=author,
+                text=' '.join(
+                    rnd.choices(WORDS, weights, k=options['words'])),
+            )
+            for _ in range(options['posts'])
+        )
+
+    def like(self, query):
+        posts = Post.objects.select_related('author', 'group').filter(
+            text__icontains=query)
+        return posts.count(), list(posts[:settings.POSTS_PER_PAGE])
+
+    def fts(self, query):
+        results = PostSearch(query)
+        return results.count(), results[:settings.POSTS_PER_PAGE]
@@ -0,0 +1,149 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from random import Random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import (
+    OperationalError, close_old_connections, connection, connections,
+    transaction,
+)
+from django.test.utils import override_settings
+
+from core.benchmark import benchmark_database, summarize
+from core.sqlite import current_pragmas
+from posts.models import Post
+
+# Прежняя конфигурация и текущая из settings.py
+SETUPS = (
+    ('до', 'default', 0),
+    ('после', 'tuned', None),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Смешанная нагрузка чтения и записи постов из нескольких потоков '
+        'на файловой базе SQLite: профиль default и профиль tuned'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            with benchmark_database(name=path):
+                if connection.vendor != 'sqlite':
+                    raise CommandError('Бенчмарк рассчитан на SQLite')
+                self.stdout.write('Генерация данных...')
+                call_command(
+                    'seed_bench', users=options['users'], groups=20,
+                    posts=options['posts'], seed=options['seed'],
+                    workers=0, stdout=StringIO())
+                self.post_ids = list(
+                    Post.objects.values_list('pk', flat=True))
+                self.author_ids = list(Post.objects.values_list(
+                    'author_id', flat=True).distinct())
+                results = [
+                    (label, self.run(profile, max_age, options))
+                    for label, profile, max_age in SETUPS
+                ]
+                connections.close_all()
+        for label, result in results:
+            self.report(label, result)
+        (_, before), (_, after) = results
+        self.stdout.write(self.style.SUCCESS(
+            f'Операций в секунду: {before["ops"]:.0f} → {after["ops"]:.0f} '
+            f'(×{after["ops"] / max(before["ops"], 1):.2f})'
+        ))
+
+    def run(self, profile, max_age, options):
+        settings_dict = connection.settings_dict
+        old_max_age = settings_dict['CONN_MAX_AGE']
+        if max_age is not None:
+            settings_dict['CONN_MAX_AGE'] = max_age
+        connections.close_all()
+        cache.clear()
+        try:
+            with override_settings(SQLITE_PROFILE=profile):
+                if profile == 'default':
+                    # WAL записан в самом файле, возвращаем журнал SQLite
+                    # по умолчанию
+                    connection.ensure_connection()
+                    connection.connection.execute(
+                        'PRAGMA journal_mode = DELETE')
+                pragmas = current_pragmas(connection)
+                connection.close()
+                deadline = time.perf_counter() + options['seconds']
+                kinds = (['read'] * options['readers']
+                         + ['write'] * options['writers'])
+                with ThreadPoolExecutor(len(kinds)) as pool:
+                    stats = list(pool.map(
+                        lambda args: self.worker(*args, deadline),
+                        enumerate(kinds)))
+        finally:
+            settings_dict['CONN_MAX_AGE'] = old_max_age
+        result = {'pragmas': pragmas, 'ops': 0}
+        for kind in ('read', 'write'):
+            timings = [t for k, ts, _ in stats if k == kind for t in ts]
+            result[kind] = summarize(timings)
+            result[kind]['errors'] = sum(
+                errors for k, _, errors in stats if k == kind)
+            result[kind]['rate'] = len(timings) / options['seconds']
+            result['ops'] += result[kind]['rate']
+        return result
+
+    def worker(self, number, kind, deadline):
+        rnd = Random(number)
+        timings = []
+        errors = 0
+        per_page = settings.POSTS_PER_PAGE
+        feed = Post.objects.select_related('author', 'group')
+        try:
+            while time.perf_counter() < deadline:
+                # Как обработчик запроса: соединение закрывается или
+                # остаётся открытым в зависимости от CONN_MAX_AGE
+                close_old_connections()
+                started = time.perf_counter()
+                try:
+                    if kind == 'read':
+                        offset = rnd.randrange(20) * per_page
+                        list(feed[offset:offset + per_page])
+                        feed.get(pk=rnd.choice(self.post_ids))
+                    else:
+                        with transaction.atomic():
+                            Post.objects.create(
+                                text='Пост из бенчмарка',
+                                author_id=rnd.choice(self.author_ids),
+                            )
+                except OperationalError:
+                    errors += 1
+                else:
+                    timings.append((time.perf_counter() - started) * 1000)
+                close_old_connections()
+        finally:
+            connection.close()
+        return kind, timings, errors
+
+    def report(self, label, result):
+        pragmas = ', '.join(
+            f'{name}={value}' for name, value in result['pragmas'].items())
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{label}: {pragmas}'))
+        for kind, title in (('read', 'чтение'), ('write', 'запись')):
+            stats = result[kind]
+            self.stdout.write(
+                f'  {title}: {stats["rate"]:.0f} оп/с, '
+                f'p50 {stats["p50"]:.2f} мс, p95 {stats["p95"]:.2f} мс, '
+                f'p99 {stats["p99"]:.2f} мс, ошибок {stats["errors"]}'
+            )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import STATS_NAMES, cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кешей постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнулить счётчики после вывода',
+        )
+
+    def handle(self, *args, **options):
+        for name in STATS_NAMES:
+            stats = cache_stats(name)
+            self.stdout.write(
+                f'{name}: попаданий {stats["hits"]}, '
+                f'промахов {stats["misses"]}, '
+                f'доля попаданий {stats["hit_ratio"]:.1%}'
+            )
+            if options['reset']:
+                reset_cache_stats(name)
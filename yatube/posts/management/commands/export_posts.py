@@ -0,0 +1,59 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import EXPORT_FORMATS, export_posts
+from posts.models import Group, Post
+from posts.sharding import author_posts
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты автора, группы или все посты в CSV или JSONL, '
+        'не загружая их в память целиком'
+    )
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--author', help='Имя пользователя автора')
+        source.add_argument('--group', help='Слаг группы')
+        parser.add_argument(
+            '--format', choices=tuple(EXPORT_FORMATS), default='csv')
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжать выгрузку gzip')
+        parser.add_argument(
+            '--output', default='-', help='Файл выгрузки или - для stdout')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        # По ключам, без соединения: при шардировании на шардах нет
+        # пользователей и групп
+        posts = Post.objects.all()
+        if options['author']:
+            author_id = User.objects.filter(
+                username=options['author']).values_list(
+                'pk', flat=True).first()
+            if author_id is None:
+                raise CommandError(f'Нет автора {options["author"]}')
+            posts = author_posts(author_id)
+        elif options['group']:
+            group_id = Group.objects.filter(
+                slug=options['group']).values_list('pk', flat=True).first()
+            if group_id is None:
+                raise CommandError(f'Нет группы {options["group"]}')
+            posts = posts.filter(group_id=group_id)
+        chunks = export_posts(posts, options['format'], options['gzip'],
+                              options['batch_size'])
+        if options['output'] == '-':
+            self.write(sys.stdout.buffer, chunks)
+            sys.stdout.buffer.flush()
+        else:
+            with open(options['output'], 'wb') as output:
+                self.write(output, chunks)
+
+    def write(self, output, chunks):
+        for chunk in chunks:
+            output.write(chunk)
@@ -0,0 +1,30 @@
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post
+from posts.sharding import on_shards
+from posts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры для картинок всех постов'
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        names = chain.from_iterable(
+            posts.values_list('image', flat=True).distinct().iterator()
+            for posts in on_shards(
+                Post.objects.exclude(image='').order_by('image'))
+        )
+        done = 0
+        for name in names:
+            try:
+                generate_thumbnails(ImageFile(name, storage))
+            except Exception as error:
+                self.stderr.write(f'{name}: {error}')
+                continue
+            done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done}'))
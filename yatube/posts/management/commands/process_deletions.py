@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.deletion import claim_job, run_job
+from posts.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые удаления авторов и групп пачками, '
+        'показывая ход каждой задачи'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument(
+            '--pause', type=float,
+            help='Пауза в секундах между пачками')
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить задачи из очереди и выйти',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                job = claim_job()
+                if job is not None:
+                    self.run(job, options)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        waiting = DeletionJob.objects.filter(
+            status__in=(DeletionJob.PENDING, DeletionJob.RUNNING)).count()
+        self.stdout.write(f'Задач в очереди: {waiting}')
+
+    def run(self, job, options):
+        self.stdout.write(f'{job}: {job.total} строк')
+        started = time.perf_counter()
+        self.reported = started
+        try:
+            run_job(job, options['chunk_size'], options['pause'],
+                    progress=self.progress)
+        except Exception:
+            self.stderr.write(f'{job}: {job.last_error}')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'{job}: удалено за {time.perf_counter() - started:.1f} с'))
+
+    def progress(self, job):
+        # Не чаще раза в секунду
+        now = time.perf_counter()
+        if now - self.reported < 1:
+            return
+        self.reported = now
+        self.stdout.write(
+            f'  {job.stage}: {job.processed}/{job.total} '
+            f'({job.progress}%)')
@@ -0,0 +1,187 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from posts import seeding, sharding
+from posts.models import Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит авторов между шардами постов, пока число постов на '
+        'шардах не выровняется (или одного автора с --author/--to)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--author', help='Имя автора для переноса')
+        parser.add_argument('--to', help='Шард, куда перенести автора')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.1,
+            help='Допустимое отклонение шарда от среднего, доля')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать план переноса')
+
+    def handle(self, *args, **options):
+        aliases = sharding.shards()
+        if not aliases:
+            raise CommandError('POST_SHARDS пуст: шардирование выключено')
+        authors = self.authors_by_shard(aliases)
+        if options['author']:
+            moves = [self.manual_move(options, aliases, authors)]
+        else:
+            moves = self.plan(authors, options['tolerance'])
+        for author_id, source, target, posts in moves:
+            self.stdout.write(
+                f'Автор {author_id}: {source} → {target}, постов {posts}')
+            if not options['dry_run']:
+                self.move(author_id, source, target, options['batch_size'])
+        loads = self.loads(self.authors_by_shard(aliases)
+                           if moves and not options['dry_run'] else authors)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено авторов: {len(moves)}; постов на шардах: '
+            + ', '.join(f'{alias} {load}' for alias, load in loads.items())
+        ))
+
+    def authors_by_shard(self, aliases):
+        """Фактическое число постов каждого автора на каждом шарде."""
+        counts = sharding.scatter(lambda alias: dict(
+            Post.objects.using(alias).order_by().values_list('author_id')
+            .annotate(total=Count('pk'))
+        ), aliases)
+        return dict(zip(aliases, counts))
+
+    @staticmethod
+    def loads(authors):
+        return {alias: sum(counts.values())
+                for alias, counts in authors.items()}
+
+    def manual_move(self, options, aliases, authors):
+        if options['to'] not in aliases:
+            raise CommandError(f'Шарды: {", ".join(aliases)}')
+        user = User.objects.filter(username=options['author']).first()
+        if user is None:
+            raise CommandError(f'Нет автора {options["author"]}')
+        source = sharding.shard_for_author(user.pk)
+        if source == options['to']:
+            raise CommandError(f'Автор уже на шарде {source}')
+        return user.pk, source, options['to'], authors[source].get(user.pk, 0)
+
+    def plan(self, authors, tolerance):
+        """Жадный план переноса, пока перекос больше допустимого.
+
+        Каждый шаг переносит крупнейшего подходящего автора с самого
+        загруженного шарда на самый свободный.
+        """
+        authors = {alias: dict(counts) for alias, counts in authors.items()}
+        loads = self.loads(authors)
+        average = sum(loads.values()) / len(loads)
+        moves = []
+        while True:
+            source = max(loads, key=loads.get)
+            target = min(loads, key=loads.get)
+            gap = loads[source] - loads[target]
+            if gap <= tolerance * average:
+                return moves
+            # Перенос не должен сделать приёмник тяжелее источника
+            candidates = [
+                (posts, author_id)
+                for author_id, posts in authors[source].items()
+                if posts <= gap / 2
+            ]
+            if not candidates:
+                return moves
+            posts, author_id = max(candidates)
+            moves.append((author_id, source, target, posts))
+            authors[target][author_id] = authors[source].pop(author_id)
+            loads[source] -= posts
+            loads[target] += posts
+
+    def move(self, author_id, source, target, batch_size):
+        """Копия постов на новый шард, переключение карты, удаление копии.
+
+        Сразу после переключения карты кеш шардов постов указывает на
+        новый шард, и правки идут уже туда. Посты, которые во время
+        копирования опубликовали, изменили или удалили на старом шарде,
+        затем докопируются, копируются заново или удаляются с нового.
+        """
+        started = timezone.now()
+        last_pk = self.copy(author_id, source, target, batch_size, 0)
+        sharding.set_author_shard(author_id, target)
+        cache.set_many({
+            f'{sharding.POST_SHARD_PREFIX}{pk}': target
+            for pk in Post._base_manager.using(source).filter(
+                author_id=author_id).values_list('pk', flat=True)
+        }, None)
+        self.copy(author_id, source, target, batch_size, last_pk)
+        self.sync_changed(author_id, source, target, last_pk, started)
+        with connections[source].cursor() as cursor:
+            # Без сигналов удаления: посты не исчезают, счётчики не меняются
+            cursor.execute(
+                f'DELETE FROM {Post._meta.db_table} WHERE author_id = %s',
+                [author_id])
+
+    @staticmethod
+    def select(alias, where, params):
+        """Строки постов как есть, мимо ORM: (имена полей, кортежи)."""
+        concrete = Post._meta.concrete_fields
+        connection = connections[alias]
+        quote = connection.ops.quote_name
+        sql = (
+            f'SELECT {", ".join(quote(field.column) for field in concrete)} '
+            f'FROM {quote(Post._meta.db_table)} WHERE {where}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [field.name for field in concrete], cursor.fetchall()
+
+    def copy(self, author_id, source, target, batch_size, after_pk):
+        # Строки копируются как есть: bulk_create перезаписал бы даты
+        # auto_now и пересчитал счётчики уже учтённых постов
+        while True:
+            fields, rows = self.select(
+                source, 'author_id = %s AND id > %s ORDER BY id LIMIT %s',
+                [author_id, after_pk, batch_size])
+            if not rows:
+                return after_pk
+            seeding.insert_rows(Post, fields, rows, using=target)
+            after_pk = rows[-1][fields.index('id')]
+            if len(rows) < batch_size:
+                return after_pk
+
+    def sync_changed(self, author_id, source, target, last_pk, started):
+        """Правки и удаления на старом шарде за время первого копирования.
+
+        Изменённый после started пост копируется заново, если на новом
+        шарде его с тех пор не правили; пост, которого на старом шарде
+        больше нет, удаляется и с нового.
+        """
+        since = connections[source].ops.adapt_datetimefield_value(started)
+        fields, changed = self.select(
+            source, 'author_id = %s AND id <= %s AND updated_at >= %s',
+            [author_id, last_pk, since])
+        pk, updated_at = fields.index('id'), fields.index('updated_at')
+        _, copies = self.select(
+            target, 'author_id = %s AND id <= %s', [author_id, last_pk])
+        copies = {row[pk]: row[updated_at] for row in copies}
+        changed = [
+            row for row in changed
+            if row[updated_at] > copies.get(row[pk], row[updated_at])
+        ]
+        remaining = set(Post._base_manager.using(source).filter(
+            author_id=author_id, pk__lte=last_pk).values_list('pk', flat=True))
+        stale = [row[pk] for row in changed] + [
+            post_id for post_id in copies if post_id not in remaining]
+        if stale:
+            with transaction.atomic(using=target):
+                with connections[target].cursor() as cursor:
+                    cursor.execute(
+                        f'DELETE FROM {Post._meta.db_table} WHERE id IN '
+                        f'({", ".join(["%s"] * len(stale))})', stale)
+                seeding.insert_rows(Post, fields, changed, using=target)
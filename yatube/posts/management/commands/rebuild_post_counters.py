@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов авторов и групп'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить счётчики, ничего не исправляя',
+        )
+
+    def handle(self, *args, **options):
+        check = options['check']
+        with transaction.atomic():
+            mismatches = rebuild_counters(fix=not check)
+        for kind, pk, stored, expected in mismatches:
+            self.stdout.write(f'{kind} {pk}: {stored} -> {expected}')
+        if check and mismatches:
+            raise CommandError(
+                f'Расхождений в счётчиках: {len(mismatches)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: {len(mismatches)}'
+            if mismatches else 'Счётчики совпадают'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.fts import install_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов (FTS5)'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Индекс FTS5 есть только у SQLite')
+        if install_search_index(connection):
+            self.stdout.write('Восстановлены триггеры индекса')
+        else:
+            rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS('Индекс перестроен'))
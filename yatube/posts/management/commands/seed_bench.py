@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections
+
+from posts import seeding
+from posts.fts import drop_search_index, install_search_index
+from posts.models import AuthorCounter, Group, Post
+from posts.sharding import sharding_enabled
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет пустую базу синтетическими пользователями, группами и '
+        'постами с реалистичным перекосом активности для нагрузочных '
+        'замеров'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--groups', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Число процессов; 0 — всё в текущем процессе',
+        )
+        parser.add_argument('--chunk-size', type=int, default=50000)
+        parser.add_argument(
+            '--author-skew', type=float, default=1.1,
+            help='Показатель Zipf для активности авторов')
+        parser.add_argument(
+            '--group-skew', type=float, default=0.9,
+            help='Показатель Zipf для размеров групп')
+        parser.add_argument(
+            '--group-share', type=float, default=0.7,
+            help='Доля постов, опубликованных в группах')
+        parser.add_argument(
+            '--days', type=int, default=730,
+            help='За сколько дней разбросаны даты публикации')
+        parser.add_argument(
+            '--now', type=seeding.parse_now, default=seeding.EPOCH,
+            help='Дата, от которой отсчитываются даты публикации '
+                 '(ISO 8601, по умолчанию 2024-01-01)')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь')
+        if sharding_enabled():
+            raise CommandError(
+                'seed_bench пишет посты в основную базу в обход ORM и '
+                'при шардировании (POST_SHARDS) не работает')
+        if any(model.objects.exists() for model in (User, Group, Post)):
+            raise CommandError(
+                'seed_bench заполняет только пустую базу: id строк '
+                'задаются заранее')
+        started = time.perf_counter()
+        now = options['now']
+        seeding.insert_rows(Group, seeding.GROUP_FIELDS, (
+            (pk, f'Группа {pk}', f'group-{pk}', 'Сгенерированная группа', 0)
+            for pk in range(1, options['groups'] + 1)
+        ))
+        # Индексы, триггеры поиска и счётчики дешевле построить один
+        # раз в конце, чем обновлять на каждую вставленную строку
+        self.set_derived(enabled=False)
+        try:
+            self.run(options, now, [
+                (seeding.seed_users, options['users'], 'пользователей'),
+                (seeding.seed_posts, options['posts'], 'постов'),
+            ])
+        finally:
+            # И после ошибки или Ctrl+C база не остаётся без индексов
+            self.stdout.write('Индексы, поиск и счётчики...')
+            self.set_derived(enabled=True)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {elapsed:.0f} с: пользователей {options["users"]}, '
+            f'групп {options["groups"]}, постов {options["posts"]}'
+        ))
+
+    def run(self, options, now, steps):
+        if not options['workers']:
+            seeding.init_worker(options, now, forked=False)
+            for func, total, label in steps:
+                self.run_step(label, total, (
+                    func(*chunk)
+                    for chunk in seeding.chunks(total, options['chunk_size'])
+                ))
+            return
+        connections.close_all()
+        with ProcessPoolExecutor(
+            options['workers'],
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=seeding.init_worker,
+            initargs=(options, now),
+        ) as pool:
+            for func, total, label in steps:
+                futures = [
+                    pool.submit(func, *chunk)
+                    for chunk in seeding.chunks(total, options['chunk_size'])
+                ]
+                self.run_step(label, total, (
+                    future.result() for future in as_completed(futures)))
+
+    def run_step(self, label, total, results):
+        started = time.perf_counter()
+        done = 0
+        for rows in results:
+            done += rows
+            rate = done / (time.perf_counter() - started)
+            self.stdout.write(
+                f'  {label}: {done}/{total}, {rate:.0f} строк/с')
+
+    def set_derived(self, enabled):
+        with connection.schema_editor() as editor:
+            for index in Post._meta.indexes:
+                if enabled:
+                    editor.add_index(Post, index)
+                else:
+                    editor.remove_index(Post, index)
+        if not enabled:
+            drop_search_index(connection)
+            return
+        install_search_index(connection)
+        self.rebuild_counters()
+        with connection.cursor() as cursor:
+            # id вставлялись явно, последовательности нужно догнать
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [User, Group, Post]):
+                cursor.execute(sql)
+            cursor.execute('ANALYZE')
+
+    def rebuild_counters(self):
+        quote = connection.ops.quote_name
+        posts = quote(Post._meta.db_table)
+        counters = quote(AuthorCounter._meta.db_table)
+        groups = quote(Group._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {counters}')
+            cursor.execute(
+                f'INSERT INTO {counters} (author_id, posts_count, '
+                f'followers_count, fanout_on_read) '
+                f'SELECT author_id, COUNT(*), 0, 0 FROM {posts} '
+                f'GROUP BY author_id'
+            )
+            cursor.execute(
+                f'UPDATE {groups} SET posts_count = (SELECT COUNT(*) '
+                f'FROM {posts} WHERE {posts}.group_id = {groups}.id), '
+                f'last_pub_date = (SELECT MAX(pub_date) '
+                f'FROM {posts} WHERE {posts}.group_id = {groups}.id)'
+            )
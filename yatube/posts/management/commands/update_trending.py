@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import refresh
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинги постов с новой активностью и топы '
+        '«Популярного» (общий и по группам)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать все посты, а не только изменённые')
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять пересчёт раз в столько секунд')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            started = time.perf_counter()
+            posts, lists = refresh(full=full)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Пересчитано постов: {posts}, топов: {lists} '
+                f'за {elapsed * 1000:.0f} мс')
+            if not options['interval']:
+                return
+            full = False
+            time.sleep(options['interval'])
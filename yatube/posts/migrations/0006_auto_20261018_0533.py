@@ -0,0 +1,50 @@
+# Generated by Django 2.2.19 on 2026-10-18 05:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorCounter = apps.get_model('posts', 'AuthorCounter')
+    authors = (
+        Post.objects.order_by().values_list('author_id')
+        .annotate(total=Count('pk'))
+    )
+    AuthorCounter.objects.bulk_create(
+        AuthorCounter(author_id=author_id, posts_count=total)
+        for author_id, total in authors
+    )
+    groups = (
+        Post.objects.order_by().filter(group__isnull=False)
+        .values_list('group_id').annotate(total=Count('pk'))
+    )
+    for group_id, total in groups:
+        Group.objects.filter(pk=group_id).update(posts_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0005_auto_20230312_1519'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorCounter',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_counter', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.19 on 2026-10-18 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Каждый индекс строится и фиксируется отдельно: блокировка записи
+    # держится только на время одного CREATE INDEX, а сбой не откатывает
+    # уже построенные индексы.
+    atomic = False
+
+    dependencies = [
+        ('posts', '0006_auto_20261018_0533'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='post',
+            options={'ordering': ['-pub_date', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date', '-id'], name='post_pub_date_idx'),
+        ),
+        migrations.RunSQL('ANALYZE posts_post', migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.19 on 2026-10-18 06:30
+
+from django.db import migrations
+
+from posts.fts import drop_search_index, install_search_index
+
+
+def forwards(apps, schema_editor):
+    install_search_index(schema_editor.connection)
+
+
+def backwards(apps, schema_editor):
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
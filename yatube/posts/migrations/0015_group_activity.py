@@ -0,0 +1,39 @@
+# Generated by Django 2.2.19 on 2026-10-18 06:18
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def fill_last_pub_date(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    groups = (
+        Post.objects.order_by().filter(group__isnull=False)
+        .values_list('group_id').annotate(last=Max('pub_date'))
+    )
+    for group_id, last in groups:
+        Group.objects.filter(pk=group_id).update(last_pub_date=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_trending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='last_pub_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Последняя публикация'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-posts_count', '-id'], name='group_posts_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['-last_pub_date', '-id'], name='group_last_pub_date_idx'),
+        ),
+        migrations.RunPython(fill_last_pub_date, migrations.RunPython.noop),
+    ]
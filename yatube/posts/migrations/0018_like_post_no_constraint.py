@@ -0,0 +1,19 @@
+# Generated by Django 2.2.19 on 2026-10-18 06:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_timeline_post_no_constraint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='like',
+            name='post',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='posts.Post', verbose_name='Пост'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.19 on 2026-10-18 07:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_like_post_no_constraint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postscore',
+            name='post',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='posts.Post', verbose_name='Пост'),
+        ),
+    ]
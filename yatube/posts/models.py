@@ -1,5 +1,11 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F, Q
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .cache import feed_tags, invalidate_tags
+from .counters import apply_post_deltas
+from .storage import content_hash_storage
 
 User = get_user_model()
 
@@ -8,17 +14,105 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False,
+    )
+    last_pub_date = models.DateTimeField(
+        'Последняя публикация',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+
+    class Meta:
+        # Каталог групп сортируется по этим полям без GROUP BY по постам
+        indexes = [
+            models.Index(
+                fields=['-posts_count', '-id'],
+                name='group_posts_count_idx',
+            ),
+            models.Index(
+                fields=['-last_pub_date', '-id'],
+                name='group_last_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class AuthorCounter(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_counter',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+    )
+    # Посты автора читаются в ленты подписок при показе, а не
+    # раскладываются при публикации (posts.timeline)
+    fanout_on_read = models.BooleanField(
+        'Лента подписок при чтении',
+        default=False,
+    )
+
+    def __str__(self):
+        return f'{self.author_id}: {self.posts_count}'
+
+    @classmethod
+    def posts_count_for(cls, author):
+        count = cls.objects.filter(author=author).values_list(
+            'posts_count', flat=True).first()
+        return count or 0
+
+
+class PostQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        # Без явного .using() базу выбирает роутер по самому посту: при
+        # шардировании это шард автора
+        if self._db is not None:
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True)
+        return obj
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .sharding import sharding_enabled, split_by_shard
+
+        # Без явного .using() посты раскладываются по шардам авторов,
+        # как в create()
+        if self._db is None and sharding_enabled():
+            objs = list(objs)
+            for alias, posts in split_by_shard(objs).items():
+                self.using(alias).bulk_create(posts, *args, **kwargs)
+            return objs
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            apply_post_deltas(objs)
+            invalidate_tags(*{
+                tag for post in objs
+                for tag in feed_tags(post.author_id, post.group_id)
+            })
+        return objs
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -33,9 +127,308 @@ class Post(models.Model):
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост',
     )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        storage=content_hash_storage,
+        blank=True,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['updated_at'],
+                name='post_updated_at_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Группа на момент загрузки: по ней сигналы узнают о переносе поста
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        instance._loaded_image = instance.__dict__.get('image')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Счётчики обновляются в post_save внутри той же транзакции; при
+        # шардировании транзакция открывается в базе шарда
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+        self._loaded_group_id = self.group_id
+        self._loaded_image = self.image.name
+
+
+class AuthorShard(models.Model):
+    """Карта шардов: в какой базе лежат посты автора (posts.sharding)."""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_shard',
+        verbose_name='Автор'
+    )
+    shard = models.CharField('Шард', max_length=100)
+
+    def __str__(self):
+        return f'{self.author_id}: {self.shard}'
+
+
+class PostIdSequence(models.Model):
+    """Источник id постов на шардах: автоинкремент основной базы.
+
+    У каждого шарда свой автоинкремент, и id постов разных авторов
+    совпадали бы; здесь id выдаются один раз на все шарды.
+    """
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+    created = models.DateTimeField('Дата подписки', auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'),
+            models.CheckConstraint(
+                check=~Q(user=F('author')), name='no_self_follow'),
+        ]
+        indexes = [
+            # Подписчики автора для раскладки нового поста
+            models.Index(fields=['author', 'user'], name='follow_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} → {self.author_id}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя.
+
+    Дата и автор поста повторены здесь, чтобы лента читалась по
+    индексу (user, pub_date) без соединения с постами, а отписка
+    удаляла записи автора одним запросом.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    # Без внешнего ключа в базе: при шардировании пост лежит на шарде
+    # автора, а лента — в основной базе
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='+',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_post'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'),
+        ]
+
+
+class PostCounter(models.Model):
+    """Просмотры и лайки поста, записанные из буфера posts.hits.
+
+    Без внешнего ключа в базе: буфер может сбросить приращения уже
+    удалённого поста, и пачка не должна из-за этого откатываться.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_constraint=False,
+        related_name='counter',
+        verbose_name='Пост'
+    )
+    views_count = models.PositiveIntegerField('Просмотры', default=0)
+    likes_count = models.PositiveIntegerField('Лайки', default=0)
+    # По нему posts.trending находит посты с новой активностью
+    updated_at = models.DateTimeField(
+        'Дата изменения', auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.post_id}: {self.views_count}/{self.likes_count}'
+
+
+class Like(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пользователь'
+    )
+    # Без внешнего ключа в базе, как у TimelineEntry: посты бывают на
+    # шардах
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name='likes',
+        verbose_name='Пост'
+    )
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_like'),
+        ]
+
+
+class PostScore(models.Model):
+    """Рейтинг поста для «Популярного», считает posts.trending."""
+    # Без внешнего ключа в базе, как у Like: посты бывают на шардах
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_constraint=False,
+        related_name='score',
+        verbose_name='Пост'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='+',
+        verbose_name='Группа'
+    )
+    score = models.FloatField('Рейтинг')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='post_score_idx'),
+            models.Index(
+                fields=['group', '-score'], name='post_score_group_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.3f}'
+
+
+class TrendingList(models.Model):
+    """Готовый топ популярных постов: общий или одной группы.
+
+    id постов хранятся подряд 8-байтными числами, так что список из
+    сотни постов читается одной строкой и не требует сортировки.
+    """
+    key = models.CharField('Ключ', max_length=50, primary_key=True)
+    post_ids = models.BinaryField('id постов')
+    computed_at = models.DateTimeField('Дата расчёта')
+
+    def __str__(self):
+        return self.key
+
+
+class DeletionJob(models.Model):
+    """Фоновое удаление автора или группы пачками (posts.deletion).
+
+    Админка только ставит задачу, записи удаляет или отвязывает команда
+    process_deletions.
+    """
+    USER = 'user'
+    GROUP = 'group'
+    KIND_CHOICES = (
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Завершено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField('Что удаляется', max_length=10,
+                            choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField('id объекта')
+    label = models.CharField('Объект', max_length=255)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    stage = models.CharField('Этап', max_length=50, blank=True)
+    processed = models.PositiveIntegerField('Обработано строк', default=0)
+    total = models.PositiveIntegerField('Всего строк', default=0)
+    lease_until = models.DateTimeField(
+        'Занято обработчиком до', default=timezone.now)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    finished_at = models.DateTimeField('Завершено', null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        verbose_name = 'Фоновое удаление'
+        verbose_name_plural = 'Фоновые удаления'
+        indexes = [
+            models.Index(
+                fields=['status', 'lease_until'],
+                name='deletion_status_lease_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.label}'
+
+    @property
+    def progress(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(99, self.processed * 100 // self.total)
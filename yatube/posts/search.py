@@ -0,0 +1,104 @@
+import heapq
+import itertools
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models.expressions import RawSQL
+
+from .fts import FTS_TABLE
+from .models import Post
+from .sharding import posts_on_shards, scatter, sharding_enabled, shards
+
+
+def search_supported():
+    return connection.vendor == 'sqlite'
+
+
+def fts_query(text):
+    """Запрос FTS5 из пользовательской строки.
+
+    Каждое слово берётся в кавычки, поэтому операторы и служебные
+    символы FTS5 в тексте запроса не ломают MATCH.
+    """
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', text))
+
+
+def filter_by_search(queryset, text):
+    """Фильтр по тексту поста через индекс FTS5 (или LIKE вне SQLite)."""
+    if not search_supported():
+        return queryset.filter(text__icontains=text)
+    match = fts_query(text)
+    if not match:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match],
+    ))
+
+
+class PostSearch:
+    """Выдача поиска по релевантности (bm25) для Paginator.
+
+    Paginator нужны только count() и срезы: срез выбирает из индекса
+    id одной страницы, а посты догружаются одним запросом. При
+    шардировании у каждого шарда свой индекс: шарды отдают по срезу
+    совпадений, и они сливаются по рангу. bm25 считается по статистике
+    своего шарда, так что на стыке шардов порядок приблизительный.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.match = fts_query(text) if search_supported() else None
+        self.fallback = None
+        if not search_supported():
+            self.fallback = filter_by_search(
+                Post.objects.select_related('author', 'group'), text)
+        self.aliases = shards() or [DEFAULT_DB_ALIAS]
+
+    def count(self):
+        if self.fallback is not None:
+            return self.fallback.count()
+        if not self.match:
+            return 0
+        return sum(scatter(self.shard_count, self.aliases))
+
+    def shard_count(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked(self, alias, limit, offset=0):
+        """(ранг, id, шард) совпадений по убыванию релевантности."""
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rank, rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, limit, offset],
+            )
+            return [(rank, pk, alias) for rank, pk in cursor.fetchall()]
+
+    def __getitem__(self, index):
+        if self.fallback is not None:
+            return self.fallback[index]
+        if not isinstance(index, slice):
+            raise TypeError('PostSearch поддерживает только срезы')
+        start = index.start or 0
+        if not self.match or index.stop <= start:
+            return []
+        if not sharding_enabled():
+            hits = self.ranked(DEFAULT_DB_ALIAS, index.stop - start, start)
+            ids = [pk for _, pk, _ in hits]
+            posts = Post.objects.select_related('author', 'group').in_bulk(
+                ids)
+            return [posts[pk] for pk in ids if pk in posts]
+        streams = scatter(
+            lambda alias: self.ranked(alias, index.stop), self.aliases)
+        hits = list(itertools.islice(heapq.merge(*streams), start,
+                                     index.stop))
+        posts = posts_on_shards((pk, alias) for _, pk, alias in hits)
+        return [posts[pk] for _, pk, _ in hits if pk in posts]
@@ -0,0 +1,157 @@
+"""Генерация синтетических данных для нагрузочных замеров (seed_bench).
+
+Каждая пачка строк строится из собственного генератора со стартовым
+значением «seed:вид:номер пачки» и получает заранее известный диапазон
+id, поэтому результат не зависит от числа процессов и порядка, в
+котором они закончат работу.
+"""
+import itertools
+import math
+import random
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import (
+    DEFAULT_DB_ALIAS, connection, connections, transaction,
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+WORDS = (
+    'город', 'река', 'поезд', 'осень', 'кофе', 'книга', 'музыка', 'снег',
+    'работа', 'проект', 'дорога', 'море', 'лес', 'вечер', 'утро', 'друг',
+    'фильм', 'кошка', 'сад', 'ветер', 'гора', 'письмо', 'окно', 'рынок',
+    'день', 'время', 'дом', 'слово', 'мысль', 'вопрос', 'ответ', 'дело',
+)
+
+
+class Zipf:
+    """Выбор ранга 0..n-1 с вероятностью, пропорциональной 1/(k+1)^s.
+
+    Ранг переводится в номер объекта перестановкой (k * step) mod n,
+    чтобы самые активные авторы и самые большие группы не шли подряд
+    с первыми id.
+    """
+
+    def __init__(self, n, s):
+        self.n = n
+        self.cum_weights = list(itertools.accumulate(
+            1 / (k ** s) for k in range(1, n + 1)))
+        self.step = next(
+            step for step in range(n // 2 + 1, 2 * n + 2)
+            if math.gcd(step, n) == 1
+        )
+
+    def sample(self, rnd):
+        total = self.cum_weights[-1]
+        rank = bisect_left(self.cum_weights, rnd.random() * total)
+        return rank * self.step % self.n
+
+
+def chunk_random(seed, kind, number):
+    return random.Random(f'{seed}:{kind}:{number}')
+
+
+def insert_rows(model, fields, rows, using=DEFAULT_DB_ALIAS):
+    """Вставка строк одним executemany в обход ORM.
+
+    bulk_create ограничен числом параметров SQLite и собирает модели;
+    здесь в памяти только кортежи значений.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in fields]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(map(quote, columns)),
+        ', '.join(['%s'] * len(columns)),
+    )
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def user_rows(seed, number, start, size, now):
+    rnd = chunk_random(seed, 'users', number)
+    joined = connection.ops.adapt_datetimefield_value
+    for pk in range(start + 1, start + size + 1):
+        date_joined = now - timedelta(seconds=rnd.randrange(3 * 365 * 86400))
+        yield (pk, '!', False, f'user{pk}', '', '', '', False, True,
+               joined(date_joined))
+
+
+GROUP_FIELDS = ('id', 'title', 'slug', 'description', 'posts_count')
+USER_FIELDS = ('id', 'password', 'is_superuser', 'username', 'first_name',
+               'last_name', 'email', 'is_staff', 'is_active', 'date_joined')
+POST_FIELDS = ('id', 'text', 'pub_date', 'updated_at', 'author', 'group',
+               'image')
+
+
+def post_rows(options, number, start, size, authors, groups, now):
+    """Посты пачки: авторы и группы по Zipf, даты тяготеют к недавним."""
+    rnd = chunk_random(options['seed'], 'posts', number)
+    adapt = connection.ops.adapt_datetimefield_value
+    spread = options['days'] * 86400
+    for pk in range(start + 1, start + size + 1):
+        words = max(3, int(rnd.lognormvariate(3, 0.7)))
+        pub_date = adapt(
+            now - timedelta(seconds=int(spread * rnd.random() ** 2)))
+        group = None
+        if groups and rnd.random() < options['group_share']:
+            group = groups.sample(rnd) + 1
+        yield (pk, ' '.join(rnd.choices(WORDS, k=words)), pub_date,
+               pub_date, authors.sample(rnd) + 1, group, '')
+
+
+_state = {}
+
+
+def init_worker(options, now, forked=True):
+    if forked:
+        # Соединение родителя после fork не переиспользуется
+        connection.close()
+        if connection.vendor == 'sqlite':
+            # Пишет один процесс за раз, остальные ждут блокировку
+            connection.settings_dict['OPTIONS']['timeout'] = 600
+    _state['options'] = options
+    _state['now'] = now
+    _state['authors'] = Zipf(options['users'], options['author_skew'])
+    if options['groups']:
+        _state['groups'] = Zipf(options['groups'], options['group_skew'])
+
+
+def seed_users(number, start, size):
+    options = _state['options']
+    insert_rows(get_user_model(), USER_FIELDS, user_rows(
+        options['seed'], number, start, size, _state['now']))
+    return size
+
+
+def seed_posts(number, start, size):
+    Post = apps.get_model('posts', 'Post')
+    insert_rows(Post, POST_FIELDS, post_rows(
+        _state['options'], number, start, size, _state['authors'],
+        _state.get('groups'), _state['now']))
+    return size
+
+
+def chunks(total, size):
+    """Пачки (номер, первый id - 1, размер) для total строк."""
+    for number, start in enumerate(range(0, total, size)):
+        yield number, start, min(size, total - start)
+
+
+# Точка отсчёта дат по умолчанию: с часами тот же seed давал бы каждый
+# раз другие pub_date
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_now(value):
+    """Значение --now: дата ISO 8601, без зоны — в текущей зоне."""
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
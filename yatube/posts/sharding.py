@@ -0,0 +1,341 @@
+"""Шардирование постов по автору (settings.POST_SHARDS).
+
+Все посты автора лежат в одной базе-шарде, записанной в карте
+AuthorShard. Пользователи, группы, счётчики и сама карта остаются в
+основной базе. Ленты собираются со всех шардов параллельно и сливаются
+по дате публикации; профиль и страница поста читают один шард. Пустой
+POST_SHARDS — посты в основной базе, как без шардирования.
+
+Пока шардированы страницы сайта, API, RSS, выгрузка, поиск,
+популярное, запись, массовая вставка (bulk_create, import_posts) и
+удаление постов, удаление авторов и групп, ленты подписок и лайки;
+seed_bench при шардировании не запускается.
+"""
+import heapq
+import itertools
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import (
+    DEFAULT_DB_ALIAS, close_old_connections, router, transaction,
+)
+from django.db.models import Max, prefetch_related_objects
+from django.http import Http404
+
+from .models import AuthorShard, Post, PostIdSequence, User
+from .utils import CursorPaginator
+
+AUTHOR_SHARD_PREFIX = 'author_shard:'
+POST_SHARD_PREFIX = 'post_shard:'
+
+_executor = None
+
+
+def shards():
+    return list(getattr(settings, 'POST_SHARDS', []))
+
+
+def sharding_enabled():
+    return bool(shards())
+
+
+def default_shard(author_id):
+    aliases = shards()
+    return aliases[author_id % len(aliases)]
+
+
+def shard_for_author(author_id, assign=False):
+    """Шард автора по карте; assign закрепляет шард за новым автором.
+
+    Автор без записи в карте ещё ничего не публиковал, поэтому для
+    чтения хватает шарда по умолчанию, а в карту он попадает при
+    первой записи.
+    """
+    key = f'{AUTHOR_SHARD_PREFIX}{author_id}'
+    alias = cache.get(key)
+    if alias is not None:
+        return alias
+    alias = AuthorShard.objects.filter(author_id=author_id).values_list(
+        'shard', flat=True).first()
+    if alias is None:
+        if not assign:
+            return default_shard(author_id)
+        shard, _ = AuthorShard.objects.get_or_create(
+            author_id=author_id,
+            defaults={'shard': default_shard(author_id)},
+        )
+        alias = shard.shard
+    cache.set(key, alias, None)
+    return alias
+
+
+def author_posts(author_id):
+    """Посты автора: при шардировании — с его шарда."""
+    posts = Post.objects.filter(author_id=author_id)
+    if sharding_enabled():
+        posts = posts.using(shard_for_author(author_id))
+    return posts
+
+
+def on_shards(queryset):
+    """Queryset постов на каждом шарде, где могут быть его строки.
+
+    Запрос, уже привязанный к шарду (author_posts), запрос других
+    моделей и запрос без шардирования остаются как есть.
+    """
+    if (not sharding_enabled() or queryset.model is not Post
+            or queryset.db in shards()):
+        return [queryset]
+    return [queryset.using(alias) for alias in shards()]
+
+
+def set_author_shard(author_id, alias):
+    AuthorShard.objects.update_or_create(
+        author_id=author_id, defaults={'shard': alias})
+    cache.set(f'{AUTHOR_SHARD_PREFIX}{author_id}', alias, None)
+
+
+def allocate_post_id():
+    """Новый id поста, уникальный для всех шардов."""
+    return allocate_post_ids(1)[0]
+
+
+def allocate_post_ids(count):
+    """count id подряд, уникальных для всех шардов."""
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        first = PostIdSequence.objects.create().pk
+        last = first + count - 1
+        if last > first:
+            # Строка с явным id сдвигает автоинкремент за конец диапазона
+            PostIdSequence.objects.create(pk=last)
+        # Автоинкремент не выдаёт id повторно, старые строки не нужны
+        PostIdSequence.objects.filter(pk__lt=last).delete()
+    return range(first, last + 1)
+
+
+def split_by_shard(posts):
+    """Новые посты по шардам авторов, с id из общей последовательности."""
+    new = [post for post in posts if post.pk is None]
+    if new:
+        for post, pk in zip(new, allocate_post_ids(len(new))):
+            post.pk = pk
+    by_shard = defaultdict(list)
+    for post in posts:
+        by_shard[shard_for_author(post.author_id, assign=True)].append(post)
+    return by_shard
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            settings.SHARD_WORKERS, thread_name_prefix='shard')
+    return _executor
+
+
+def _run(func, alias):
+    # Соединения потоков пула живут между запросами, как у обработчика
+    # запроса: устаревшие закрываются по CONN_MAX_AGE
+    close_old_connections()
+    return func(alias)
+
+
+def scatter(func, aliases=None):
+    """func(alias) на каждом шарде параллельно; результаты по порядку."""
+    aliases = shards() if aliases is None else aliases
+    if len(aliases) == 1:
+        return [func(aliases[0])]
+    return list(_pool().map(lambda alias: _run(func, alias), aliases))
+
+
+class ShardedPostList:
+    """Лента постов с шардов для PostPaginator: count() и срезы.
+
+    Для среза [a:b] каждый шард отдаёт свои первые b постов, потоки
+    сливаются по (pub_date, id), а авторы и группы догружаются из
+    основной базы двумя запросами на всю страницу.
+    """
+
+    def __init__(self, **filters):
+        self.filters = filters
+        author_id = filters.get('author_id')
+        self.aliases = (
+            [shard_for_author(author_id)] if author_id else shards())
+
+    def queryset(self, alias):
+        return Post.objects.using(alias).filter(**self.filters).order_by(
+            '-pub_date', '-pk')
+
+    def count(self):
+        return sum(scatter(
+            lambda alias: self.queryset(alias).count(), self.aliases))
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('ShardedPostList поддерживает только срезы')
+        start, stop = index.start or 0, index.stop
+        if stop <= start:
+            return []
+        streams = scatter(
+            lambda alias: list(self.queryset(alias)[:stop]), self.aliases)
+        merged = heapq.merge(
+            *streams, key=lambda post: (post.pub_date, post.pk),
+            reverse=True)
+        posts = list(itertools.islice(merged, start, stop))
+        prefetch_related_objects(posts, 'author', 'group')
+        return posts
+
+
+class ShardedCursorPaginator(CursorPaginator):
+    """Keyset-пагинация по querysets разных шардов.
+
+    Каждый шард отдаёт свои per_page + 1 строк после позиции курсора,
+    потоки сливаются по (pub_date, id).
+    """
+
+    def __init__(self, querysets, per_page):
+        self.querysets = {
+            queryset.db: queryset.order_by('-pub_date', '-pk')
+            for queryset in querysets
+        }
+        self.per_page = int(per_page)
+
+    def rows(self, condition, reverse=False):
+        def fetch(alias):
+            queryset = self.querysets[alias].filter(condition)
+            if reverse:
+                queryset = queryset.reverse()
+            return list(queryset[:self.per_page + 1])
+
+        merged = heapq.merge(
+            *scatter(fetch, list(self.querysets)), key=self._position,
+            reverse=not reverse)
+        return list(itertools.islice(merged, self.per_page + 1))
+
+
+def find_post(post_id):
+    """Пост по id с того шарда, где он лежит, или None."""
+    key = f'{POST_SHARD_PREFIX}{post_id}'
+    alias = cache.get(key)
+    if alias is not None:
+        post = Post.objects.using(alias).filter(pk=post_id).first()
+        if post is not None:
+            return post
+    found = [
+        post for post in scatter(
+            lambda alias: Post.objects.using(alias).filter(
+                pk=post_id).first())
+        if post is not None
+    ]
+    if not found:
+        return None
+    cache.set(key, found[0]._state.db, None)
+    return found[0]
+
+
+def posts_by_author(pairs):
+    """Посты по парам (id, автор) с шардов авторов: {id: пост}."""
+    aliases = {}
+    locations = []
+    for pk, author_id in pairs:
+        if author_id not in aliases:
+            aliases[author_id] = shard_for_author(author_id)
+        locations.append((pk, aliases[author_id]))
+    return posts_on_shards(locations)
+
+
+def posts_on_shards(locations):
+    """Посты по парам (id, шард): {id: пост} с авторами и группами."""
+    ids = defaultdict(list)
+    for pk, alias in locations:
+        ids[alias].append(pk)
+    posts = {}
+    for alias, pks in ids.items():
+        posts.update(Post.objects.using(alias).in_bulk(pks))
+    prefetch_related_objects(list(posts.values()), 'author', 'group')
+    return posts
+
+
+def posts_by_id(ids):
+    """Посты по id без известного шарда: запрос к каждому шарду."""
+    posts = {}
+    for found in scatter(
+            lambda alias: Post.objects.using(alias).in_bulk(ids)):
+        posts.update(found)
+    prefetch_related_objects(list(posts.values()), 'author', 'group')
+    return posts
+
+
+def get_post_or_404(post_id):
+    post = find_post(post_id)
+    if post is None:
+        raise Http404('Пост не найден')
+    prefetch_related_objects([post], 'author', 'group')
+    return post
+
+
+def last_update():
+    """Время последней записи постов по всем шардам."""
+    dates = [
+        date for date in scatter(lambda alias: Post.objects.using(
+            alias).aggregate(last=Max('updated_at'))['last'])
+        if date is not None
+    ]
+    return max(dates, default=None)
+
+
+def disable_foreign_keys(sender, connection, **kwargs):
+    # Авторы и группы постов шарда лежат в основной базе, на шарде их
+    # строк нет, и проверка внешних ключей отклонила бы каждую запись
+    if connection.vendor == 'sqlite' and connection.alias in shards():
+        connection.connection.execute('PRAGMA foreign_keys = OFF')
+
+
+class PostShardRouter:
+    """Посты — на шард автора; прочие модели решают следующие роутеры.
+
+    Запрос постов без подсказки (instance) роутер разместить не может:
+    такие выборки делаются явно через .using() или ShardedPostList.
+    """
+
+    def _routes(self, model):
+        return sharding_enabled() and model._meta.label == 'posts.Post'
+
+    @staticmethod
+    def _post_relation(model, hints):
+        # Автор или группа поста с шарда: сами они в основной базе, и
+        # подсказку instance остальным роутерам передавать нельзя
+        return (sharding_enabled() and model is not Post
+                and isinstance(hints.get('instance'), Post))
+
+    def db_for_read(self, model, **hints):
+        if self._post_relation(model, hints):
+            return router.db_for_read(model)
+        if not self._routes(model):
+            return None
+        instance = hints.get('instance')
+        if isinstance(instance, Post) and instance._state.db:
+            return instance._state.db
+        if isinstance(instance, User):
+            # Посты автора: user.posts.all()
+            return shard_for_author(instance.pk)
+        return None
+
+    def db_for_write(self, model, **hints):
+        if self._post_relation(model, hints):
+            return router.db_for_write(model)
+        if not self._routes(model):
+            return None
+        instance = hints.get('instance')
+        if not isinstance(instance, Post):
+            return None
+        if instance._state.db and not instance._state.adding:
+            return instance._state.db
+        return shard_for_author(instance.author_id, assign=True)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if sharding_enabled() and Post in (type(obj1), type(obj2)):
+            return True
+        return None
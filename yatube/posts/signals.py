@@ -0,0 +1,152 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+from sorl.thumbnail.images import ImageFile
+
+from .cache import feed_tags, invalidate_tags
+from . import hits
+from .counters import change_author_count, change_group_count
+from .deletion import delete_post_relations, detach_posts
+from .models import Group, Post
+from .sharding import (
+    allocate_post_id, author_posts, on_shards, sharding_enabled, shards,
+)
+from .thumbnails import schedule_thumbnails
+from .timeline import fan_out
+
+User = get_user_model()
+
+# Поля автора, которые выводятся в карточке поста
+AUTHOR_CARD_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(pre_save, sender=Post)
+def allocate_sharded_post_id(sender, instance, raw=False, **kwargs):
+    # У шардов свои автоинкременты: id выдаёт основная база
+    if not raw and instance.pk is None and sharding_enabled():
+        instance.pk = allocate_post_id()
+
+
+@receiver(post_save, sender=Post)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        change_author_count(instance.author_id, 1)
+        change_group_count(instance.group_id, 1, instance.pub_date)
+        return
+    if not hasattr(instance, '_loaded_group_id'):
+        return
+    if instance._loaded_group_id != instance.group_id:
+        change_group_count(instance._loaded_group_id, -1)
+        change_group_count(instance.group_id, 1, instance.pub_date)
+
+
+@receiver(post_delete, sender=Post)
+def update_counters_on_delete(sender, instance, **kwargs):
+    change_author_count(instance.author_id, -1)
+    change_group_count(instance.group_id, -1)
+
+
+@receiver(post_delete, sender=Post)
+def delete_relations_of_shard_post(sender, instance, using, **kwargs):
+    # Лайки, счётчики и записи лент поста лежат в основной базе, куда
+    # каскад удаления с шарда не доходит
+    if using in shards():
+        delete_post_relations([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def fan_out_to_timelines(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_cache_on_save(sender, instance, created, **kwargs):
+    tags = [f'post:{instance.pk}']
+    if created:
+        tags.extend(feed_tags(instance.author_id, instance.group_id))
+    elif (hasattr(instance, '_loaded_group_id')
+            and instance._loaded_group_id != instance.group_id):
+        for group_id in (instance._loaded_group_id, instance.group_id):
+            if group_id:
+                tags.append(f'feed:group:{group_id}')
+    invalidate_tags(*tags)
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, raw=False, **kwargs):
+    # Новая картинка: миниатюры готовятся заранее, а не при первом показе
+    if raw or not instance.image:
+        return
+    if getattr(instance, '_loaded_image', None) == instance.image.name:
+        return
+    schedule_thumbnails(
+        ImageFile(instance.image.name, instance.image.storage))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_post_cache_on_delete(sender, instance, **kwargs):
+    invalidate_tags(
+        f'post:{instance.pk}',
+        *feed_tags(instance.author_id, instance.group_id),
+    )
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_cache(sender, instance, created, **kwargs):
+    # slug: — страницы, закешированные по адресу /group/<slug>/, в том
+    # числе для прежней группы с тем же слагом; names — ETag лент, где
+    # выводятся названия групп и имена авторов
+    tags = [f'group:{instance.pk}', f'slug:{instance.slug}']
+    if not created:
+        tags.append('names')
+    invalidate_tags(*tags)
+
+
+@receiver(pre_delete, sender=Group)
+def detach_sharded_posts(sender, instance, **kwargs):
+    # SET_NULL сборщика доходит только до постов основной базы
+    if sharding_enabled():
+        for posts in on_shards(Post.objects.filter(group_id=instance.pk)):
+            detach_posts(posts)
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_group_cache_on_delete(sender, instance, **kwargs):
+    invalidate_tags('feed', 'names', f'group:{instance.pk}',
+                    f'feed:group:{instance.pk}', f'slug:{instance.slug}')
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cache(sender, instance, created, update_fields=None,
+                            **kwargs):
+    if update_fields is None or AUTHOR_CARD_FIELDS & set(update_fields):
+        tags = [f'author:{instance.pk}', f'username:{instance.username}']
+        if not created:
+            tags.append('names')
+        invalidate_tags(*tags)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_posts(sender, instance, **kwargs):
+    # Каскад удаления пользователя идёт в основной базе, а посты автора
+    # лежат на его шарде: они удаляются там же с сигналами и счётчиками
+    if sharding_enabled():
+        author_posts(instance.pk).delete()
+
+
+@receiver(post_delete, sender=User)
+def invalidate_author_cache_on_delete(sender, instance, **kwargs):
+    invalidate_tags('feed', 'names', f'author:{instance.pk}',
+                    f'feed:author:{instance.pk}',
+                    f'username:{instance.username}')
+
+
+@receiver(request_finished)
+def flush_post_counters(sender, **kwargs):
+    hits.flush_if_due()
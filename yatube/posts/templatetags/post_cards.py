@@ -0,0 +1,40 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.cache import count_event, post_tags, tags_version
+from posts.thumbnails import thumbnail
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/article.html'
+
+
+@register.simple_tag
+def post_card(post):
+    """Карточка поста из кеша фрагментов.
+
+    Ключ включает версию тегов поста, автора и группы, так что правка
+    любого из них делает старую карточку недостижимой.
+    """
+    key = 'post_card:{}:{}:{}'.format(
+        post.pk,
+        post.pub_date.timestamp(),
+        tags_version(post_tags(post)),
+    )
+    html = cache.get(key)
+    if html is not None:
+        count_event('post_card', 'hits')
+        return mark_safe(html)
+    count_event('post_card', 'misses')
+    html = render_to_string(CARD_TEMPLATE, {'post': post})
+    cache.set(key, str(html), settings.POST_CARD_CACHE_TIMEOUT)
+    return html
+
+
+@register.simple_tag
+def post_thumbnail(image, size='card'):
+    """Миниатюра картинки поста одного из размеров THUMBNAIL_SIZES."""
+    return thumbnail(image, size)
@@ -0,0 +1,127 @@
+import warnings
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..cache import cache_stats, invalidate_tags
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostCacheTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.index_url = reverse('posts:index')
+        self.profile_url = reverse(
+            'posts:profile', kwargs={'username': self.other.username})
+
+
+class PostCardCacheTests(PostCacheTestCase):
+    def test_card_served_from_cache(self):
+        """Повторный показ карточки берётся из кеша."""
+        self.authorized_client.get(self.index_url)
+        self.authorized_client.get(self.index_url)
+        stats = cache_stats('post_card')
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_post_edit_invalidates_card(self):
+        """Правка поста сбрасывает его карточку."""
+        self.authorized_client.get(self.index_url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        response = self.authorized_client.get(self.index_url)
+        self.assertContains(response, 'Новый текст')
+
+    def test_group_rename_invalidates_card(self):
+        """Смена слага группы меняет ссылку в карточке."""
+        self.authorized_client.get(self.index_url)
+        self.group.slug = 'new-slug'
+        self.group.save()
+        response = self.authorized_client.get(self.index_url)
+        self.assertContains(response, '/group/new-slug/')
+
+    def test_author_rename_invalidates_card(self):
+        """Смена имени автора видна в карточке."""
+        self.authorized_client.get(self.index_url)
+        self.user.first_name = 'Лев'
+        self.user.last_name = 'Толстой'
+        self.user.save()
+        response = self.authorized_client.get(self.index_url)
+        self.assertContains(response, 'Лев Толстой')
+
+
+class AnonymousPageCacheTests(PostCacheTestCase):
+    def test_page_served_from_cache(self):
+        """Повторный анонимный запрос отдаётся из кеша страниц."""
+        first = self.guest_client.get(self.index_url)
+        second = self.guest_client.get(self.index_url)
+        self.assertIsNotNone(first.context)
+        self.assertIsNone(second.context)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(cache_stats('page')['hits'], 1)
+
+    def test_authorized_user_bypasses_cache(self):
+        """Страница пользователя не попадает в кеш и не берётся из него."""
+        self.authorized_client.get(self.index_url)
+        response = self.guest_client.get(self.index_url)
+        self.assertNotContains(response, self.user.username + ' </li>')
+        self.assertContains(response, 'Войти')
+        self.authorized_client.get(self.index_url)
+        self.assertEqual(cache_stats('page')['hits'], 0)
+
+    def test_new_post_purges_affected_pages_only(self):
+        """Новый пост сбрасывает свои ленты, но не чужой профиль."""
+        self.guest_client.get(self.index_url)
+        self.guest_client.get(self.profile_url)
+        Post.objects.create(text='Свежий пост', author=self.user)
+        response = self.guest_client.get(self.index_url)
+        self.assertContains(response, 'Свежий пост')
+        response = self.guest_client.get(self.profile_url)
+        self.assertIsNone(response.context)
+
+    def test_post_edit_purges_pages_with_post(self):
+        """Правка поста сбрасывает страницы, где он показан."""
+        self.guest_client.get(self.index_url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный текст'
+        post.save()
+        response = self.guest_client.get(self.index_url)
+        self.assertContains(response, 'Исправленный текст')
+
+    def test_unicode_names_give_valid_keys(self):
+        """Теги с юникодными именами — допустимые ключи memcached."""
+        author = User.objects.create_user(username='Пётр Иванов')
+        url = reverse('posts:profile', kwargs={'username': author.username})
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            self.guest_client.get(url)
+            response = self.guest_client.get(url)
+            self.assertIsNone(response.context)
+            invalidate_tags(f'username:{author.username}')
+            response = self.guest_client.get(url)
+        self.assertIsNotNone(response.context)
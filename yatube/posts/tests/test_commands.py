@@ -0,0 +1,286 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import http_bench
+from .. import seeding
+from ..counters import rebuild_counters
+from ..fts import install_search_index
+from ..models import AuthorCounter, Group, Post
+from ..search import PostSearch
+
+User = get_user_model()
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def write(self, content, suffix):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def write_jsonl(self, rows):
+        return self.write(
+            ''.join(json.dumps(row) + '\n' for row in rows), '.jsonl')
+
+    def test_import_jsonl(self):
+        """Посты из JSONL создаются пачками вместе со счётчиками и индексом."""
+        path = self.write_jsonl([
+            {'text': f'Импорт {i}', 'author': 'TestUser', 'group': 'test-slug'}
+            for i in range(5)
+        ] + [{'text': 'Старый пост', 'author': 'TestUser',
+              'pub_date': '2020-01-02T03:04:05'}])
+        out = StringIO()
+        call_command('import_posts', path, '--batch-size', '2', stdout=out)
+        self.assertIn('Импортировано постов: 6', out.getvalue())
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertEqual(AuthorCounter.posts_count_for(self.user), 6)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 5)
+        self.assertEqual(PostSearch('импорт').count(), 5)
+        self.assertEqual(
+            Post.objects.get(text='Старый пост').pub_date,
+            timezone.make_aware(datetime(2020, 1, 2, 3, 4, 5)),
+        )
+
+    def test_import_csv(self):
+        """CSV с пустой группой импортируется, дата ставится текущая."""
+        path = self.write(
+            'text,author,group\r\n'
+            '"Пост, с запятой",TestUser,\r\n', '.csv')
+        call_command('import_posts', path, stdout=StringIO())
+        post = Post.objects.get()
+        self.assertEqual(post.text, 'Пост, с запятой')
+        self.assertIsNone(post.group)
+        self.assertIsNotNone(post.pub_date)
+
+    def test_invalid_rows(self):
+        """Ошибочная строка останавливает импорт или пропускается."""
+        path = self.write_jsonl([
+            {'text': 'Первый', 'author': 'TestUser'},
+            {'text': 'Чужой', 'author': 'Nobody'},
+            {'text': 'Без группы', 'author': 'TestUser', 'group': 'nope'},
+        ])
+        with self.assertRaisesMessage(CommandError, 'Строка 2'):
+            call_command('import_posts', path, stdout=StringIO())
+        self.assertFalse(Post.objects.exists())
+        out = StringIO()
+        call_command('import_posts', path, '--skip-invalid', stdout=out)
+        self.assertIn('пропущено: 2', out.getvalue())
+        self.assertEqual(Post.objects.get().text, 'Первый')
+
+    def test_rows_with_wrong_types(self):
+        """Не строки в полях — ошибка строки, а не падение импорта."""
+        path = self.write_jsonl([
+            {'text': 'Первый', 'author': 'TestUser'},
+            {'text': 'Список', 'author': ['TestUser']},
+            {'text': 'Число', 'author': 'TestUser', 'pub_date': 123},
+            {'text': 'Словарь', 'author': 'TestUser', 'group': {'a': 1}},
+            {'text': ['Список'], 'author': 'TestUser'},
+        ])
+        with self.assertRaisesMessage(CommandError, 'Строка 2'):
+            call_command('import_posts', path, stdout=StringIO())
+        out = StringIO()
+        call_command('import_posts', path, '--skip-invalid', stdout=out)
+        self.assertIn('пропущено: 4', out.getvalue())
+        self.assertEqual(Post.objects.get().text, 'Первый')
+
+
+class ExportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(text='В группе', author=cls.user, group=cls.group)
+        Post.objects.create(text='Без группы', author=cls.user)
+
+    def export(self, *args):
+        fd, path = tempfile.mkstemp(suffix='.jsonl.gz')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        call_command('export_posts', '--format', 'jsonl', '--gzip',
+                     '--output', path, *args)
+        with gzip.open(path, 'rt', encoding='utf-8') as stream:
+            return [json.loads(line)['text'] for line in stream]
+
+    def test_export_all_and_by_group(self):
+        """Команда выгружает все посты или посты одной группы."""
+        self.assertEqual(self.export(), ['В группе', 'Без группы'])
+        self.assertEqual(self.export('--group', 'test-slug'), ['В группе'])
+        with self.assertRaises(CommandError):
+            self.export('--author', 'Nobody')
+
+
+class SeedBenchTests(TransactionTestCase):
+    # Команда перестраивает индексы, а схему SQLite нельзя менять внутри
+    # транзакции TestCase
+    def seed(self, *args):
+        call_command(
+            'seed_bench', '--users', '50', '--groups', '5', '--posts', '500',
+            '--workers', '0', '--chunk-size', '120', *args,
+            stdout=StringIO(),
+        )
+
+    def test_seed_dataset(self):
+        """Данные согласованы: счётчики, индекс поиска, перекос авторов."""
+        self.seed()
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Post.objects.count(), 500)
+        self.assertEqual(rebuild_counters(fix=False), [])
+        self.assertEqual(
+            PostSearch('кофе').count(),
+            Post.objects.filter(text__contains='кофе').count(),
+        )
+        counts = sorted(
+            AuthorCounter.objects.values_list('posts_count', flat=True))
+        self.assertGreater(counts[-1], 5 * counts[len(counts) // 2])
+        # После явных id новые записи получают следующие свободные
+        post = Post.objects.create(text='Новый', author=User.objects.first())
+        self.assertGreater(post.pk, 500)
+
+    def test_seed_is_deterministic(self):
+        """Один seed даёт те же строки, другой — другие."""
+        self.seed('--seed', '7')
+        first = list(Post.objects.order_by('pk').values_list(
+            'text', 'author_id', 'group_id', 'pub_date')[:50])
+        self.assertNotEqual(first, [])
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+        self.seed('--seed', '7')
+        self.assertEqual(first, list(Post.objects.order_by('pk').values_list(
+            'text', 'author_id', 'group_id', 'pub_date')[:50]))
+
+    def test_now_option(self):
+        """--now сдвигает даты публикации, позже неё постов нет."""
+        self.seed('--now', '2020-06-01T12:00:00')
+        latest = Post.objects.order_by('-pub_date').first().pub_date
+        self.assertLessEqual(
+            latest, timezone.make_aware(datetime(2020, 6, 1, 12)))
+        self.assertGreater(
+            latest, timezone.make_aware(datetime(2020, 1, 1)))
+
+    def test_derived_restored_after_failure(self):
+        """Индексы и поиск возвращаются, даже если генерация упала."""
+        with mock.patch.object(seeding, 'seed_posts',
+                               side_effect=RuntimeError('сбой')):
+            with self.assertRaises(RuntimeError):
+                self.seed()
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table)
+        for index in Post._meta.indexes:
+            self.assertIn(index.name, constraints)
+        self.assertFalse(install_search_index(connection))
+
+    def test_refuses_non_empty_database(self):
+        """Команда не трогает базу, где уже есть данные."""
+        User.objects.create_user(username='TestUser')
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchHttpTests(TransactionTestCase):
+    def setUp(self):
+        call_command('seed_bench', '--users', '20', '--groups', '3',
+                     '--posts', '100', '--workers', '0', stdout=StringIO())
+        fd, self.output = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        self.addCleanup(os.remove, self.output)
+
+    def bench(self, *args):
+        call_command(
+            'bench_http', '--existing', '--requests', '60', '--warmup', '0',
+            '--output', self.output, *args, stdout=StringIO())
+        with open(self.output, encoding='utf-8') as source:
+            return json.load(source)
+
+    def test_report(self):
+        """В отчёте для каждого адреса есть перцентили, rps и SQL."""
+        report = self.bench()
+        self.assertEqual(report['requests'], 60)
+        self.assertEqual(
+            sum(result['count'] for result in report['results'].values()),
+            60)
+        for name, result in report['results'].items():
+            with self.subTest(name=name):
+                self.assertLessEqual(result['p50'], result['p99'])
+                self.assertGreater(result['rps'], 0)
+                self.assertFalse(
+                    any(code.startswith('5') for code in result['statuses']))
+        self.assertGreater(report['results']['posts:post_detail']['queries'],
+                           0)
+
+    def test_existing_is_read_only(self):
+        """На настроенной базе замер только читает и не оставляет следов."""
+        posts, users = Post.objects.count(), User.objects.count()
+        report = self.bench()
+        self.assertFalse(
+            any('[POST]' in name for name in report['results']))
+        self.assertEqual(Post.objects.count(), posts)
+        self.assertEqual(User.objects.count(), users)
+        self.assertFalse(
+            User.objects.filter(username='bench_http').exists())
+
+    def test_write_scenarios(self):
+        """POST-смесь для отдельной базы входит, регистрирует и пишет."""
+        from yatube.wsgi import application
+
+        user = User.objects.create_user(username='bench')
+        fixtures = http_bench.prepare_fixtures(user, 'Bench-password-1')
+        scenarios = [
+            scenario for scenario in http_bench.default_scenarios()
+            if scenario.method == 'POST'
+        ]
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            report = http_bench.run(application, fixtures, 12, 0, scenarios)
+        for name, result in report['results'].items():
+            with self.subTest(name=name):
+                self.assertEqual(list(result['statuses']), ['302'])
+        self.assertTrue(
+            User.objects.filter(username__startswith='bench_signup_').exists())
+
+    def test_compare_finds_regression(self):
+        """Рост p95 сверх порога роняет команду с CommandError."""
+        report = self.bench()
+        slower = json.loads(json.dumps(report))
+        for result in slower['results'].values():
+            result['p95'] *= 2
+        self.assertEqual(http_bench.compare(report, report, 0.1), [])
+        regressions = http_bench.compare(report, slower, 0.5)
+        self.assertEqual(len(regressions), len(report['results']))
+        http_bench.save(
+            {**report, 'results': {
+                name: {**result, 'p95': result['p95'] / 100}
+                for name, result in report['results'].items()}},
+            self.output)
+        with self.assertRaises(CommandError):
+            self.bench('--compare', self.output, '--threshold', '0.5')
@@ -0,0 +1,177 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import deletion
+from ..counters import rebuild_counters
+from ..models import (
+    AuthorCounter, DeletionJob, Follow, Group, Like, Post, PostCounter,
+    TimelineEntry,
+)
+from ..timeline import follow
+
+User = get_user_model()
+
+
+class DeletionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Heavy')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-')
+        follow(cls.reader, cls.author)
+        follow(cls.author, cls.other)
+        Post.objects.bulk_create(
+            [Post(author=cls.author, group=cls.group, text=f'Пост {i}')
+             for i in range(7)])
+        # Эти посты раскладываются в ленту подписчика
+        for _ in range(3):
+            Post.objects.create(author=cls.author, text='С лентой')
+        cls.other_post = Post.objects.create(
+            author=cls.other, group=cls.group, text='Чужой пост')
+        Like.objects.create(user=cls.author, post=cls.other_post)
+        PostCounter.objects.create(post=cls.other_post, likes_count=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_user_deleted_in_chunks(self):
+        """Автор удаляется пачками вместе с постами, лайками и подписками."""
+        job = deletion.schedule_deletion(self.author)
+        self.assertFalse(User.objects.get(pk=self.author.pk).is_active)
+        self.assertEqual(deletion.schedule_deletion(self.author), job)
+        self.assertTrue(Post.objects.filter(author=self.author).exists())
+        chunks = []
+
+        def progress(job):
+            # После каждой пачки не остаётся ссылок на удалённые посты
+            self.assertFalse(TimelineEntry.objects.exclude(
+                post__in=Post.objects.all()).exists())
+            chunks.append(job.processed)
+
+        deletion.run_job(job, chunk_size=3, pause=0, progress=progress)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(
+            Post.objects.filter(author_id=self.author.pk).exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        # Посты 3+3+3+1, своя лента, лайк, подписка и подписчик
+        self.assertEqual(
+            [b - a for a, b in zip([0] + chunks, chunks)],
+            [3, 3, 3, 1, 1, 1, 1, 1])
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(
+            PostCounter.objects.get(post=self.other_post).likes_count, 0)
+        self.assertEqual(
+            AuthorCounter.objects.get(author=self.other).followers_count, 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        self.assertEqual((job.processed, job.total), (14, 14))
+        self.assertEqual(job.progress, 100)
+
+    def test_group_last_pub_date_after_author_deletion(self):
+        """Дата последней публикации группы — по оставшимся постам."""
+        group = Group.objects.create(title='Свежая', slug='fresh')
+        old = Post.objects.create(
+            author=self.other, group=group, text='Старый пост')
+        author = User.objects.create_user(username='Fresh')
+        for _ in range(3):
+            Post.objects.create(author=author, group=group, text='Новый')
+        deletion.run_job(
+            deletion.schedule_deletion(author), chunk_size=2, pause=0)
+        group.refresh_from_db()
+        self.assertEqual(
+            (group.posts_count, group.last_pub_date), (1, old.pub_date))
+        self.assertEqual(rebuild_counters(fix=False), [])
+
+    def test_group_posts_detached(self):
+        """Посты удаляемой группы остаются, но без группы."""
+        job = deletion.schedule_deletion(self.group)
+        self.assertEqual(job.total, 8)
+        deletion.run_job(job, chunk_size=5, pause=0)
+        self.assertFalse(Group.objects.filter(pk=self.group.pk).exists())
+        self.assertEqual(Post.objects.count(), 11)
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+
+    def test_failed_job_is_recorded(self):
+        """Ошибка этапа сохраняется в задаче, и её больше не берут."""
+        job = deletion.schedule_deletion(self.group)
+        stages = deletion.STAGES[DeletionJob.GROUP]
+        broken = ((stages[0][0], stages[0][1], None),)
+        deletion.STAGES[DeletionJob.GROUP] = broken
+        try:
+            with self.assertRaises(TypeError):
+                deletion.run_job(job, pause=0)
+        finally:
+            deletion.STAGES[DeletionJob.GROUP] = stages
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.FAILED)
+        self.assertIn('TypeError', job.last_error)
+        self.assertIsNone(deletion.claim_job())
+
+    def test_process_deletions_command(self):
+        """Команда забирает задачи из очереди и выполняет их."""
+        deletion.schedule_deletion(self.group)
+        out = StringIO()
+        call_command('process_deletions', '--once', '--pause=0', stdout=out)
+        self.assertIn('удалено за', out.getvalue())
+        self.assertFalse(Group.objects.filter(pk=self.group.pk).exists())
+
+    def test_admin_schedules_deletion(self):
+        """Удаление из админки ставит задачу, а не удаляет сразу."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:auth_user_delete', args=[self.author.pk])
+        response = client.get(url)
+        self.assertNotContains(response, 'Пост 1')
+        response = client.post(url, {'post': 'yes'})
+        self.assertRedirects(response, reverse('admin:auth_user_changelist'))
+        self.assertEqual(self.messages(response), [
+            f'{DeletionJob.objects.get()}: удаление выполняется в фоне'])
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+        self.assertTrue(DeletionJob.objects.filter(
+            kind=DeletionJob.USER, object_id=self.author.pk).exists())
+        response = client.post(reverse('admin:posts_group_changelist'), {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': [self.group.pk],
+        })
+        self.assertEqual(len(self.messages(response)), 1)
+        self.assertIn('в фоне', self.messages(response)[0])
+        self.assertTrue(Group.objects.filter(pk=self.group.pk).exists())
+        self.assertTrue(DeletionJob.objects.filter(
+            kind=DeletionJob.GROUP, object_id=self.group.pk).exists())
+
+    def messages(self, response):
+        return [str(message)
+                for message in get_messages(response.wsgi_request)]
+
+    def test_admin_checks_related_permissions(self):
+        """Без прав на посты автора и группу удаление не ставится."""
+        staff = User.objects.create_user('staff', is_staff=True)
+        staff.user_permissions.add(*Permission.objects.filter(codename__in=(
+            'view_user', 'delete_user', 'view_group', 'delete_group')))
+        client = Client()
+        client.force_login(staff)
+        url = reverse('admin:auth_user_delete', args=[self.author.pk])
+        response = client.get(url)
+        self.assertEqual(response.context['perms_lacking'],
+                         {'post', 'like', 'follow'})
+        self.assertEqual(client.post(url, {'post': 'yes'}).status_code, 403)
+        response = client.post(reverse('admin:posts_group_changelist'), {
+            'action': 'delete_selected', 'post': 'yes',
+            '_selected_action': [self.group.pk],
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(DeletionJob.objects.exists())
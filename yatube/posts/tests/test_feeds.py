@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..cache import cache_stats
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Пост в группе', author=cls.user, group=cls.group)
+        Post.objects.create(text='Пост без группы', author=cls.other)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.group_url = reverse(
+            'posts:group_rss', kwargs={'slug': self.group.slug})
+
+    def test_feeds_list_posts(self):
+        """Ленты отдают посты своего источника в RSS и Atom."""
+        cases = {
+            reverse('posts:index_rss'): (
+                'application/rss+xml', ['Пост в группе', 'Пост без группы']),
+            reverse('posts:index_atom'): (
+                'application/atom+xml', ['Пост в группе', 'Пост без группы']),
+            self.group_url: ('application/rss+xml', ['Пост в группе']),
+            reverse('posts:profile_atom', kwargs={'username': 'Other'}): (
+                'application/atom+xml', ['Пост без группы']),
+        }
+        for url, (content_type, texts) in cases.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response['Content-Type'].startswith(
+                    content_type))
+                content = response.content.decode()
+                items = content.count('<item>') + content.count('<entry>')
+                self.assertEqual(items, len(texts))
+                for text in texts:
+                    self.assertIn(text, content)
+
+    def test_unknown_group(self):
+        """Лента несуществующей группы — 404."""
+        response = self.client.get(
+            reverse('posts:group_rss', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_feed_cached_and_invalidated(self):
+        """XML берётся из кеша до новой записи в группе."""
+        self.client.get(self.group_url)
+        self.client.get(self.group_url)
+        self.assertEqual(cache_stats('page')['hits'], 1)
+        Post.objects.create(
+            text='Новый пост в группе', author=self.other, group=self.group)
+        response = self.client.get(self.group_url)
+        self.assertContains(response, 'Новый пост в группе')
+        Post.objects.create(text='Пост вне группы', author=self.other)
+        self.client.get(self.group_url)
+        self.assertEqual(cache_stats('page')['hits'], 2)
+
+    def test_post_edit_updates_feed(self):
+        """Правка поста видна в закешированной ленте автора."""
+        url = reverse('posts:profile_rss', kwargs={'username': 'TestUser'})
+        self.client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        self.assertContains(self.client.get(url), 'Исправленный пост')
+
+    def test_conditional_get(self):
+        """Опрос без изменений получает 304 Not Modified."""
+        etag = self.client.get(self.group_url)['ETag']
+        response = self.client.get(self.group_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
@@ -0,0 +1,113 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import AuthorCounter, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class FollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.other = User.objects.create_user(username='Other')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def follow(self, author, client=None):
+        return (client or self.client).post(reverse(
+            'posts:profile_follow', kwargs={'username': author.username}))
+
+    def feed(self, client=None):
+        response = (client or self.client).get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_and_unfollow(self):
+        """Подписка добавляет посты автора в ленту, отписка убирает."""
+        response = self.follow(self.author)
+        self.assertRedirects(response, reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.follow(self.author)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            AuthorCounter.objects.get(author=self.author).followers_count, 1)
+        self.assertEqual(self.feed(), [self.old_post])
+        self.client.post(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}))
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_follow_requires_post(self):
+        """Подписаться можно только POST-запросом и не на себя."""
+        response = self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}))
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+        self.follow(self.reader)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_profile_shows_follow_state(self):
+        """Профиль знает, подписан ли на автора тот, кто его смотрит."""
+        url = reverse(
+            'posts:profile', kwargs={'username': self.author.username})
+        self.assertFalse(self.client.get(url).context['following'])
+        self.follow(self.author)
+        self.assertTrue(self.client.get(url).context['following'])
+
+    def test_new_post_fanned_out(self):
+        """Новый пост сразу записывается в ленты подписчиков."""
+        self.follow(self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+        other = Client()
+        other.force_login(self.other)
+        self.assertEqual(self.feed(other), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_popular_author_read_on_demand(self):
+        """Посты популярного автора не раскладываются, а читаются."""
+        self.follow(self.author)
+        other = Client()
+        other.force_login(self.other)
+        self.follow(self.author, other)
+        self.assertTrue(
+            AuthorCounter.objects.get(author=self.author).fanout_on_read)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+        self.assertEqual(self.feed(other), [post, self.old_post])
+
+    def test_feed_queries_do_not_depend_on_follows(self):
+        """Число запросов ленты не растёт с числом подписок."""
+        authors = [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(15)
+        ]
+        for author in authors:
+            Post.objects.create(author=author, text='Пост')
+        self.follow(authors[0])
+        with CaptureQueriesContext(connection) as few:
+            self.feed()
+        for author in authors[1:]:
+            self.follow(author)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(len(self.feed()), 10)
+        self.assertEqual(len(few), len(many))
@@ -1,7 +1,19 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from sorl.thumbnail.models import KVStore
+
+from .. import hits
 from ..models import Group, Post
+from ..thumbnails import schedule_thumbnails, thumbnail
 
 User = get_user_model()
 
@@ -24,6 +36,8 @@ class PostFormsTests(TestCase):
         )
 
     def setUp(self):
+        hits.buffer.clear()
+        self.addCleanup(hits.buffer.clear)
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.TestUser)
@@ -89,3 +103,90 @@ class PostFormsTests(TestCase):
         self.assertEqual(post.text, form_data["text"])
         self.assertEqual(post.author, self.TestUser)
         self.assertEqual(post.group, self.group2)
+        self.group.refresh_from_db()
+        self.group2.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group2.posts_count, 1)
+
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   THUMBNAIL_PREGENERATE_ASYNC=False)
+class PostImageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        hits.buffer.clear()
+        self.addCleanup(hits.buffer.clear)
+        cache.clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, text):
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': text,
+            'image': SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'),
+        })
+        return Post.objects.get(text=text)
+
+    def test_identical_uploads_stored_once(self):
+        """Одинаковые картинки сохраняются одним файлом с именем-хешем."""
+        first = self.create_post('Первый пост')
+        second = self.create_post('Второй пост')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.gif$')
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory), [
+            os.path.basename(first.image.name)])
+
+    def thumbnail_files(self):
+        return [
+            name for _, _, names in os.walk(
+                os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+            for name in names
+        ]
+
+    def test_thumbnails_pregenerated(self):
+        """Миниатюры создаются при сохранении, а не при показе."""
+        post = self.create_post('Пост с картинкой')
+        self.assertEqual(len(self.thumbnail_files()), 1)
+        target = 'sorl.thumbnail.base.ThumbnailBackend._create_thumbnail'
+        with mock.patch(target) as create:
+            response = self.authorized_client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        create.assert_not_called()
+        self.assertContains(response, thumbnail(post.image, 'card').url)
+        # Ключи sorl живут в кеше, таблица thumbnail_kvstore пуста
+        self.assertFalse(KVStore.objects.exists())
+
+    @override_settings(THUMBNAIL_PREGENERATE_ASYNC=True)
+    def test_thumbnails_in_background(self):
+        """В фоновом режиме миниатюры создаёт пул потоков."""
+        with mock.patch('posts.signals.schedule_thumbnails') as schedule:
+            post = self.create_post('Пост с картинкой')
+        self.assertEqual(len(self.thumbnail_files()), 0)
+        image = schedule.call_args[0][0]
+        self.assertEqual(image.name, post.image.name)
+        schedule_thumbnails(image).result()
+        self.assertEqual(len(self.thumbnail_files()), 1)
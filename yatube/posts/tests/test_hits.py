@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import hits
+from ..models import Like, Post, PostCounter
+
+User = get_user_model()
+
+
+@override_settings(COUNTER_FLUSH_INTERVAL=3600, COUNTER_FLUSH_SIZE=1000)
+class CounterBufferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.other = Post.objects.create(author=cls.user, text='Другой')
+
+    def setUp(self):
+        cache.clear()
+        hits.buffer.clear()
+        self.addCleanup(hits.buffer.clear)
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk})
+
+    def stored(self, post):
+        return PostCounter.objects.filter(post=post).values(
+            'views_count', 'likes_count').first()
+
+    def test_increments_wait_for_flush(self):
+        """Приращения не пишутся в базу до сброса, но видны сразу."""
+        for _ in range(3):
+            hits.increment(self.post.pk, 'views_count')
+        self.assertIsNone(self.stored(self.post))
+        self.assertEqual(hits.post_counts(self.post.pk),
+                         {'views_count': 3, 'likes_count': 0})
+        self.assertEqual(hits.buffer.flush(), 1)
+        self.assertEqual(self.stored(self.post),
+                         {'views_count': 3, 'likes_count': 0})
+        self.assertEqual(hits.post_counts(self.post.pk)['views_count'], 3)
+
+    def test_flush_batches_updates(self):
+        """Сброс — одна транзакция с UPDATE на поле и величину."""
+        PostCounter.objects.create(post=self.post, views_count=10)
+        hits.increment(self.post.pk, 'views_count', 2)
+        hits.increment(self.other.pk, 'views_count', 2)
+        hits.increment(self.other.pk, 'likes_count')
+        # SAVEPOINT, вставка недостающих строк, два UPDATE, RELEASE
+        with self.assertNumQueries(5):
+            self.assertEqual(hits.buffer.flush(), 3)
+        self.assertEqual(self.stored(self.post)['views_count'], 12)
+        self.assertEqual(self.stored(self.other),
+                         {'views_count': 2, 'likes_count': 1})
+
+    @override_settings(COUNTER_FLUSH_SIZE=2)
+    def test_full_buffer_flushes(self):
+        """Заполненный буфер сбрасывается сам."""
+        hits.increment(self.post.pk, 'views_count')
+        self.assertIsNone(self.stored(self.post))
+        hits.increment(self.other.pk, 'views_count')
+        self.assertEqual(self.stored(self.post)['views_count'], 1)
+
+    def test_failed_flush_keeps_increments(self):
+        """При ошибке базы приращения возвращаются в буфер."""
+        hits.increment(self.post.pk, 'views_count', 5)
+        with mock.patch.object(hits, 'write_deltas',
+                               side_effect=OperationalError('locked')):
+            with self.assertLogs('posts.hits', level='ERROR'):
+                self.assertEqual(hits.buffer.flush(), 0)
+        self.assertEqual(hits.post_counts(self.post.pk)['views_count'], 5)
+        hits.buffer.flush()
+        self.assertEqual(self.stored(self.post)['views_count'], 5)
+
+    def test_negative_likes_are_guarded(self):
+        """Снятие неучтённого лайка не уводит счётчик ниже нуля."""
+        hits.increment(self.post.pk, 'likes_count', -1)
+        hits.buffer.flush()
+        self.assertEqual(self.stored(self.post)['likes_count'], 0)
+
+    def test_post_detail_counts_views(self):
+        """Страница поста считает просмотр и показывает счётчики."""
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['counts']['views_count'], 2)
+        self.assertContains(response, 'Просмотров: 2')
+        # Ответ 304 на условный запрос просмотром не считается
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(hits.post_counts(self.post.pk)['views_count'], 2)
+
+    def test_like_toggles(self):
+        """Повторный лайк снимает первый."""
+        like_url = reverse('posts:post_like', kwargs={'post_id': self.post.pk})
+        self.assertRedirects(self.client.post(like_url), self.url)
+        self.assertTrue(Like.objects.filter(
+            user=self.user, post=self.post).exists())
+        response = self.client.get(self.url)
+        self.assertTrue(response.context['liked'])
+        self.assertEqual(response.context['counts']['likes_count'], 1)
+        self.client.post(like_url)
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(hits.post_counts(self.post.pk)['likes_count'], 0)
+        self.assertEqual(self.client.get(like_url).status_code, 405)
@@ -1,7 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import AuthorCounter, Group, Post
 
 User = get_user_model()
 
@@ -55,3 +59,82 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected)
+
+
+class PostCounterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа 2',
+            slug='test-slug2',
+            description='Тестовое описание 2',
+        )
+
+    def assertCounters(self, author, group, group2):
+        self.group.refresh_from_db()
+        self.group2.refresh_from_db()
+        self.assertEqual(AuthorCounter.posts_count_for(self.user), author)
+        self.assertEqual(self.group.posts_count, group)
+        self.assertEqual(self.group2.posts_count, group2)
+
+    def test_counters_follow_post_changes(self):
+        """Счётчики меняются при создании, переносе и удалении поста."""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group)
+        self.assertCounters(1, 1, 0)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.group2
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post.text = 'Изменённый текст'
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_counters_follow_bulk_create(self):
+        """bulk_create обновляет счётчики одним запросом на ключ."""
+        Post.objects.bulk_create(
+            [Post(author=self.user, text=f'Пост {i}', group=self.group)
+             for i in range(5)]
+        )
+        self.assertCounters(5, 5, 0)
+
+    def test_group_last_pub_date_follows_posts(self):
+        """Дата последней записи группы следует за постами."""
+        old = Post.objects.create(
+            author=self.user, text='Старый пост', group=self.group)
+        new = Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.last_pub_date, new.pub_date)
+        Post.objects.get(pk=new.pk).delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.last_pub_date, old.pub_date)
+        old = Post.objects.get(pk=old.pk)
+        old.group = self.group2
+        old.save()
+        self.group.refresh_from_db()
+        self.group2.refresh_from_db()
+        self.assertIsNone(self.group.last_pub_date)
+        self.assertEqual(self.group2.last_pub_date, old.pub_date)
+
+    def test_rebuild_post_counters_command(self):
+        """Команда находит и исправляет расхождения счётчиков."""
+        Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group)
+        Group.objects.filter(pk=self.group.pk).update(
+            posts_count=7, last_pub_date=None)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_post_counters', '--check', stdout=StringIO())
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertCounters(1, 1, 0)
+        self.assertIsNotNone(self.group.last_pub_date)
+        call_command('rebuild_post_counters', '--check', stdout=StringIO())
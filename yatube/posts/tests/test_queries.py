@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.query_budget import BUDGETS, QueryBudgetExceeded, query_budget
+from .. import hits, trending
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class PostQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        authors = [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(10)
+        ]
+        groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-')
+            for i in range(10)
+        ]
+        for author, group in zip(authors, groups):
+            Post.objects.create(author=author, group=group, text='Пост')
+            Post.objects.create(author=cls.user, group=cls.group, text='Пост')
+        cls.post = Post.objects.filter(author=cls.user).first()
+        trending.refresh()
+
+    def setUp(self):
+        cache.clear()
+        # Сброс счётчиков после ответа не должен попадать в подсчёт
+        hits.buffer.clear()
+        self.addCleanup(hits.buffer.clear)
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_views_fit_query_budget(self):
+        """Страницы укладываются в объявленный бюджет запросов."""
+        urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_index': reverse('posts:group_index'),
+            'posts:group_list': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': self.user.username}),
+            'posts:post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}),
+            'posts:search': reverse('posts:search') + '?q=Пост',
+            'posts:post_create': reverse('posts:post_create'),
+            'posts:post_edit': reverse(
+                'posts:post_edit', kwargs={'post_id': self.post.pk}),
+            'posts:index_feed': reverse('posts:index_rss'),
+            'posts:group_feed': reverse(
+                'posts:group_atom', kwargs={'slug': self.group.slug}),
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:popular': reverse('posts:popular'),
+            'posts:group_popular': reverse(
+                'posts:group_popular', kwargs={'slug': self.group.slug}),
+            'posts:profile_feed': reverse(
+                'posts:profile_rss', kwargs={'username': self.user.username}),
+            'api:post_list': reverse('api:post_list'),
+            'api:group_posts': reverse(
+                'api:group_posts', kwargs={'slug': self.group.slug}),
+            'api:author_posts': reverse(
+                'api:author_posts', kwargs={'username': self.user.username}),
+            'api:post_detail': reverse(
+                'api:post_detail', kwargs={'post_id': self.post.pk}),
+        }
+        self.assertEqual(set(urls), set(BUDGETS))
+        for name, url in urls.items():
+            for client in (self.guest_client, self.authorized_client):
+                with self.subTest(name=name, client=client):
+                    client.get(url)
+
+    def test_post_writes_fit_query_budget(self):
+        """Создание и редактирование поста укладываются в бюджет."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.group.pk},
+        )
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Изменённый пост', 'group': ''},
+        )
+
+    def test_list_queries_do_not_depend_on_posts(self):
+        """Число запросов ленты не растёт вместе с числом авторов."""
+        # ETag, сессия, пользователь, COUNT и сами посты
+        with self.assertNumQueries(5):
+            self.authorized_client.get(reverse('posts:index'))
+
+    def test_budget_exceeded_raises(self):
+        """Превышение бюджета в режиме raise роняет тест."""
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(1):
+                list(Post.objects.all())
+                list(Group.objects.all())
+
+    @override_settings(QUERY_BUDGET_MODE='log')
+    def test_budget_exceeded_logs(self):
+        """В режиме log превышение только попадает в лог."""
+        with self.assertLogs('core.query_budget', level='WARNING'):
+            with query_budget(0, 'test'):
+                list(Post.objects.all())
@@ -0,0 +1,115 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from core.routing import (
+    PIN_COOKIE, PrimaryPinMiddleware, PrimaryReplicaRouter, primary_reads,
+    replica_reads,
+)
+from .. import hits
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=10)
+class RouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_reads_outside_requests_use_primary(self):
+        """Команды и воркеры без PrimaryPinMiddleware читают из default."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_reads_use_replica_until_write(self):
+        """Чтения идут на реплику, после записи — в основную базу."""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            with primary_reads():
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def run_middleware(self, view, cookie=None):
+        request = self.factory.get('/')
+        if cookie is not None:
+            request.COOKIES[PIN_COOKIE] = str(cookie)
+        return PrimaryPinMiddleware(view)(request)
+
+    def test_write_pins_client_to_primary(self):
+        """После записи cookie направляет чтения клиента в default."""
+        def write(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        def read(request):
+            return HttpResponse(self.router.db_for_read(Post))
+
+        response = self.run_middleware(write)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+        until = response.cookies[PIN_COOKIE].value
+        self.assertEqual(self.run_middleware(read, until).content,
+                         b'default')
+        self.assertEqual(self.run_middleware(read).content, b'replica')
+        self.assertEqual(
+            self.run_middleware(read, int(time.time()) - 1).content,
+            b'replica')
+        self.assertNotIn(PIN_COOKIE, self.run_middleware(read).cookies)
+
+
+class ReplicaTests(TransactionTestCase):
+    def setUp(self):
+        hits.buffer.clear()
+        self.addCleanup(hits.buffer.clear)
+        cache.clear()
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        connections.databases['replica'] = {
+            **connection.settings_dict, 'NAME': path}
+        self.addCleanup(connections.databases.pop, 'replica')
+        self.addCleanup(lambda: connections['replica'].close())
+        self.user = User.objects.create_user(username='TestUser')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_writer_reads_own_posts(self):
+        """Автор сразу видит новый пост, хотя реплика ещё отстаёт."""
+        call_command('sync_replicas', stdout=StringIO())
+        response = self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.group.pk},
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        post = Post.objects.get()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with replica_reads():
+            self.assertFalse(Post.objects.exists())
+        self.assertEqual(Client().get(url).status_code, 404)
+        call_command('sync_replicas', stdout=StringIO())
+        self.assertEqual(Client().get(url).status_code, 200)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_replica_is_read_only(self):
+        """Запись в реплику мимо маршрутизатора не проходит."""
+        call_command('sync_replicas', stdout=StringIO())
+        with self.assertRaises(OperationalError):
+            Group.objects.using('replica').create(
+                title='Группа', slug='replica-slug', description='-')
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..fts import TRIGGERS, install_search_index
+from ..models import Post
+from ..search import PostSearch
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.once = Post.objects.create(
+            author=cls.user, text='Утро, кофе и длинная дорога на работу')
+        cls.twice = Post.objects.create(
+            author=cls.user, text='Кофе, снова кофе')
+        cls.other = Post.objects.create(
+            author=cls.user, text='Вечер у моря')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('posts:search')
+
+    def search(self, query):
+        return list(PostSearch(query)[:10])
+
+    def test_results_ranked_by_relevance(self):
+        """Выдача отсортирована по релевантности и не зависит от регистра."""
+        response = self.client.get(self.url, {'q': 'КОФЕ'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), [self.twice, self.once])
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+
+    def test_pagination_keeps_query(self):
+        """Ссылки паджинатора сохраняют поисковый запрос."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Кофе номер {i}') for i in range(12))
+        response = self.client.get(self.url, {'q': 'кофе', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 4)
+        self.assertContains(
+            response, 'href="?q=%D0%BA%D0%BE%D1%84%D0%B5&amp;page=1"')
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=self.other.pk)
+        post.text = 'Вечер, кофе и море'
+        post.save()
+        self.assertIn(post, self.search('кофе'))
+        self.assertEqual(self.search('моря'), [])
+        Post.objects.get(pk=self.twice.pk).delete()
+        self.assertEqual(self.search('снова'), [])
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        for query in ('кофе OR', '"кофе', 'NEAR(кофе', '*', '-'):
+            with self.subTest(query=query):
+                response = self.client.get(self.url, {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_no_results(self):
+        """Запрос без совпадений выводит счётчик и «Ничего не найдено»."""
+        response = self.client.get(self.url, {'q': 'самовар'})
+        self.assertContains(response, 'Найдено записей: 0')
+        self.assertContains(response, 'Ничего не найдено')
+
+    def test_empty_query(self):
+        """Без запроса страница поиска не выводит результатов."""
+        response = self.client.get(self.url)
+        self.assertIsNone(response.context['page_obj'])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты по словам через индекс."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'дорога'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.once])
+
+    def test_lost_triggers_are_restored(self):
+        """Пропавшие триггеры ставятся заново, индекс перестраивается."""
+        with connection.cursor() as cursor:
+            for name in TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {name}')
+        Post.objects.create(author=self.user, text='Кофе без триггеров')
+        self.assertTrue(install_search_index(connection))
+        self.assertEqual(len(self.search('триггеров')), 1)
+        self.assertFalse(install_search_index(connection))
@@ -0,0 +1,452 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+from os import path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import deletion, hits, sharding, trending
+from ..counters import rebuild_counters
+from ..hits import write_deltas
+from ..models import (
+    AuthorCounter, AuthorShard, Group, Like, Post, PostCounter,
+)
+from ..sharding import set_author_shard
+from ..timeline import follow
+
+User = get_user_model()
+
+SHARDS = ['shard0', 'shard1']
+
+
+@override_settings(POST_SHARDS=SHARDS)
+class ShardingTests(TransactionTestCase):
+    # Шарды — файлы SQLite рядом с тестовой базой, схема через migrate
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        for alias in SHARDS:
+            connections.databases[alias] = {
+                **connection.settings_dict,
+                'NAME': path.join(cls.directory, f'{alias}.sqlite3'),
+            }
+            call_command('migrate', database=alias, verbosity=0)
+            # Схема меняется с проверкой внешних ключей, которую шарду
+            # нужно отключить: новое соединение получит прагму заново
+            connections[alias].close()
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in SHARDS:
+            connections[alias].close()
+            connections.databases.pop(alias)
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        hits.buffer.clear()
+        self.addCleanup(hits.buffer.clear)
+        cache.clear()
+        for alias in SHARDS:
+            Post.objects.using(alias).all()._raw_delete(alias)
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-')
+        self.authors = []
+        for number, alias in enumerate(['shard0', 'shard0', 'shard1']):
+            author = User.objects.create_user(username=f'author{number}')
+            set_author_shard(author.pk, alias)
+            self.authors.append(author)
+
+    def publish(self, author, count, group=None):
+        return [
+            Post.objects.create(
+                author=author, group=group, text=f'Пост {author} {i}')
+            for i in range(count)
+        ]
+
+    def shard_posts(self, alias, author):
+        return Post.objects.using(alias).filter(author=author).count()
+
+    def test_posts_stored_on_author_shard(self):
+        """Посты лежат на шарде автора, id уникальны для всех шардов."""
+        first, second, third = self.authors
+        posts = (self.publish(first, 2) + self.publish(second, 1)
+                 + self.publish(third, 2))
+        self.assertEqual(self.shard_posts('shard0', first), 2)
+        self.assertEqual(self.shard_posts('shard1', third), 2)
+        self.assertEqual(self.shard_posts('shard1', first), 0)
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertEqual(len({post.pk for post in posts}), 5)
+
+    def test_new_author_gets_shard(self):
+        """Первый пост нового автора закрепляет за ним шард."""
+        author = User.objects.create_user(username='NewAuthor')
+        post = Post.objects.create(author=author, text='Первый пост')
+        shard = AuthorShard.objects.get(author=author).shard
+        self.assertEqual(shard, SHARDS[author.pk % len(SHARDS)])
+        self.assertTrue(
+            Post.objects.using(shard).filter(pk=post.pk).exists())
+
+    def test_feeds_merge_shards(self):
+        """Ленты собираются со всех шардов в порядке даты публикации."""
+        first, second, third = self.authors
+        self.publish(first, 6, self.group)
+        self.publish(third, 6, self.group)
+        self.publish(second, 3)
+        everything = sorted(
+            (post for alias in SHARDS
+             for post in Post.objects.using(alias).all()),
+            key=lambda post: (post.pub_date, post.pk), reverse=True)
+        client = Client()
+        page = client.get(reverse('posts:index')).context['page_obj']
+        self.assertEqual(page.paginator.count, 15)
+        self.assertEqual([post.pk for post in page],
+                         [post.pk for post in everything[:10]])
+        page = client.get(reverse('posts:index') + '?page=2').context[
+            'page_obj']
+        self.assertEqual([post.pk for post in page],
+                         [post.pk for post in everything[10:]])
+        page = client.get(reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug})
+        ).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in page],
+            [post.pk for post in everything if post.group_id][:10])
+        self.assertEqual(page[0].group, self.group)
+        page = client.get(reverse(
+            'posts:profile', kwargs={'username': third.username})
+        ).context['page_obj']
+        self.assertEqual(
+            {post.author for post in page}, {third})
+        self.assertEqual(len(page), 6)
+
+    def test_post_detail_and_edit(self):
+        """Страница и правка поста находят его шард по id."""
+        post, = self.publish(self.authors[2], 1)
+        client = Client()
+        client.force_login(self.authors[2])
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        response = client.get(url)
+        self.assertEqual(response.context['post'], post)
+        client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Изменённый пост', 'group': self.group.pk},
+        )
+        edited = Post.objects.using('shard1').get(pk=post.pk)
+        self.assertEqual(edited.text, 'Изменённый пост')
+        self.assertEqual(edited.group_id, self.group.pk)
+        self.assertEqual(client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk + 100})
+        ).status_code, 404)
+
+    def test_create_post_view(self):
+        """Пост из формы попадает на шард автора."""
+        client = Client()
+        client.force_login(self.authors[2])
+        client.post(reverse('posts:post_create'), {'text': 'Новый пост'})
+        self.assertEqual(self.shard_posts('shard1', self.authors[2]), 1)
+
+    def test_author_deletion_reaches_shard(self):
+        """Удаление автора удаляет его посты на шарде и правит счётчики."""
+        first, _, third = self.authors
+        gone = self.publish(third, 2, self.group)
+        self.publish(first, 1, self.group)
+        write_deltas({(gone[0].pk, 'views_count'): 3})
+        third.delete()
+        self.assertEqual(Post.objects.using('shard1').count(), 0)
+        self.assertEqual(self.shard_posts('shard0', first), 1)
+        self.assertFalse(PostCounter.objects.exists())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_follow_feed(self):
+        """Лента подписок читает посты авторов с их шардов."""
+        first, second, third = self.authors
+        posts = self.publish(third, 3) + self.publish(second, 1)
+        client = Client()
+        client.force_login(first)
+        for author in (third, second):
+            client.post(reverse(
+                'posts:profile_follow', kwargs={'username': author.username}))
+        posts += self.publish(third, 1)
+        # У second два подписчика: его посты подмешиваются при чтении
+        reader = User.objects.create_user(username='reader')
+        follow(reader, second)
+        posts += self.publish(second, 1)
+        page = client.get(reverse('posts:follow_index')).context['page_obj']
+        self.assertEqual(page.paginator.count, 6)
+        self.assertEqual(
+            [post.pk for post in page],
+            [post.pk for post in sorted(
+                posts, key=lambda post: (post.pub_date, post.pk),
+                reverse=True)])
+        self.assertEqual(page[0].author, second)
+
+    def test_background_author_deletion(self):
+        """Фоновое удаление автора удаляет посты на его шарде."""
+        first, _, third = self.authors
+        posts = self.publish(third, 3, self.group)
+        Like.objects.create(user=first, post_id=posts[0].pk)
+        job = deletion.schedule_deletion(third)
+        self.assertEqual(job.total, 3)
+        deletion.run_job(job, chunk_size=2, pause=0)
+        self.assertFalse(User.objects.filter(pk=third.pk).exists())
+        self.assertEqual(Post.objects.using('shard1').count(), 0)
+        self.assertFalse(Like.objects.exists())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_background_group_deletion(self):
+        """Фоновое удаление группы отвязывает посты на всех шардах."""
+        first, _, third = self.authors
+        posts = self.publish(first, 2, self.group) + self.publish(
+            third, 3, self.group)
+        job = deletion.schedule_deletion(self.group)
+        self.assertEqual(job.total, 5)
+        deletion.run_job(job, chunk_size=2, pause=0)
+        self.assertEqual(job.processed, 5)
+        self.assertFalse(Group.objects.filter(pk=self.group.pk).exists())
+        for alias in SHARDS:
+            self.assertFalse(Post.objects.using(alias).filter(
+                group_id__isnull=False).exists())
+        self.assertEqual(
+            sum(Post.objects.using(alias).count() for alias in SHARDS),
+            len(posts))
+
+    def test_group_deletion(self):
+        """Удаление группы без очереди тоже отвязывает посты шардов."""
+        self.publish(self.authors[2], 2, self.group)
+        self.group.delete()
+        self.assertFalse(Post.objects.using('shard1').filter(
+            group_id__isnull=False).exists())
+        self.assertEqual(rebuild_counters(fix=False), [])
+
+    def test_like(self):
+        """Лайк поста с шарда пишется в основную базу."""
+        post, = self.publish(self.authors[2], 1)
+        client = Client()
+        client.force_login(self.authors[0])
+        url = reverse('posts:post_like', kwargs={'post_id': post.pk})
+        self.assertRedirects(client.post(url), reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk}))
+        self.assertTrue(Like.objects.using('default').filter(
+            user=self.authors[0], post_id=post.pk).exists())
+        self.assertFalse(Like.objects.using('shard1').exists())
+        self.assertEqual(client.post(reverse(
+            'posts:post_like', kwargs={'post_id': post.pk + 100})
+        ).status_code, 404)
+        Post.objects.using('shard1').get(pk=post.pk).delete()
+        self.assertFalse(Like.objects.exists())
+
+    def test_export(self):
+        """Выгрузка читает посты с шардов, имена — из основной базы."""
+        first, _, third = self.authors
+        posts = self.publish(third, 3, self.group) + self.publish(first, 2)
+        client = Client()
+        client.force_login(third)
+        response = client.get(reverse(
+            'posts:profile_export', kwargs={'username': third.username}),
+            {'format': 'jsonl'})
+        rows = [json.loads(line) for line in b''.join(
+            response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [post.pk for post in posts[:3]])
+        self.assertEqual({(row['author'], row['group']) for row in rows},
+                         {(third.username, self.group.slug)})
+        output = path.join(self.directory, 'export.jsonl')
+        call_command('export_posts', '--format', 'jsonl', '--batch-size',
+                     '2', '--output', output)
+        with open(output, encoding='utf-8') as stream:
+            rows = [json.loads(line) for line in stream]
+        self.assertEqual([row['id'] for row in rows],
+                         sorted(post.pk for post in posts))
+        self.assertEqual(rows[-1]['author'], first.username)
+
+    def test_api(self):
+        """API листает курсором ленту, собранную со всех шардов."""
+        first, second, third = self.authors
+        posts = (self.publish(first, 4, self.group)
+                 + self.publish(third, 4, self.group)
+                 + self.publish(second, 3))
+        posts.sort(key=lambda post: (post.pub_date, post.pk), reverse=True)
+        client = Client()
+        url = reverse('api:post_list')
+        page = client.get(url, {'limit': 4}).json()
+        ids = [row['id'] for row in page['results']]
+        while page['next']:
+            page = client.get(
+                url, {'limit': 4, 'cursor': page['next']}).json()
+            ids += [row['id'] for row in page['results']]
+        self.assertEqual(ids, [post.pk for post in posts])
+        back = client.get(
+            url, {'limit': 4, 'cursor': page['previous']}).json()
+        self.assertEqual([row['id'] for row in back['results']],
+                         [post.pk for post in posts[4:8]])
+        group = client.get(reverse(
+            'api:group_posts', kwargs={'slug': self.group.slug})).json()
+        self.assertEqual(len(group['results']), 8)
+        self.assertEqual({row['group'] for row in group['results']},
+                         {self.group.slug})
+        author = client.get(reverse(
+            'api:author_posts', kwargs={'username': third.username})).json()
+        self.assertEqual({row['author'] for row in author['results']},
+                         {third.username})
+        self.assertEqual(len(author['results']), 4)
+        post = posts[0]
+        detail = client.get(reverse(
+            'api:post_detail', kwargs={'post_id': post.pk})).json()
+        self.assertEqual(
+            (detail['text'], detail['author']),
+            (post.text, post.author.username))
+        self.assertEqual(client.get(reverse(
+            'api:post_detail', kwargs={'post_id': post.pk + 100})
+        ).status_code, 404)
+
+    def test_rss(self):
+        """RSS и Atom собирают посты со всех шардов."""
+        first, _, third = self.authors
+        self.publish(first, 2, self.group)
+        self.publish(third, 1, self.group)
+        self.publish(third, 1)
+        client = Client()
+        cases = {
+            reverse('posts:index_rss'): 4,
+            reverse('posts:group_atom', kwargs={'slug': self.group.slug}): 3,
+            reverse('posts:profile_rss',
+                    kwargs={'username': third.username}): 2,
+        }
+        for url, count in cases.items():
+            with self.subTest(url=url):
+                content = client.get(url).content.decode()
+                self.assertEqual(
+                    content.count('<item>') + content.count('<entry>'),
+                    count)
+        self.assertIn(self.group.title, client.get(
+            reverse('posts:index_rss')).content.decode())
+
+    def test_search(self):
+        """Поиск сливает совпадения из индексов всех шардов."""
+        first, _, third = self.authors
+        found = [
+            Post.objects.create(author=author, text=f'Закат над морем {i}')
+            for i, author in enumerate((first, third, third))
+        ]
+        self.publish(first, 2)
+        response = Client().get(reverse('posts:search'), {'q': 'закат'})
+        page = response.context['page_obj']
+        self.assertEqual(page.paginator.count, 3)
+        self.assertEqual({post.pk for post in page},
+                         {post.pk for post in found})
+        self.assertIn(page[0].author, (first, third))
+
+    def test_popular(self):
+        """Рейтинг считается по постам шардов и счётчикам основной базы."""
+        first, _, third = self.authors
+        hot, = self.publish(third, 1, self.group)
+        cold, = self.publish(first, 1, self.group)
+        write_deltas({(hot.pk, 'views_count'): 50})
+        self.assertEqual(trending.refresh(full=True), (2, 2))
+        page = Client().get(reverse('posts:popular')).context['page_obj']
+        self.assertEqual([post.pk for post in page], [hot.pk, cold.pk])
+        self.assertEqual(page[0].author, third)
+        page = Client().get(reverse(
+            'posts:group_popular', kwargs={'slug': self.group.slug})
+        ).context['page_obj']
+        self.assertEqual([post.pk for post in page], [hot.pk, cold.pk])
+
+    def test_import(self):
+        """Импорт раскладывает пачку по шардам авторов с общими id."""
+        first, _, third = self.authors
+        existing, = self.publish(first, 1)
+        source = path.join(self.directory, 'import.jsonl')
+        with open(source, 'w', encoding='utf-8') as stream:
+            for number in range(5):
+                author = (first, third)[number % 2]
+                stream.write(json.dumps({
+                    'text': f'Импорт {number}', 'author': author.username,
+                    'group': self.group.slug}) + '\n')
+        call_command('import_posts', source, '--batch-size', '4',
+                     stdout=StringIO())
+        self.assertEqual(self.shard_posts('shard0', first), 4)
+        self.assertEqual(self.shard_posts('shard1', third), 2)
+        ids = [pk for alias in SHARDS
+               for pk in Post.objects.using(alias).values_list(
+                   'pk', flat=True)]
+        self.assertEqual(len(set(ids)), 6)
+        self.assertGreater(min(set(ids) - {existing.pk}), existing.pk)
+        self.assertEqual(
+            AuthorCounter.objects.get(author=third).posts_count, 2)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 5)
+        self.assertEqual(rebuild_counters(fix=False), [])
+        # Следующий пост получает id после выданного импорту диапазона
+        later, = self.publish(third, 1)
+        self.assertGreater(later.pk, max(ids))
+
+    def test_seed_bench_refused(self):
+        """seed_bench не пишет мимо шардов."""
+        with self.assertRaisesMessage(CommandError, 'POST_SHARDS'):
+            call_command('seed_bench', '--users', '1', stdout=StringIO())
+
+    def test_rebalance(self):
+        """Перенос автора выравнивает шарды и сохраняет посты как есть."""
+        first, second, third = self.authors
+        self.publish(first, 3)
+        moved = self.publish(second, 2, self.group)
+        self.publish(third, 1)
+        call_command('rebalance_shards', stdout=StringIO())
+        self.assertEqual(self.shard_posts('shard0', second), 0)
+        self.assertEqual(self.shard_posts('shard1', second), 2)
+        self.assertEqual(AuthorShard.objects.get(author=second).shard,
+                         'shard1')
+        copy = Post.objects.using('shard1').get(pk=moved[0].pk)
+        self.assertEqual(
+            (copy.text, copy.pub_date, copy.group_id),
+            (moved[0].text, moved[0].pub_date, self.group.pk))
+        response = Client().get(reverse(
+            'posts:post_detail', kwargs={'post_id': moved[0].pk}))
+        self.assertEqual(response.status_code, 200)
+
+    def test_rebalance_keeps_changes_made_during_copy(self):
+        """Правки и удаления во время копирования не теряются."""
+        author = self.authors[0]
+        edited, deleted, later = self.publish(author, 3)
+        switch = sharding.set_author_shard
+
+        def edit_then_switch(author_id, alias):
+            # Пока копия снималась, пост изменили, а другой удалили
+            post = Post.objects.using('shard0').get(pk=edited.pk)
+            post.text = 'Правка во время переноса'
+            post.save()
+            Post.objects.using('shard0').filter(pk=deleted.pk).delete()
+            switch(author_id, alias)
+
+        with mock.patch.object(sharding, 'set_author_shard',
+                               side_effect=edit_then_switch):
+            call_command('rebalance_shards', '--author', 'author0', '--to',
+                         'shard1', stdout=StringIO())
+        moved = Post.objects.using('shard1').filter(author=author)
+        self.assertEqual(
+            dict(moved.values_list('pk', 'text')),
+            {edited.pk: 'Правка во время переноса', later.pk: later.text})
+        self.assertEqual(self.shard_posts('shard0', author), 0)
+        # Правки после переключения карты сразу идут на новый шард
+        self.assertEqual(
+            cache.get(f'{sharding.POST_SHARD_PREFIX}{later.pk}'), 'shard1')
+
+    def test_rebalance_single_author(self):
+        """--author и --to переносят одного автора."""
+        self.publish(self.authors[0], 2)
+        call_command('rebalance_shards', '--author', 'author0', '--to',
+                     'shard1', stdout=StringIO())
+        self.assertEqual(self.shard_posts('shard1', self.authors[0]), 2)
+        self.assertEqual(self.shard_posts('shard0', self.authors[0]), 0)
@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+from core.sqlite import PROFILES, current_pragmas
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    def open(self, **options):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'NAME': path,
+             'OPTIONS': options}, alias='sqlite_profile')
+        self.addCleanup(wrapper.close)
+        wrapper.ensure_connection()
+        return wrapper
+
+    @override_settings(SQLITE_PROFILE='tuned')
+    def test_tuned_profile(self):
+        """Новое соединение с файлом базы получает WAL и прагмы профиля."""
+        pragmas = current_pragmas(self.open())
+        self.assertEqual(pragmas['journal_mode'], 'wal')
+        self.assertEqual(pragmas['busy_timeout'],
+                         PROFILES['tuned']['busy_timeout'])
+        self.assertEqual(pragmas['synchronous'], 1)
+        self.assertEqual(pragmas['mmap_size'],
+                         PROFILES['tuned']['mmap_size'])
+
+    @override_settings(SQLITE_PROFILE='default')
+    def test_default_profile(self):
+        """Профиль default оставляет настройки SQLite как есть."""
+        pragmas = current_pragmas(self.open())
+        self.assertEqual(pragmas['journal_mode'], 'delete')
+        self.assertEqual(pragmas['synchronous'], 2)
+
+    @override_settings(SQLITE_PROFILE='tuned')
+    def test_longer_timeout_option_kept(self):
+        """Более длинный OPTIONS['timeout'] прагма не сокращает."""
+        pragmas = current_pragmas(self.open(timeout=600))
+        self.assertEqual(pragmas['busy_timeout'], 600000)
+
+    @override_settings(SQLITE_PROFILE='unknown')
+    def test_unknown_profile(self):
+        """Опечатка в SQLITE_PROFILE не проходит молча."""
+        with self.assertRaises(ValueError):
+            self.open()
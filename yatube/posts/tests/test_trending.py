@@ -0,0 +1,115 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..hits import write_deltas
+from ..models import Group, Post, PostCounter, PostScore, TrendingList
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='-')
+        cls.hot = Post.objects.create(
+            author=cls.user, group=cls.group, text='Горячий пост')
+        cls.cold = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тихий пост')
+        cls.free = Post.objects.create(author=cls.user, text='Без группы')
+        PostCounter.objects.create(post=cls.hot, views_count=50)
+        # Посты и счётчики изменены давно, до прошлого расчёта
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Post.objects.update(updated_at=hour_ago)
+        PostCounter.objects.update(updated_at=hour_ago)
+
+    def ids(self, group=None):
+        return [post.pk for post in trending.TrendingPosts(group)[:10]]
+
+    def test_score_decays_with_age(self):
+        """Вдвое большая активность окупает один период полураспада."""
+        now = timezone.now()
+        earlier = now - timedelta(hours=settings.TRENDING_HALF_LIFE)
+        self.assertAlmostEqual(
+            trending.post_score(1, 0, now),
+            trending.post_score(3, 0, earlier))
+        self.assertGreater(trending.post_score(0, 1, now),
+                           trending.post_score(5, 0, now))
+
+    def test_refresh_builds_top_lists(self):
+        """Расчёт собирает общий топ и топы групп."""
+        self.assertEqual(trending.refresh(), (3, 2))
+        self.assertEqual(self.ids()[0], self.hot.pk)
+        self.assertEqual(set(self.ids()),
+                         {self.hot.pk, self.cold.pk, self.free.pk})
+        self.assertEqual(self.ids(self.group), [self.hot.pk, self.cold.pk])
+        self.assertEqual(self.ids(self.other_group), [])
+
+    def test_refresh_touches_only_changed_posts(self):
+        """Повторный расчёт трогает только посты с новой активностью."""
+        trending.refresh()
+        self.assertEqual(trending.refresh(), (0, 1))
+        write_deltas({(self.cold.pk, 'likes_count'): 10})
+        self.assertEqual(trending.refresh(), (1, 2))
+        self.assertEqual(self.ids(self.group), [self.cold.pk, self.hot.pk])
+
+    def test_refresh_commits_in_batches(self):
+        """Пачки рейтингов и топы пишутся отдельными транзакциями."""
+        rescore = trending.rescore
+        savepoints = []
+
+        def record_savepoint(post_ids):
+            # В TestCase транзакция пачки — точка сохранения
+            savepoints.append(connection.savepoint_ids[-1])
+            return rescore(post_ids)
+
+        with mock.patch.object(trending, 'BATCH_SIZE', 1):
+            with mock.patch.object(trending, 'rescore', record_savepoint):
+                trending.refresh(full=True)
+        self.assertEqual(len(set(savepoints)), 3)
+        self.assertEqual(self.ids(self.group), [self.hot.pk, self.cold.pk])
+
+    def test_moved_post_leaves_group_top(self):
+        """Пост, перенесённый в другую группу, переходит в её топ."""
+        trending.refresh()
+        post = Post.objects.get(pk=self.hot.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(trending.refresh(), (1, 3))
+        self.assertEqual(self.ids(self.group), [self.cold.pk])
+        self.assertEqual(self.ids(self.other_group), [self.hot.pk])
+
+    def test_deleted_post_drops_out(self):
+        """Удалённый пост пропадает из рейтинга и со страницы."""
+        trending.refresh()
+        Post.objects.filter(pk=self.hot.pk).delete()
+        self.assertFalse(PostScore.objects.filter(pk=self.hot.pk).exists())
+        self.assertNotIn(self.hot.pk, self.ids())
+
+    def test_popular_pages(self):
+        """Страница читает готовый топ и посты одним запросом."""
+        trending.refresh()
+        self.assertTrue(TrendingList.objects.filter(
+            pk=trending.GLOBAL_KEY).exists())
+        client = Client()
+        with self.assertNumQueries(2):
+            response = client.get(reverse('posts:popular'))
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']][0],
+            self.hot.pk)
+        response = client.get(
+            reverse('posts:group_popular', kwargs={'slug': self.group.slug}))
+        self.assertEqual(response.context['group'], self.group)
+        self.assertEqual(len(response.context['page_obj']), 2)
@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.test import TestCase, Client
 from http import HTTPStatus
 
+from .. import hits
 from ..models import Post, Group
 
 User = get_user_model()
@@ -25,6 +26,8 @@ class PostURLTests(TestCase):
         )
 
     def setUp(self):
+        hits.buffer.clear()
+        self.addCleanup(hits.buffer.clear)
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -1,10 +1,15 @@
+import gzip
+import json
 from http import HTTPStatus
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
 '''from django import forms'''
 from django.urls import reverse
 
+from .. import hits
 from ..forms import PostForm
+from ..utils import PostPaginator
 from ..models import Post, Group, User
 
 User = get_user_model()
@@ -52,6 +57,9 @@ class PostPagesTests(TestCase):
         )
 
     def setUp(self):
+        hits.buffer.clear()
+        self.addCleanup(hits.buffer.clear)
+        cache.clear()
         # Создаем неавторизованный клиент
         self.guest_client = Client()
         # Создаем авторизованный клиент
@@ -165,6 +173,7 @@ class PostPaginatorTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest = Client()
         self.authorized = Client()
         self.authorized.force_login(self.user)
@@ -188,3 +197,271 @@ class PostPaginatorTests(TestCase):
                 self.assertEqual(
                     len(response.context['page_obj']), count,
                 )
+
+    def test_elided_page_range(self):
+        """Номера страниц выводятся окном вокруг текущей."""
+        paginator = PostPaginator(range(1000), 10)
+        ellipsis = PostPaginator.ELLIPSIS
+        cases = (
+            (1, [1, 2, 3, ellipsis, 100]),
+            (50, [1, ellipsis, 48, 49, 50, 51, 52, ellipsis, 100]),
+            (100, [1, ellipsis, 98, 99, 100]),
+        )
+        for number, expected in cases:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.get_elided_page_range(number)), expected)
+        short = PostPaginator(range(30), 10)
+        self.assertEqual(list(short.get_elided_page_range(2)), [1, 2, 3])
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_paginator_renders_window_only(self):
+        """В разметке нет ссылок на страницы вне окна."""
+        response = self.client.get(reverse('posts:index'), {'page': 7})
+        content = response.content.decode()
+        for page in (1, 5, 6, 7, 8, 9, 13):
+            with self.subTest(page=page):
+                self.assertIn(f'>{page}<', content.replace(' ', ''))
+        self.assertNotIn('?page=3"', content)
+        self.assertNotIn('?page=11"', content)
+
+
+class GroupIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.big = Group.objects.create(
+            title='Большая группа', slug='big', description='-')
+        cls.fresh = Group.objects.create(
+            title='Свежая группа', slug='fresh', description='-')
+        cls.empty = Group.objects.create(
+            title='Пустая группа', slug='empty', description='-')
+        Post.objects.bulk_create(
+            [Post(author=cls.user, text=f'Пост {i}', group=cls.big)
+             for i in range(3)])
+        Post.objects.create(author=cls.user, text='Свежий', group=cls.fresh)
+
+    def groups(self, **params):
+        response = self.client.get(reverse('posts:group_index'), params)
+        return list(response.context['page_obj'])
+
+    def test_groups_sorted_by_posts(self):
+        """Каталог групп по умолчанию отсортирован по числу записей."""
+        self.assertEqual(self.groups(), [self.big, self.fresh, self.empty])
+        self.assertEqual(self.groups(sort='unknown')[0], self.big)
+
+    def test_groups_sorted_by_activity(self):
+        """Сортировка по последней записи ставит пустые группы в конец."""
+        self.assertEqual(self.groups(sort='activity'),
+                         [self.fresh, self.big, self.empty])
+
+    @override_settings(GROUPS_PER_PAGE=2)
+    def test_groups_paginated(self):
+        """Каталог листается и сохраняет сортировку в ссылках."""
+        self.assertEqual(self.groups(sort='activity', page=2), [self.empty])
+        response = self.client.get(
+            reverse('posts:group_index'), {'sort': 'activity'})
+        self.assertContains(response, '?sort=activity&amp;page=2')
+
+
+@override_settings(POSTS_CURSOR_PAGINATION=True)
+class PostCursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            [Post(author=cls.user, text=f"Тестовый пост {i}", group=cls.group)
+                for i in range(13)]
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user}),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages(self):
+        """Курсоры ведут на следующую и обратно на предыдущую страницу."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url).context['page_obj']
+                self.assertEqual(len(first), 10)
+                self.assertFalse(first.has_previous())
+                second = self.client.get(
+                    url, {'cursor': first.next_cursor}).context['page_obj']
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                back = self.client.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    [post.pk for post in back],
+                    [post.pk for post in first],
+                )
+
+    def test_cursor_pages_do_not_overlap(self):
+        """Посты с одинаковой датой не теряются на границе страниц."""
+        url = reverse('posts:index')
+        first = self.client.get(url).context['page_obj']
+        second = self.client.get(
+            url, {'cursor': first.next_cursor}).context['page_obj']
+        pks = [post.pk for post in first] + [post.pk for post in second]
+        self.assertEqual(
+            pks, list(Post.objects.order_by('-pub_date', '-pk')
+                      .values_list('pk', flat=True)))
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.client.get(reverse('posts:index'), {'cursor': '!!'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+
+class PostConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.user,
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        hits.buffer.clear()
+        self.addCleanup(hits.buffer.clear)
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_etags(self, client):
+        return {url: client.get(url)['ETag'] for url in self.urls}
+
+    def test_unchanged_pages_answer_not_modified(self):
+        """Неизменившаяся страница отвечает 304 без шаблона."""
+        for url, etag in self.get_etags(self.client).items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(response.templates, [])
+
+    def test_post_edit_changes_etags(self):
+        """Правка поста через post_edit меняет валидаторы всех страниц."""
+        etags = self.get_etags(self.client)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Новый текст', 'group': self.group.pk},
+        )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_delete_changes_list_etags(self):
+        """Удаление поста меняет валидаторы лент."""
+        Post.objects.create(text='Второй пост', author=self.user)
+        etags = self.get_etags(self.client)
+        Post.objects.filter(text='Второй пост').delete()
+        for url in self.urls[:3]:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_depends_on_user(self):
+        """Страница пользователя и гостя имеют разные валидаторы."""
+        guest = self.get_etags(self.client)
+        authorized = self.get_etags(self.authorized_client)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(guest[url], authorized[url])
+
+
+class PostExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user,
+                 group=cls.group if i % 2 else None)
+            for i in range(5)
+        )
+        Post.objects.create(text='Чужой пост', author=cls.other)
+
+    def setUp(self):
+        hits.buffer.clear()
+        self.addCleanup(hits.buffer.clear)
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.url = reverse(
+            'posts:profile_export', kwargs={'username': self.user.username})
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    @override_settings(EXPORT_BATCH_SIZE=2)
+    def test_export_csv(self):
+        """Автор получает все свои посты в CSV, выгрузка идёт пачками."""
+        # Сессия, пользователь, автор и три пачки постов
+        with self.assertNumQueries(6):
+            content = self.read(self.author_client.get(self.url))
+        lines = content.decode().splitlines()
+        self.assertEqual(lines[0], 'id,text,pub_date,updated_at,author,group')
+        self.assertEqual(len(lines), 6)
+        self.assertIn(',Пост 1,', lines[2])
+        self.assertTrue(lines[2].endswith(',TestUser,test-slug'))
+
+    def test_export_jsonl_gzip(self):
+        """JSONL-выгрузку можно получить сжатой gzip."""
+        response = self.author_client.get(
+            self.url, {'format': 'jsonl', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        rows = [
+            json.loads(line)
+            for line in gzip.decompress(self.read(response)).splitlines()
+        ]
+        self.assertEqual([row['text'] for row in rows],
+                         [f'Пост {i}' for i in range(5)])
+        self.assertIsNone(rows[0]['group'])
+
+    def test_export_access(self):
+        """Выгрузку получают только сам автор и персонал."""
+        other_client = Client()
+        other_client.force_login(self.other)
+        self.assertEqual(other_client.get(self.url).status_code,
+                         HTTPStatus.FORBIDDEN)
+        self.assertEqual(Client().get(self.url).status_code,
+                         HTTPStatus.FOUND)
+        self.other.is_staff = True
+        self.other.save()
+        self.assertEqual(other_client.get(self.url).status_code,
+                         HTTPStatus.OK)
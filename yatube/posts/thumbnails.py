@@ -0,0 +1,55 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+# Размеры миниатюр, которые выводят шаблоны (тег post_thumbnail)
+THUMBNAIL_SIZES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail(image, size):
+    geometry, options = THUMBNAIL_SIZES[size]
+    return get_thumbnail(image, geometry, **options)
+
+
+def generate_thumbnails(image):
+    """Создаёт все миниатюры картинки; готовые sorl пропускает."""
+    for size in THUMBNAIL_SIZES:
+        thumbnail(image, size)
+
+
+def _generate_in_background(image):
+    try:
+        generate_thumbnails(image)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', image.name)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails')
+        return _executor
+
+
+def schedule_thumbnails(image):
+    """Ставит создание миниатюр в фоновый пул потоков.
+
+    Потоки работают только с файлами и кешем sorl, без БД. Если
+    THUMBNAIL_PREGENERATE_ASYNC выключен, миниатюры создаются сразу.
+    """
+    if not settings.THUMBNAIL_PREGENERATE_ASYNC:
+        generate_thumbnails(image)
+        return None
+    return _get_executor().submit(_generate_in_background, image)
@@ -0,0 +1,171 @@
+"""Ленты подписок: раскладка при записи и чтение популярных авторов.
+
+Новый пост автора сразу записывается в TimelineEntry каждого
+подписчика, и лента читается по индексу без обхода подписок. У авторов
+с подписчиками от settings.TIMELINE_FANOUT_LIMIT раскладка стоила бы
+слишком дорого: их посты (fanout_on_read) подмешиваются при показе
+ленты. Флаг не снимается, когда подписчиков становится меньше, иначе
+посты, опубликованные в режиме чтения, пропали бы из лент.
+"""
+import heapq
+import itertools
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .cache import invalidate_tags
+from .models import AuthorCounter, Follow, Post, TimelineEntry
+from .sharding import (
+    author_posts, posts_by_author, shard_for_author, sharding_enabled,
+)
+
+
+def follows_tag(user_id):
+    return f'follows:{user_id}'
+
+
+def change_followers_count(author_id, delta):
+    """Меняет счётчик подписчиков; возвращает новое значение."""
+    counters = AuthorCounter.objects.filter(author_id=author_id)
+    if delta < 0:
+        counters = counters.filter(followers_count__gte=-delta)
+    if not counters.update(followers_count=F('followers_count') + delta):
+        if delta < 0:
+            return 0
+        AuthorCounter.objects.get_or_create(author_id=author_id)
+        counters.update(followers_count=F('followers_count') + delta)
+    return counters.values_list('followers_count', flat=True).first() or 0
+
+
+def is_fanout_on_read(author_id):
+    return AuthorCounter.objects.filter(
+        author_id=author_id, fanout_on_read=True).exists()
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_fanout_on_read(post.author_id):
+        return 0
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    entries = (
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+    total = 0
+    while True:
+        batch = list(itertools.islice(entries, settings.TIMELINE_BATCH_SIZE))
+        if not batch:
+            return total
+        _insert(batch)
+        total += len(batch)
+
+
+def backfill(user_id, author_id):
+    """Последние посты автора в ленту нового подписчика."""
+    posts = author_posts(author_id).values_list(
+        'pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    _insert([
+        TimelineEntry(user_id=user_id, post_id=pk, author_id=author_id,
+                      pub_date=pub_date)
+        for pk, pub_date in posts
+    ])
+
+
+def follow(user, author):
+    """Подписка; возвращает False, если она уже была."""
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(user=user, author=author)
+        if not created:
+            return False
+        followers = change_followers_count(author.pk, 1)
+        if followers >= settings.TIMELINE_FANOUT_LIMIT:
+            AuthorCounter.objects.filter(
+                author_id=author.pk, fanout_on_read=False,
+            ).update(fanout_on_read=True)
+        if not is_fanout_on_read(author.pk):
+            backfill(user.pk, author.pk)
+    invalidate_tags(follows_tag(user.pk))
+    return True
+
+
+def unfollow(user, author):
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+        if not deleted:
+            return False
+        change_followers_count(author.pk, -1)
+        TimelineEntry.objects.filter(user=user, author=author).delete()
+    invalidate_tags(follows_tag(user.pk))
+    return True
+
+
+class FollowFeed:
+    """Лента подписок для PostPaginator: count() и срезы.
+
+    Записи TimelineEntry и посты популярных авторов читаются по своим
+    индексам и сливаются по (pub_date, id). Число запросов и их план
+    не зависят от того, на скольких авторов подписан пользователь.
+    При шардировании посты популярных авторов читаются с их шардов, а
+    страница собирается по шардам авторов, записанных рядом с id.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.pulled = list(Follow.objects.filter(
+            user=user, author__post_counter__fanout_on_read=True,
+        ).values_list('author_id', flat=True))
+
+    def entries(self):
+        # Записи авторов, перешедших в режим чтения, берутся из постов
+        return TimelineEntry.objects.filter(user=self.user).exclude(
+            author_id__in=self.pulled).order_by('-pub_date', '-post_id')
+
+    def pulled_posts(self):
+        """Посты авторов в режиме чтения: запрос на каждый их шард."""
+        if not self.pulled:
+            return []
+        if not sharding_enabled():
+            authors = {None: self.pulled}
+        else:
+            authors = defaultdict(list)
+            for author_id in self.pulled:
+                authors[shard_for_author(author_id)].append(author_id)
+        return [
+            Post.objects.using(alias).filter(author_id__in=ids).order_by(
+                '-pub_date', '-pk')
+            for alias, ids in authors.items()
+        ]
+
+    def count(self):
+        return self.entries().count() + sum(
+            posts.count() for posts in self.pulled_posts())
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('FollowFeed поддерживает только срезы')
+        start, stop = index.start or 0, index.stop
+        if stop <= start:
+            return []
+        fields = ('pub_date', 'post_id', 'author_id')
+        streams = [self.entries().values_list(*fields)[:stop]] + [
+            posts.values_list('pub_date', 'pk', 'author_id')[:stop]
+            for posts in self.pulled_posts()
+        ]
+        merged = heapq.merge(*streams, reverse=True)
+        rows = [row[1:] for row in itertools.islice(merged, start, stop)]
+        if sharding_enabled():
+            posts = posts_by_author(rows)
+        else:
+            posts = Post.objects.select_related('author', 'group').in_bulk(
+                [pk for pk, _ in rows])
+        return [posts[pk] for pk, _ in rows if pk in posts]
@@ -0,0 +1,156 @@
+"""Популярные посты: рейтинг с затуханием по времени.
+
+Рейтинг — log2 активности (просмотры плюс лайки с весом
+TRENDING_LIKE_WEIGHT) плюс время публикации в периодах
+TRENDING_HALF_LIFE: пост вдвое активнее стоит наравне с постом на
+период моложе. Затухание заложено в слагаемое со временем, поэтому
+порядок постов без новой активности со временем не меняется.
+
+refresh() пересчитывает только посты, изменённые или получившие
+просмотры и лайки после прошлого запуска, и пересобирает общий топ и
+топы затронутых групп. Топ — готовый список id в TrendingList: страница
+«Популярного» читает его одной строкой и догружает посты одним
+запросом pk__in.
+"""
+import math
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Post, PostCounter, PostScore, TrendingList
+from .sharding import on_shards, posts_by_id, sharding_enabled
+
+GLOBAL_KEY = 'global'
+
+# Запас на транзакции, закоммиченные после начала прошлого расчёта
+OVERLAP = timedelta(minutes=1)
+
+# Сколько id в одном условии IN: лимит параметров запроса SQLite
+BATCH_SIZE = 500
+
+
+def group_key(group_id):
+    return f'group:{group_id}'
+
+
+def post_score(views, likes, pub_date):
+    activity = views + settings.TRENDING_LIKE_WEIGHT * likes
+    periods = pub_date.timestamp() / 3600 / settings.TRENDING_HALF_LIFE
+    return math.log2(1 + activity) + periods
+
+
+def encode_ids(ids):
+    return array('q', ids).tobytes()
+
+
+def decode_ids(data):
+    ids = array('q')
+    ids.frombytes(bytes(data))
+    return ids.tolist()
+
+
+def changed_post_ids(since):
+    posts = Post.objects.order_by('pk')
+    if since is not None:
+        posts = posts.filter(updated_at__gte=since)
+    ids = set()
+    for shard in on_shards(posts):
+        ids.update(shard.values_list('pk', flat=True))
+    if since is not None:
+        ids.update(PostCounter.objects.filter(
+            updated_at__gte=since).values_list('post_id', flat=True))
+    return sorted(ids)
+
+
+def rescore(post_ids):
+    """Пересчитывает рейтинги постов; возвращает затронутые группы.
+
+    Посты и счётчики читаются отдельно: при шардировании посты на
+    шардах, а счётчики в основной базе.
+    """
+    groups = set(PostScore.objects.filter(
+        pk__in=post_ids).values_list('group_id', flat=True))
+    counters = {
+        post_id: (views, likes)
+        for post_id, views, likes in PostCounter.objects.filter(
+            post_id__in=post_ids).values_list(
+            'post_id', 'views_count', 'likes_count')
+    }
+    scores = [
+        PostScore(post_id=pk, group_id=group_id,
+                  score=post_score(*counters.get(pk, (0, 0)), pub_date))
+        for posts in on_shards(Post.objects.filter(pk__in=post_ids))
+        for pk, group_id, pub_date in posts.values_list(
+            'pk', 'group_id', 'pub_date')
+    ]
+    PostScore.objects.filter(pk__in=post_ids).delete()
+    PostScore.objects.bulk_create(scores)
+    groups.update(score.group_id for score in scores)
+    return groups
+
+
+def top_ids(scores):
+    return list(scores.order_by('-score').values_list(
+        'post_id', flat=True)[:settings.TRENDING_SIZE])
+
+
+def refresh(full=False):
+    """Пересчёт с прошлого запуска; возвращает (постов, топов)."""
+    started = timezone.now()
+    last = TrendingList.objects.filter(pk=GLOBAL_KEY).values_list(
+        'computed_at', flat=True).first()
+    since = None if full or last is None else last - OVERLAP
+    post_ids = changed_post_ids(since)
+    groups = set()
+    # Каждая пачка — своя транзакция: полный пересчёт не держит
+    # блокировку записи SQLite, и публикации и сброс счётчиков идут
+    # между пачками. Прерванный расчёт повторится с того же since:
+    # computed_at меняется только вместе с топами
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        with transaction.atomic():
+            groups |= rescore(post_ids[start:start + BATCH_SIZE])
+    if since is None:
+        groups.update(PostScore.objects.values_list(
+            'group_id', flat=True).distinct())
+    groups.discard(None)
+    lists = {GLOBAL_KEY: top_ids(PostScore.objects.all())}
+    for group_id in groups:
+        lists[group_key(group_id)] = top_ids(
+            PostScore.objects.filter(group_id=group_id))
+    with transaction.atomic():
+        if since is None:
+            TrendingList.objects.exclude(pk__in=lists).delete()
+        for key, ids in lists.items():
+            TrendingList.objects.update_or_create(key=key, defaults={
+                'post_ids': encode_ids(ids),
+                'computed_at': started,
+            })
+    return len(post_ids), len(lists)
+
+
+class TrendingPosts:
+    """Готовый топ для Paginator: count() и срезы по списку id."""
+
+    def __init__(self, group=None):
+        key = GLOBAL_KEY if group is None else group_key(group.pk)
+        data = TrendingList.objects.filter(pk=key).values_list(
+            'post_ids', flat=True).first()
+        self.ids = decode_ids(data) if data else []
+
+    def count(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('TrendingPosts поддерживает только срезы')
+        ids = self.ids[index]
+        if sharding_enabled():
+            posts = posts_by_id(ids)
+        else:
+            posts = Post.objects.select_related('author', 'group').in_bulk(
+                ids)
+        # Удалённые после расчёта посты просто выпадают из страницы
+        return [posts[pk] for pk in ids if pk in posts]
@@ -6,9 +6,30 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('rss/', views.index_rss, name='index_rss'),
+    path('atom/', views.index_atom, name='index_atom'),
+    path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/popular/', views.group_popular,
+         name='group_popular'),
+    path('group/<slug:slug>/rss/', views.group_rss, name='group_rss'),
+    path('group/<slug:slug>/atom/', views.group_atom, name='group_atom'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/rss/', views.profile_rss,
+         name='profile_rss'),
+    path('profile/<str:username>/atom/', views.profile_atom,
+         name='profile_atom'),
+    path('profile/<str:username>/follow/', views.profile_follow,
+         name='profile_follow'),
+    path('profile/<str:username>/unfollow/', views.profile_unfollow,
+         name='profile_unfollow'),
+    path('popular/', views.popular, name='popular'),
+    path('follow/', views.follow_index, name='follow_index'),
+    path('profile/<str:username>/export/', views.profile_export,
+         name='profile_export'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/like/', views.post_like, name='post_like'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
 ]
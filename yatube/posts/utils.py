@@ -1,8 +1,199 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+from collections.abc import Sequence
+
 from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class PostPage(Page):
+    @property
+    def elided_page_range(self):
+        return self.paginator.get_elided_page_range(self.number)
+
+
+class PostPaginator(Paginator):
+    """Paginator с «окном» номеров страниц вокруг текущей.
+
+    get_elided_page_range перенесён из Django 3.2: шаблону отдаются
+    первые и последние страницы и несколько соседей текущей, а
+    пропуски заменяются на ELLIPSIS.
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        """Число объектов; известное заранее значение избавляет от COUNT."""
+        if self._count is not None:
+            return self._count
+        return super().count
+
+    def _get_page(self, *args, **kwargs):
+        return PostPage(*args, **kwargs)
+
+    def get_elided_page_range(self, number=1, *, on_each_side=None,
+                              on_ends=None):
+        if on_each_side is None:
+            on_each_side = settings.PAGINATOR_ON_EACH_SIDE
+        if on_ends is None:
+            on_ends = settings.PAGINATOR_ON_ENDS
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+def encode_cursor(direction, pub_date, pk):
+    raw = f'{direction}|{pub_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Разбирает токен курсора; для битого токена возвращает None."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации.
+
+    Повторяет ту часть интерфейса Page, которой пользуются шаблоны,
+    но вместо номеров страниц отдаёт токены соседних страниц.
+    """
+    is_cursor = True
 
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
 
-def paginator_obj(request, post_list):
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (pub_date, id) без OFFSET и COUNT(*).
+
+    Стоимость выборки не зависит от глубины страницы: каждый запрос
+    начинается с позиции, зашитой в курсор.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list.order_by('-pub_date', '-pk')
+        self.per_page = int(per_page)
+
+    def rows(self, condition, reverse=False):
+        """До per_page + 1 строк, подходящих под condition.
+
+        reverse — в обратном порядке, от старых к новым.
+        """
+        queryset = self.object_list.filter(condition)
+        if reverse:
+            queryset = queryset.reverse()
+        return list(queryset[:self.per_page + 1])
+
+    def get_page(self, cursor=None):
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            rows = self.rows(Q())
+            return self._page(rows, has_next=len(rows) > self.per_page,
+                              has_previous=False)
+        direction, pub_date, pk = position
+        if direction == CURSOR_NEXT:
+            rows = self.rows(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk))
+            return self._page(rows, has_next=len(rows) > self.per_page,
+                              has_previous=True)
+        rows = self.rows(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk),
+            reverse=True)
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return self._page(rows, has_next=True, has_previous=has_previous)
+
+    @staticmethod
+    def _position(row):
+        # Строки values() (API) приходят словарями с ключами pk и pub_date
+        if isinstance(row, dict):
+            return row['pub_date'], row['pk']
+        return row.pub_date, row.pk
+
+    def _page(self, rows, has_next, has_previous):
+        rows = rows[:self.per_page]
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(
+                CURSOR_NEXT, *self._position(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor(
+                CURSOR_PREVIOUS, *self._position(rows[0]))
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+
+def paginator_obj(request, post_list, count=None):
+    cursor = request.GET.get('cursor')
+    # Курсор — фильтр по queryset; ленты с шардов листаются по номерам
+    keyset = isinstance(post_list, QuerySet)
+    if keyset and (cursor is not None or settings.POSTS_CURSOR_PAGINATION):
+        paginator = CursorPaginator(post_list, settings.POSTS_PER_PAGE)
+        return paginator.get_page(cursor)
+    paginator = PostPaginator(post_list, settings.POSTS_PER_PAGE,
+                              count=count)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def page_params(request):
+    """Параметры запроса без номера страницы для ссылок паджинатора."""
+    params = request.GET.copy()
+    params.pop('page', None)
+    return f'{params.urlencode()}&' if params else ''
@@ -1,54 +1,250 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Post, Group, User
+from django.views.decorators.http import condition, require_POST
+
+from core.query_budget import query_budget
+from .cache import cache_anonymous_page, invalidate_tags, tag_page
+from .export import EXPORT_FORMATS, export_posts
+from .feeds import (AuthorPostAtomFeed, AuthorPostFeed, GroupPostAtomFeed,
+                    GroupPostFeed, PostAtomFeed, PostFeed)
+from .etags import group_etag, index_etag, post_detail_etag, profile_etag
+from .hits import increment, post_counts
+from .models import AuthorCounter, Follow, Like, Post, Group, User
 from .forms import PostForm
-from .utils import paginator_obj
+from .search import PostSearch
+from .timeline import FollowFeed, follow, unfollow
+from .trending import TrendingPosts
+from .sharding import (ShardedPostList, author_posts, get_post_or_404,
+                       sharding_enabled)
+from .utils import PostPaginator, page_params, paginator_obj
 
 
+@condition(etag_func=index_etag)
+@cache_anonymous_page
+@query_budget(4, 'posts:index')
 def index(request):
-    post_list = Post.objects.all()
+    if sharding_enabled():
+        post_list = ShardedPostList()
+    else:
+        post_list = Post.objects.select_related('author', 'group')
     page_obj = paginator_obj(request, post_list)
     context = {
         'page_obj': page_obj,
     }
-    return render(request, 'posts/index.html', context)
+    response = render(request, 'posts/index.html', context)
+    return tag_page(response, page_obj, 'feed')
+
+
+# Порядок каталога групп: по каждому есть индекс в Group.Meta
+GROUP_ORDERINGS = {
+    'posts': ('-posts_count', '-id'),
+    'activity': ('-last_pub_date', '-id'),
+}
+
+
+@query_budget(4, 'posts:group_index')
+def group_index(request):
+    sort = request.GET.get('sort')
+    if sort not in GROUP_ORDERINGS:
+        sort = 'posts'
+    groups = Group.objects.order_by(*GROUP_ORDERINGS[sort])
+    paginator = PostPaginator(groups, settings.GROUPS_PER_PAGE)
+    context = {
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'sort': sort,
+        'page_params': page_params(request),
+    }
+    return render(request, 'posts/groups.html', context)
 
 
+@condition(etag_func=group_etag)
+@cache_anonymous_page
+@query_budget(4, 'posts:group_list')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = paginator_obj(request, post_list)
+    if sharding_enabled():
+        post_list = ShardedPostList(group_id=group.pk)
+    else:
+        post_list = group.posts.select_related('author', 'group')
+    page_obj = paginator_obj(request, post_list, count=group.posts_count)
     context = {
         'group': group,
         'page_obj': page_obj,
     }
-    return render(request, 'posts/group_list.html', context)
+    response = render(request, 'posts/group_list.html', context)
+    return tag_page(response, page_obj, f'feed:group:{group.pk}',
+                    f'group:{group.pk}', f'slug:{group.slug}')
 
 
+@condition(etag_func=profile_etag)
+@cache_anonymous_page
+@query_budget(6, 'posts:profile')
 def profile(request, username):
     user_author = get_object_or_404(User, username=username)
-    post_list = user_author.posts.all()
-    page_obj = paginator_obj(request, post_list)
-    post_number = post_list.count()
+    if sharding_enabled():
+        post_list = ShardedPostList(author_id=user_author.pk)
+    else:
+        post_list = user_author.posts.select_related('group')
+    post_number = AuthorCounter.posts_count_for(user_author)
+    page_obj = paginator_obj(request, post_list, count=post_number)
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=user_author).exists()
     context = {
         'page_obj': page_obj,
         'author': user_author,
         'post_number': post_number,
+        'following': following,
+    }
+    response = render(request, 'posts/profile.html', context)
+    return tag_page(response, page_obj, f'feed:author:{user_author.pk}',
+                    f'author:{user_author.pk}',
+                    f'username:{user_author.username}')
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        follow(request.user, author)
+    return redirect('posts:profile', username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    unfollow(request.user, author)
+    return redirect('posts:profile', username)
+
+
+@query_budget(4, 'posts:popular')
+def popular(request):
+    paginator = PostPaginator(TrendingPosts(), settings.POSTS_PER_PAGE)
+    context = {
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'posts/popular.html', context)
+
+
+@query_budget(5, 'posts:group_popular')
+def group_popular(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    paginator = PostPaginator(TrendingPosts(group), settings.POSTS_PER_PAGE)
+    context = {
+        'group': group,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'posts/popular.html', context)
+
+
+@login_required
+@query_budget(8, 'posts:follow_index')
+def follow_index(request):
+    page_obj = paginator_obj(request, FollowFeed(request.user))
+    context = {
+        'page_obj': page_obj,
     }
-    return render(request, 'posts/profile.html', context)
+    return render(request, 'posts/follow.html', context)
+
+
+@login_required
+def profile_export(request, username):
+    user_author = get_object_or_404(User, username=username)
+    if request.user != user_author and not request.user.is_staff:
+        raise PermissionDenied
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise Http404
+    compress = 'gzip' in request.GET
+    response = StreamingHttpResponse(
+        export_posts(author_posts(user_author.pk), fmt, compress),
+        content_type=('application/gzip' if compress
+                      else f'{EXPORT_FORMATS[fmt]}; charset=utf-8'),
+    )
+    filename = f'posts-{user_author.username}.{fmt}'
+    if compress:
+        filename += '.gz'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 
+@condition(etag_func=post_detail_etag)
+@query_budget(6, 'posts:post_detail')
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_number = Post.objects.filter(author=post.author).count()
+    if sharding_enabled():
+        post = get_post_or_404(post_id)
+    else:
+        post = get_object_or_404(
+            Post.objects.select_related('author', 'group'), pk=post_id)
+    post_number = AuthorCounter.posts_count_for(post.author_id)
+    # Просмотр копится в буфере, в базу уходит пачкой (posts.hits)
+    increment(post.pk, 'views_count')
+    liked = request.user.is_authenticated and Like.objects.filter(
+        user=request.user, post_id=post.pk).exists()
     context = {
         'post': post,
         'post_number': post_number,
+        'counts': post_counts(post.pk),
+        'liked': liked,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
+@require_POST
+def post_like(request, post_id):
+    if sharding_enabled():
+        post = get_post_or_404(post_id)
+    else:
+        post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    # По post_id: лайк пишется в основную базу, а не на шард поста
+    like, created = Like.objects.get_or_create(
+        user=request.user, post_id=post.pk)
+    if not created:
+        like.delete()
+    increment(post.pk, 'likes_count', 1 if created else -1)
+    invalidate_tags(f'post:{post.pk}')
+    return redirect('posts:post_detail', post_id)
+
+
+def feed_view(feed, etag_func, name, max_queries):
+    """Лента RSS/Atom с ETag ленты и кешем XML для анонимов."""
+    return condition(etag_func=etag_func)(
+        cache_anonymous_page(query_budget(max_queries, name)(feed)))
+
+
+index_rss = feed_view(PostFeed(), index_etag, 'posts:index_feed', 1)
+index_atom = feed_view(PostAtomFeed(), index_etag, 'posts:index_feed', 1)
+group_rss = feed_view(GroupPostFeed(), group_etag, 'posts:group_feed', 2)
+group_atom = feed_view(
+    GroupPostAtomFeed(), group_etag, 'posts:group_feed', 2)
+profile_rss = feed_view(
+    AuthorPostFeed(), profile_etag, 'posts:profile_feed', 2)
+profile_atom = feed_view(
+    AuthorPostAtomFeed(), profile_etag, 'posts:profile_feed', 2)
+
+
+@query_budget(5, 'posts:search')
+def search(request):
+    query = request.GET.get('q', '').strip()[:settings.SEARCH_QUERY_LENGTH]
+    page_obj = None
+    if query:
+        paginator = PostPaginator(PostSearch(query), settings.POSTS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_params': page_params(request),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@login_required
+@query_budget(10, 'posts:post_create')
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -68,8 +264,13 @@ def post_create(request):
 
 
 @login_required
+@query_budget(8, 'posts:post_edit')
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    if sharding_enabled():
+        post = get_post_or_404(post_id)
+    else:
+        post = get_object_or_404(Post.objects.select_related('author'),
+                                 pk=post_id)
     if request.user != post.author:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
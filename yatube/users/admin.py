@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import OutboxMessage
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'subject', 'recipients', 'status', 'attempts',
+                    'created_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipients',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.benchmark import summarize
+from users.outbox import drain_batch, queue_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из очереди пачками в несколько потоков, '
+        'с повторами и нарастающей паузой между попытками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--workers', type=int)
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать готовые письма и выйти',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Пауза в секундах, когда в очереди нет готовых писем',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Только показать состояние очереди',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.report_queue()
+            return
+        try:
+            while True:
+                result = drain_batch(options['batch_size'],
+                                     options['workers'])
+                if result['sent'] or result['retried'] or result['failed']:
+                    self.report_batch(result)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.report_queue()
+
+    def report_batch(self, result):
+        latency = summarize(result['latency'])
+        self.stdout.write(
+            f'Отправлено: {result["sent"]}, повтор: {result["retried"]}, '
+            f'ошибок: {result["failed"]}; задержка p50 '
+            f'{latency["p50"] / 1000:.1f} с, p95 '
+            f'{latency["p95"] / 1000:.1f} с'
+        )
+
+    def report_queue(self):
+        stats = queue_stats()
+        self.stdout.write(
+            f'В очереди: {stats["depth"]} (готово к отправке: '
+            f'{stats["ready"]}), не отправлено: {stats["failed"]}, '
+            f'самое старое ждёт {stats["oldest_age"]:.0f} с'
+        )
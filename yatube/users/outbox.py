@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+def enqueue_mail(subject, body, from_email, recipient_list,
+                 html_message=None):
+    """Ставит письмо в очередь вместо отправки (аналог send_mail)."""
+    return OutboxMessage.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_message or '',
+        from_email=from_email or '',
+        recipients='\n'.join(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: удваивается, но не выше предела."""
+    delay = settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.OUTBOX_RETRY_MAX_DELAY))
+
+
+def claim_batch(size):
+    """Забирает пачку готовых к отправке писем.
+
+    Письма переводятся в SENDING с арендой до OUTBOX_LEASE секунд:
+    другой обработчик их не возьмёт, а если этот упадёт, после
+    окончания аренды письма снова попадут в выборку.
+    """
+    now = timezone.now()
+    ready = OutboxMessage.objects.filter(
+        Q(status=OutboxMessage.PENDING) | Q(status=OutboxMessage.SENDING),
+        next_attempt_at__lte=now,
+    )
+    ids = list(ready.values_list('pk', flat=True)[:size])
+    lease = now + timedelta(seconds=settings.OUTBOX_LEASE)
+    ready.filter(pk__in=ids).update(
+        status=OutboxMessage.SENDING, next_attempt_at=lease)
+    return list(OutboxMessage.objects.filter(
+        pk__in=ids, status=OutboxMessage.SENDING, next_attempt_at=lease))
+
+
+def send_message(message):
+    """Отправляет одно письмо; выполняется в потоке без доступа к БД."""
+    email = EmailMultiAlternatives(
+        message.subject, message.body, message.from_email or None,
+        message.recipient_list, connection=get_connection(),
+    )
+    if message.html_body:
+        email.attach_alternative(message.html_body, 'text/html')
+    try:
+        email.send()
+    except Exception as error:
+        return message, timezone.now(), f'{type(error).__name__}: {error}'
+    return message, timezone.now(), ''
+
+
+def drain_batch(size=None, workers=None):
+    """Отправляет одну пачку писем пулом потоков.
+
+    Возвращает сводку: сколько отправлено, отложено на повтор и
+    окончательно не отправлено, а также задержки от постановки в
+    очередь до отправки в миллисекундах.
+    """
+    batch = claim_batch(size or settings.OUTBOX_BATCH_SIZE)
+    result = {'sent': 0, 'retried': 0, 'failed': 0, 'latency': []}
+    if not batch:
+        return result
+    with ThreadPoolExecutor(workers or settings.OUTBOX_WORKERS) as pool:
+        outcomes = list(pool.map(send_message, batch))
+    for message, finished, error in outcomes:
+        message.attempts += 1
+        message.last_error = error
+        if not error:
+            message.status = OutboxMessage.SENT
+            message.sent_at = finished
+            result['sent'] += 1
+            result['latency'].append(
+                (finished - message.created_at).total_seconds() * 1000)
+        elif message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status = OutboxMessage.FAILED
+            result['failed'] += 1
+        else:
+            message.status = OutboxMessage.PENDING
+            message.next_attempt_at = finished + retry_delay(
+                message.attempts)
+            result['retried'] += 1
+    OutboxMessage.objects.bulk_update(
+        batch, ['status', 'attempts', 'last_error', 'sent_at',
+                'next_attempt_at'])
+    return result
+
+
+def queue_stats():
+    """Глубина очереди и возраст самого старого неотправленного письма."""
+    waiting = OutboxMessage.objects.filter(
+        status__in=(OutboxMessage.PENDING, OutboxMessage.SENDING))
+    oldest = waiting.aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'depth': waiting.count(),
+        'ready': waiting.filter(next_attempt_at__lte=timezone.now()).count(),
+        'failed': OutboxMessage.objects.filter(
+            status=OutboxMessage.FAILED).count(),
+        'oldest_age': (
+            (timezone.now() - oldest).total_seconds() if oldest else 0.0),
+    }
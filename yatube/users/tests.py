@@ -0,0 +1,80 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .outbox import drain_batch, enqueue_mail, queue_stats
+
+User = get_user_model()
+
+
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='TestUser', email='test@example.com', password='pass')
+
+    def test_password_reset_is_queued(self):
+        """Сброс пароля ставит письмо в очередь и ничего не отправляет."""
+        response = Client().post(
+            reverse('users:password_reset_form'),
+            {'email': 'test@example.com'},
+        )
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.recipient_list, ['test@example.com'])
+        self.assertIn('/auth/reset/', message.body)
+
+    def test_drain_sends_queued_mail(self):
+        """Обработчик отправляет письма и отмечает их отправленными."""
+        for i in range(3):
+            enqueue_mail(f'Тема {i}', 'Текст', None, [f'u{i}@example.com'])
+        result = drain_batch(size=2, workers=2)
+        self.assertEqual(result['sent'], 2)
+        self.assertEqual(len(result['latency']), 2)
+        self.assertEqual(queue_stats()['depth'], 1)
+        drain_batch()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxMessage.objects.exclude(
+            status=OutboxMessage.SENT).exists())
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_DELAY=10)
+    def test_failed_mail_is_retried_with_backoff(self):
+        """Ошибка отправки откладывает письмо, после предела — FAILED."""
+        message = enqueue_mail('Тема', 'Текст', None, ['u@example.com'])
+        target = 'django.core.mail.EmailMultiAlternatives.send'
+        with mock.patch(target, side_effect=OSError('нет связи')):
+            self.assertEqual(drain_batch()['retried'], 1)
+            message.refresh_from_db()
+            self.assertEqual(message.status, OutboxMessage.PENDING)
+            self.assertIn('нет связи', message.last_error)
+            self.assertGreater(message.next_attempt_at, timezone.now())
+            # До истечения паузы письмо не берётся повторно
+            self.assertEqual(drain_batch()['retried'], 0)
+            OutboxMessage.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(drain_batch()['failed'], 1)
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.FAILED)
+        self.assertEqual(queue_stats()['failed'], 1)
+
+    def test_expired_lease_is_reclaimed(self):
+        """Письмо упавшего обработчика берётся снова после аренды."""
+        enqueue_mail('Тема', 'Текст', None, ['u@example.com'])
+        OutboxMessage.objects.update(status=OutboxMessage.SENDING)
+        self.assertEqual(drain_batch()['sent'], 1)
+
+    def test_command_reports_queue(self):
+        """Команда разбирает очередь и печатает её состояние."""
+        enqueue_mail('Тема', 'Текст', None, ['u@example.com'])
+        out = StringIO()
+        call_command('send_outbox', '--once', stdout=out)
+        self.assertIn('Отправлено: 1', out.getvalue())
+        self.assertIn('В очереди: 0', out.getvalue())
@@ -4,6 +4,7 @@
 from django.contrib.auth.views import LoginView, LogoutView
 from django.urls import path
 from . import views
+from .forms import OutboxPasswordResetForm
 from django.contrib.auth.views import PasswordChangeDoneView
 from django.contrib.auth.views import PasswordChangeView
 from django.contrib.auth.views import PasswordResetView, PasswordResetDoneView
@@ -26,7 +27,8 @@ urlpatterns = [
          (template_name='users/password_change_done.html'),
          name='password_change_done'),
     path('password_reset/', PasswordResetView.as_view
-         (template_name='users/password_reset_form.html'),
+         (template_name='users/password_reset_form.html',
+          form_class=OutboxPasswordResetForm),
          name='password_reset_form'),
     path('password_reset/done/', PasswordResetDoneView.as_view
          (template_name='users/password_reset_done.html'),
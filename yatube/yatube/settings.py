@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.routing.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,9 +96,61 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами: прагмы ставятся один раз
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Прагмы при открытии соединения SQLite (core.sqlite.PROFILES):
+# 'tuned' — WAL, busy_timeout и synchronous=NORMAL для конкурентной
+# записи, 'default' — настройки SQLite по умолчанию
+SQLITE_PROFILE = 'tuned'
+
+# Чтения внутри запросов уходят на реплики (core.routing), запись — в
+# default. Локально реплика — копия файла SQLite, которую обновляет
+# manage.py sync_replicas:
+#     DATABASES['replica'] = {
+#         **DATABASES['default'],
+#         'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#         'TEST': {'MIRROR': 'default'},
+#     }
+#     DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS: list = []
+DATABASE_ROUTERS = [
+    'posts.sharding.PostShardRouter',
+    'core.routing.PrimaryReplicaRouter',
+]
+
+# Шарды постов по авторам (posts.sharding): алиасы из DATABASES. Пусто —
+# посты в основной базе. Локально шарды — отдельные файлы SQLite:
+#     DATABASES['shard0'] = {
+#         **DATABASES['default'],
+#         'NAME': os.path.join(BASE_DIR, 'shard0.sqlite3'),
+#     }
+#     POST_SHARDS = ['shard0', 'shard1']
+# и manage.py migrate --database=shard0 для каждого шарда
+POST_SHARDS: list = []
+
+# Потоки для параллельных запросов ко всем шардам
+SHARD_WORKERS: int = 8
+
+# Сколько секунд после записи пользователь читает из основной базы
+REPLICA_PIN_SECONDS: int = 10
+
+
+# Кеш карточек постов и счётчики попаданий должны быть общими для всех
+# процессов: в продакшене здесь memcached/redis, а не LocMemCache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+POST_CARD_CACHE_TIMEOUT: int = 60 * 60 * 24
+
+# Страницы лент для анонимов сбрасываются по тегам при записи постов
+PAGE_CACHE_TIMEOUT: int = 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -135,12 +189,77 @@ STATIC_URL = '/static/'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Очередь писем (users.OutboxMessage), её разбирает manage.py send_outbox.
+# Повторы через OUTBOX_RETRY_DELAY * 2^n секунд, не дольше MAX_DELAY
+OUTBOX_BATCH_SIZE: int = 50
+OUTBOX_WORKERS: int = 4
+OUTBOX_MAX_ATTEMPTS: int = 5
+OUTBOX_RETRY_DELAY: int = 30
+OUTBOX_RETRY_MAX_DELAY: int = 60 * 60
+OUTBOX_LEASE: int = 5 * 60
+
+# Фоновое удаление авторов и групп (posts.DeletionJob), его выполняет
+# manage.py process_deletions: строк в транзакции, пауза между пачками
+# в секундах, чтобы запись успевали другие запросы, и аренда задачи
+DELETION_CHUNK_SIZE: int = 500
+DELETION_PAUSE: float = 0.05
+DELETION_LEASE: int = 5 * 60
+
 POSTS_PER_PAGE: int = 10
+GROUPS_PER_PAGE: int = 30
+
+# Курсорная пагинация лент вместо OFFSET/LIMIT с номерами страниц
+POSTS_CURSOR_PAGINATION: bool = False
+
+# Сколько номеров страниц показывать вокруг текущей и по краям
+PAGINATOR_ON_EACH_SIDE: int = 2
+
+PAGINATOR_ON_ENDS: int = 1
 
 POSTS_NUMBER: int = 10
 
+SEARCH_QUERY_LENGTH: int = 200
+
+# Ленты подписок (posts.timeline): посты автора раскладываются по лентам
+# подписчиков при публикации, пока подписчиков меньше FANOUT_LIMIT;
+# посты более популярных авторов подмешиваются при чтении ленты
+TIMELINE_FANOUT_LIMIT: int = 1000
+TIMELINE_BATCH_SIZE: int = 500
+# Сколько последних постов автора попадает в ленту при подписке
+TIMELINE_BACKFILL: int = 50
+
+# Просмотры и лайки копятся в памяти воркера и пишутся в базу раз в
+# FLUSH_INTERVAL секунд или при FLUSH_SIZE несброшенных постах
+COUNTER_FLUSH_INTERVAL: float = 5
+COUNTER_FLUSH_SIZE: int = 1000
+
+# «Популярное» (posts.trending): длина топа, вес лайка в просмотрах и
+# период в часах, за который рейтинг поста без активности падает вдвое
+TRENDING_SIZE: int = 100
+TRENDING_LIKE_WEIGHT: int = 10
+TRENDING_HALF_LIFE: float = 6
+
+# Сколько последних постов попадает в RSS/Atom
+FEED_ITEMS: int = 20
+
+# Наибольший размер страницы API (?limit=)
+API_MAX_LIMIT: int = 100
+
+# Сколько постов выгрузка читает из базы за один запрос
+EXPORT_BATCH_SIZE: int = 2000
+
+# Бюджеты запросов во views: 'raise' — исключение, 'log' — предупреждение
+# в лог, None — без подсчёта
+QUERY_BUDGET_MODE = None
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Ключи sorl-thumbnail хранятся в кеше, а не в таблице thumbnail_kvstore
+THUMBNAIL_KVSTORE = 'core.thumbnail_kvstore.KVStore'
+# Миниатюры новых картинок создаются в фоне (posts.thumbnails)
+THUMBNAIL_PREGENERATE_ASYNC: bool = True
+THUMBNAIL_WORKERS: int = 2
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/